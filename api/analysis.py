@@ -0,0 +1,109 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func, select
+
+from exts import db
+from blueprint.analysis import AnswerModel
+from blueprint.questionaire import get_template
+
+analysis_api_bp = Blueprint('analysis_api', __name__, url_prefix='/api/analysis')
+
+
+@analysis_api_bp.route('/<code>/distribution', methods=['GET'])
+def answer_distribution(code):
+    """
+    问卷各题答案分布（由数据库按题号、答案分组统计）
+    ---
+    tags:
+      - Analysis
+    parameters:
+      - in: path
+        name: code
+        type: string
+        required: true
+        description: 问卷 code
+      - in: query
+        name: question
+        type: integer
+        required: false
+        description: 只统计该题（从 0 开始的题号）
+      - in: query
+        name: source
+        type: string
+        required: false
+        description: 只统计该上传文件的结果
+      - in: query
+        name: top
+        type: integer
+        default: 20
+        description: 每题最多返回的答案数，按人数从多到少
+    responses:
+      200:
+        description: 每题的作答数与答案分布
+        schema:
+          type: object
+          properties:
+            code:
+              type: string
+            rows:
+              type: integer
+              description: 有作答记录的拜访行数
+            questions:
+              type: array
+              items:
+                type: object
+                properties:
+                  index:
+                    type: integer
+                  title:
+                    type: string
+                  total:
+                    type: integer
+                  values:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        value:
+                          type: string
+                        count:
+                          type: integer
+    """
+    top = max(request.args.get('top', 20, type=int), 1)
+    conditions = [AnswerModel.code == code]
+    question = request.args.get('question', type=int)
+    if question is not None:
+        conditions.append(AnswerModel.question_index == question)
+    source = request.args.get('source')
+    if source:
+        conditions.append(AnswerModel.source == source)
+
+    count = func.count(AnswerModel.id).label('count')
+    stmt = (
+        select(AnswerModel.question_index, AnswerModel.value, count)
+        .where(*conditions)
+        .group_by(AnswerModel.question_index, AnswerModel.value)
+        .order_by(AnswerModel.question_index, count.desc(), AnswerModel.value)
+    )
+    rows_stmt = select(func.count(func.distinct(AnswerModel.source + ':' + AnswerModel.row_key))).where(*conditions)
+
+    template = get_template(code)
+    titles = template.titles if template else []
+    questions = {}
+    for index, value, value_count in db.session.execute(stmt):
+        item = questions.get(index)
+        if item is None:
+            item = questions[index] = {
+                "index": index,
+                "title": titles[index] if index < len(titles) else None,
+                "total": 0,
+                "values": []
+            }
+        item["total"] += value_count
+        if len(item["values"]) < top:
+            item["values"].append({"value": value, "count": value_count})
+
+    return jsonify({
+        "code": code,
+        "rows": db.session.execute(rows_stmt).scalar(),
+        "questions": list(questions.values())
+    })
@@ -1,17 +1,35 @@
 from flask import Blueprint, request, jsonify
 from exts import db
 from blueprint.business_park import BusinessParkModel  # 复用 model
+from utils.serialization import list_response
 
 business_park_api_bp = Blueprint('business_park_api', __name__, url_prefix='/api/park')
 
+PARK_FIELDS = ["id", "name", "area", "company_name", "remark"]
+
 
 @business_park_api_bp.route('/list', methods=['GET'])
 def list_business_parks():
     """
-    获取所有园区列表
+    获取园区列表
     ---
     tags:
       - BusinessPark
+    parameters:
+      - in: query
+        name: page
+        type: integer
+        required: false
+        description: 传入时分页返回，不传时流式返回完整数组
+      - in: query
+        name: per_page
+        type: integer
+        default: 20
+      - in: query
+        name: fields
+        type: string
+        required: false
+        description: 需要返回的字段，逗号分隔，例如 name,company_name
     responses:
       200:
         description: 成功返回园区列表
@@ -31,17 +49,7 @@ def list_business_parks():
               remark:
                 type: string
     """
-    parks = BusinessParkModel.query.all()
-    data = [
-        {
-            "id": p.id,
-            "name": p.name,
-            "area": p.area,
-            "company_name": p.company_name,
-            "remark": p.remark
-        } for p in parks
-    ]
-    return jsonify(data)
+    return list_response(BusinessParkModel, PARK_FIELDS, request.args)
 
 
 @business_park_api_bp.route('/add', methods=['POST'])
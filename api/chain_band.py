@@ -1,12 +1,16 @@
 from flask import Blueprint, request, jsonify, send_file
 from exts import db
-from blueprint.chain_band import ChainBandModel
-import pandas as pd
+from blueprint.chain_band import ChainBandModel, CHAIN_BAND_IMPORT
+from utils.bulk_import import run_import
+from utils.jobs import create_job
+from utils.serialization import list_response
 import io
 from datetime import datetime
 
 chain_band_api_bp = Blueprint('chain_band_api', __name__, url_prefix='/api/chain_band')
 
+CHAIN_BAND_FIELDS = ["id", "band", "area", "store", "remark"]
+
 
 @chain_band_api_bp.route('/list', methods=['GET'])
 def list_chain_bands():
@@ -15,21 +19,26 @@ def list_chain_bands():
     ---
     tags:
       - ChainBand
+    parameters:
+      - in: query
+        name: page
+        type: integer
+        required: false
+        description: 传入时分页返回，不传时流式返回完整数组
+      - in: query
+        name: per_page
+        type: integer
+        default: 20
+      - in: query
+        name: fields
+        type: string
+        required: false
+        description: 需要返回的字段，逗号分隔，例如 band,store
     responses:
       200:
         description: 返回品牌数据列表
     """
-    bands = ChainBandModel.query.all()
-    data = [
-        {
-            "id": b.id,
-            "band": b.band,
-            "area": b.area,
-            "store": b.store,
-            "remark": b.remark
-        } for b in bands
-    ]
-    return jsonify(data)
+    return list_response(ChainBandModel, CHAIN_BAND_FIELDS, request.args)
 
 
 @chain_band_api_bp.route('/add', methods=['POST'])
@@ -146,6 +155,16 @@ def import_chain_band():
         type: file
         required: true
         description: 包含品牌数据的 Excel 文件（.xlsx）
+      - in: query
+        name: chunk_size
+        type: integer
+        required: false
+        description: 每批写入的行数，默认取配置 IMPORT_CHUNK_SIZE
+      - in: query
+        name: async
+        type: integer
+        required: false
+        description: 为 1 时提交后台任务并立即返回 job_id，进度见 /api/job/{job_id}
     responses:
       200:
         description: 导入结果
@@ -155,32 +174,26 @@ def import_chain_band():
             message:
               type: string
     """
+    import pandas as pd
     file = request.files.get('file')
     if not file:
         return jsonify({"error": "未上传文件"}), 400
 
+    # ?async=1 时转为后台任务，立即返回任务 id
+    if request.args.get('async', type=int):
+        job = create_job('import', 'chain_band', {'chunk_size': request.args.get('chunk_size', type=int)}, file=file)
+        return jsonify({"message": "已提交后台导入", "job_id": job.id}), 202
+
     try:
         df = pd.read_excel(file, dtype=str)
     except Exception as e:
         return jsonify({"error": "无法读取Excel文件，请确认格式"}), 400
 
-    expected_fields = ["band", "area", "store", "remark"]
-    if list(df.columns[:len(expected_fields)]) != expected_fields:
+    if not CHAIN_BAND_IMPORT.header_matches(df):
         return jsonify({"error": "Excel表头不符合预期"}), 400
 
-    for _, row in df.iterrows():
-        row_data = row.to_dict()
-        band_name = row_data.get("band")
-        if not band_name or pd.isna(band_name):
-            continue
-        filtered_data = {
-            k: v for k, v in row_data.items() if pd.notna(v) and str(v).strip() != ''
-        }
-        band = ChainBandModel(**filtered_data)
-        db.session.add(band)
-
-    db.session.commit()
-    return jsonify({"message": "导入完成"})
+    report = run_import(CHAIN_BAND_IMPORT, df, chunk_size=request.args.get('chunk_size', type=int))
+    return jsonify({"message": "导入完成", "report": report})
 
 
 @chain_band_api_bp.route('/export', methods=['GET'])
@@ -196,6 +209,7 @@ def export_chain_band():
         schema:
           type: file
     """
+    import pandas as pd
     bands = ChainBandModel.query.all()
     if not bands:
         return jsonify({"error": "无可导出数据"}), 400
@@ -1,12 +1,22 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from exts import db
-from blueprint.chain_store import ChainStoreModel, ChainBandModel
-import pandas as pd
-import io
-from datetime import datetime
+from blueprint.chain_store import ChainStoreModel, ChainBandModel, CHAIN_STORE_IMPORT, export_chain_band_store
+from utils.bulk_import import run_import
+from utils.jobs import create_job
+from utils.list_filters import apply_list_filters
+from utils.pagination import keyset_list
+from utils.serialization import RowMapper
+from sqlalchemy import select
 
 chain_store_api_bp = Blueprint('chain_store_api', __name__, url_prefix='/api/chain_store')
 
+# 列表接口返回的字段
+CHAIN_STORE_LIST = RowMapper(ChainStoreModel, [
+    "id", "chain_store_name", "chain_band", "actual_people_count", "other_carrier",
+    "key_person_name", "key_person_phone", "competitor_services", "competitor_price",
+    "competitor_expiry", "visitor_name", "remarks", "update_time"
+])
+
 
 @chain_store_api_bp.route('/list', methods=['GET'])
 def list_chain_stores():
@@ -24,32 +34,77 @@ def list_chain_stores():
         name: per_page
         type: integer
         default: 20
+      - in: query
+        name: cursor
+        type: string
+        required: false
+        description: 传入时使用游标分页（首页传空字符串，之后传上一页返回的 next_cursor），不再计算 COUNT(*)
+      - in: query
+        name: with_total
+        type: integer
+        default: 0
+        description: 游标分页时为 1 则附带总数（无筛选条件时为缓存的近似值）
+      - in: query
+        name: name_prefix
+        type: string
+        description: 名称前缀
+      - in: query
+        name: name
+        type: string
+        description: 名称包含的关键字（n-gram 索引）
+      - in: query
+        name: visitor_name
+        type: string
+      - in: query
+        name: other_carrier
+        type: string
+      - in: query
+        name: expiry_from
+        type: string
+        description: 友商产品到期时间下限（日期，例如 2026-01-05），按解析后的到期日期比较
+      - in: query
+        name: expiry_to
+        type: string
+        description: 友商产品到期时间上限（日期），按解析后的到期日期比较
+      - in: query
+        name: update_from
+        type: string
+        description: 更新时间下限（yyyymmdd）
+      - in: query
+        name: update_to
+        type: string
+        description: 更新时间上限（yyyymmdd）
+      - in: query
+        name: sort
+        type: string
+        description: 排序字段，逗号分隔，前加 - 为倒序，例如 -update_time
     responses:
       200:
         description: 分页门店数据
     """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
-    pagination = ChainStoreModel.query.paginate(page=page, per_page=per_page, error_out=False)
-    stores = pagination.items
+    use_cursor = 'cursor' in request.args
+    try:
+        query, order_by, filtered = apply_list_filters(ChainStoreModel.query, 'chain_store', request.args)
+        # 只查询列表需要的列，结果为行元组
+        query = CHAIN_STORE_LIST.with_entities(query)
+        if use_cursor:
+            if order_by:
+                raise ValueError('游标分页只支持按 id 排序')
+            stores, cursor_meta = keyset_list(query, ChainStoreModel, request.args, per_page, filtered)
+        else:
+            query = query.order_by(*(order_by or [ChainStoreModel.id]))
+            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            stores = pagination.items
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    data = CHAIN_STORE_LIST.to_dicts(stores)
+
+    if use_cursor:
+        return jsonify({"data": data, **cursor_meta})
 
-    data = []
-    for s in stores:
-        data.append({
-            "id": s.id,
-            "chain_store_name": s.chain_store_name,
-            "chain_band": s.chain_band,
-            "actual_people_count": s.actual_people_count,
-            "other_carrier": s.other_carrier,
-            "key_person_name": s.key_person_name,
-            "key_person_phone": s.key_person_phone,
-            "competitor_services": s.competitor_services,
-            "competitor_price": s.competitor_price,
-            "competitor_expiry": s.competitor_expiry,
-            "visitor_name": s.visitor_name,
-            "remarks": s.remarks,
-            "update_time": s.update_time
-        })
     return jsonify({
         "total": pagination.total,
         "pages": pagination.pages,
@@ -205,48 +260,40 @@ def import_chain_stores():
         type: file
         required: true
         description: 包含门店数据的 Excel 文件（.xlsx）
+      - in: query
+        name: chunk_size
+        type: integer
+        required: false
+        description: 每批写入的行数，默认取配置 IMPORT_CHUNK_SIZE
+      - in: query
+        name: async
+        type: integer
+        required: false
+        description: 为 1 时提交后台任务并立即返回 job_id，进度见 /api/job/{job_id}
     responses:
       200:
         description: 导入结果
     """
+    import pandas as pd
     file = request.files.get('file')
     if not file:
         return jsonify({"error": "未上传文件"}), 400
 
+    # ?async=1 时转为后台任务，立即返回任务 id
+    if request.args.get('async', type=int):
+        job = create_job('import', 'chain_store', {'chunk_size': request.args.get('chunk_size', type=int)}, file=file)
+        return jsonify({"message": "已提交后台导入", "job_id": job.id}), 202
+
     try:
         df = pd.read_excel(file, dtype=str)
     except Exception as e:
         return jsonify({"error": "无法读取Excel文件，请确认格式"}), 400
 
-    expected_fields = [
-        "chain_store_name", "chain_band", "visitor_name", "actual_people_count",
-        "other_carrier", "key_person_name", "key_person_phone",
-        "competitor_services", "competitor_price", "competitor_expiry",
-        "remarks", "update_time"
-    ]
-
-    if list(df.columns[:len(expected_fields)]) != expected_fields:
+    if not CHAIN_STORE_IMPORT.header_matches(df):
         return jsonify({"error": "Excel表头不符合预期"}), 400
 
-    for _, row in df.iterrows():
-        row_data = row.to_dict()
-        name = row_data.get("chain_store_name")
-        if not name or pd.isna(name):
-            continue
-        if pd.isna(row_data.get("update_time")) or not str(row_data.get("update_time")).strip():
-            row_data["update_time"] = datetime.now().strftime('%Y%m%d')
-        store = ChainStoreModel.query.filter_by(chain_store_name=name).first()
-        if store:
-            for field, value in row_data.items():
-                if field != 'chain_store_name' and pd.notna(value) and str(value).strip() != '':
-                    setattr(store, field, value)
-        else:
-            filtered_data = {k: v for k, v in row_data.items() if pd.notna(v) and str(v).strip() != ''}
-            store = ChainStoreModel(**filtered_data)
-            db.session.add(store)
-
-    db.session.commit()
-    return jsonify({"message": "导入完成"})
+    report = run_import(CHAIN_STORE_IMPORT, df, chunk_size=request.args.get('chunk_size', type=int))
+    return jsonify({"message": "导入完成", "report": report})
 
 
 @chain_store_api_bp.route('/export', methods=['GET'])
@@ -256,63 +303,35 @@ def export_chain_stores():
     ---
     tags:
       - ChainStore
+    parameters:
+      - in: query
+        name: format
+        type: string
+        enum: [xlsx, csv]
+        default: xlsx
+        description: 导出格式，csv 会边查询边输出
+      - in: query
+        name: async
+        type: integer
+        required: false
+        description: 为 1 时提交后台任务并立即返回 job_id，进度见 /api/job/{job_id}
     responses:
       200:
-        description: 下载 Excel 文件
+        description: 下载 Excel 或 csv 文件
         schema:
           type: file
+      400:
+        description: 没有连锁企业或不支持的导出格式
     """
-    bs_list = ChainBandModel.query.all()
-    if not bs_list:
-        return jsonify({"error": "没有设置连锁企业"}), 400
-
-    output_data = []
-    for bs in bs_list:
-        store_detail = ChainStoreModel.query.filter_by(chain_store_name=bs.store).first()
-        row_dict = {
-            'band': bs.band,
-            'store': bs.store
-        }
-        if store_detail:
-            row_dict.update({
-                'actual_people_count': store_detail.actual_people_count,
-                'other_carrier': store_detail.other_carrier,
-                'key_person_name': store_detail.key_person_name,
-                'key_person_phone': store_detail.key_person_phone,
-                'competitor_services': store_detail.competitor_services,
-                'competitor_price': store_detail.competitor_price,
-                'competitor_expiry': store_detail.competitor_expiry,
-                'visitor_name': store_detail.visitor_name,
-                'remarks': store_detail.remarks,
-                'update_time': store_detail.update_time
-            })
-        else:
-            row_dict.update({
-                'actual_people_count': '', 'other_carrier': '', 'key_person_name': '',
-                'key_person_phone': '', 'competitor_services': '', 'competitor_price': '',
-                'competitor_expiry': '', 'visitor_name': '', 'remarks': '', 'update_time': ''
-            })
-        output_data.append(row_dict)
+    export_format = request.args.get('format', 'xlsx')
+    if export_format not in ('xlsx', 'csv'):
+        return jsonify({"error": "不支持的导出格式"}), 400
 
-    df = pd.DataFrame(output_data)
-    df.rename(columns={
-        "band": "连锁品牌名称", "store": "连锁商铺名称",
-        "actual_people_count": "单位实际人数", "other_carrier": "异网运营商",
-        "key_person_name": "关键人姓名", "key_person_phone": "关键人电话",
-        "competitor_services": "友商已有业务", "competitor_price": "友商合同价格",
-        "competitor_expiry": "友商产品到期时间", "visitor_name": "拜访人",
-        "remarks": "备注", "update_time": "更新时间"
-    }, inplace=True)
+    if db.session.execute(select(ChainBandModel.id).limit(1)).first() is None:
+        return jsonify({"error": "没有设置连锁企业"}), 400
 
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='连锁品牌商铺导出')
-    output.seek(0)
+    if request.args.get('async', type=int):
+        job = create_job('export', 'chain_band_store', {'format': export_format})
+        return jsonify({"message": "已提交后台导出", "job_id": job.id}), 202
 
-    now_str = datetime.now().strftime('%Y%m%d_%H%M%S')
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=f"连锁品牌商铺导出_{now_str}.xlsx",
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
\ No newline at end of file
+    return export_chain_band_store(export_format)
@@ -1,12 +1,26 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from exts import db
-from blueprint.company import CompanyModel, BusinessParkModel
+from blueprint.company import (CompanyModel, BusinessParkModel, COMPANY_IMPORT, PARK_COMPANY_EXPORT_COLUMNS,
+                               park_company_rows)
+from utils.bulk_import import run_import
+from utils.jobs import create_job
+from utils.list_filters import apply_list_filters
+from utils.pagination import keyset_list
+from utils.serialization import RowMapper
+from utils.excel_export import stream_xlsx
+from sqlalchemy import select
 from datetime import datetime
-import pandas as pd
-import io
 
 company_api_bp = Blueprint('company_api', __name__, url_prefix='/api/company')
 
+# 列表接口返回的字段
+COMPANY_LIST = RowMapper(CompanyModel, [
+    "id", "company_name", "actual_people_count", "other_carrier", "key_person_name",
+    "key_person_phone", "competitor_services", "competitor_price", "competitor_expiry",
+    "visitor_name", "remarks", "update_time", "business_park", "business_park_id"
+])
+
+
 @company_api_bp.route('/list', methods=['GET'])
 def list_companies():
     """
@@ -23,32 +37,76 @@ def list_companies():
         name: per_page
         type: integer
         default: 20
+      - in: query
+        name: cursor
+        type: string
+        required: false
+        description: 传入时使用游标分页（首页传空字符串，之后传上一页返回的 next_cursor），不再计算 COUNT(*)
+      - in: query
+        name: with_total
+        type: integer
+        default: 0
+        description: 游标分页时为 1 则附带总数（无筛选条件时为缓存的近似值）
+      - in: query
+        name: name_prefix
+        type: string
+        description: 名称前缀
+      - in: query
+        name: name
+        type: string
+        description: 名称包含的关键字（n-gram 索引）
+      - in: query
+        name: visitor_name
+        type: string
+      - in: query
+        name: other_carrier
+        type: string
+      - in: query
+        name: expiry_from
+        type: string
+        description: 友商产品到期时间下限（日期，例如 2026-01-05），按解析后的到期日期比较
+      - in: query
+        name: expiry_to
+        type: string
+        description: 友商产品到期时间上限（日期），按解析后的到期日期比较
+      - in: query
+        name: update_from
+        type: string
+        description: 更新时间下限（yyyymmdd）
+      - in: query
+        name: update_to
+        type: string
+        description: 更新时间上限（yyyymmdd）
+      - in: query
+        name: sort
+        type: string
+        description: 排序字段，逗号分隔，前加 - 为倒序，例如 -update_time
     responses:
       200:
         description: 企业列表数据
     """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
-    pagination = CompanyModel.query.paginate(page=page, per_page=per_page, error_out=False)
-    companies = pagination.items
+    use_cursor = 'cursor' in request.args
+    try:
+        query, order_by, filtered = apply_list_filters(CompanyModel.query, 'company', request.args)
+        # 只查询列表需要的列，结果为行元组
+        query = COMPANY_LIST.with_entities(query)
+        if use_cursor:
+            if order_by:
+                raise ValueError('游标分页只支持按 id 排序')
+            companies, cursor_meta = keyset_list(query, CompanyModel, request.args, per_page, filtered)
+        else:
+            query = query.order_by(*(order_by or [CompanyModel.id]))
+            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            companies = pagination.items
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    data = COMPANY_LIST.to_dicts(companies)
 
-    data = []
-    for c in companies:
-        data.append({
-            "id": c.id,
-            "company_name": c.company_name,
-            "actual_people_count": c.actual_people_count,
-            "other_carrier": c.other_carrier,
-            "key_person_name": c.key_person_name,
-            "key_person_phone": c.key_person_phone,
-            "competitor_services": c.competitor_services,
-            "competitor_price": c.competitor_price,
-            "competitor_expiry": c.competitor_expiry,
-            "visitor_name": c.visitor_name,
-            "remarks": c.remarks,
-            "update_time": c.update_time,
-            "business_park": c.business_park
-        })
+    if use_cursor:
+        return jsonify({"data": data, **cursor_meta})
 
     return jsonify({
         "data": data,
@@ -217,6 +275,16 @@ def import_companies():
         type: file
         required: true
         description: 包含企业数据的 Excel 文件（.xlsx）
+      - in: query
+        name: chunk_size
+        type: integer
+        required: false
+        description: 每批写入的行数，默认取配置 IMPORT_CHUNK_SIZE
+      - in: query
+        name: async
+        type: integer
+        required: false
+        description: 为 1 时提交后台任务并立即返回 job_id，进度见 /api/job/{job_id}
     responses:
       200:
         description: 导入结果
@@ -225,49 +293,30 @@ def import_companies():
           properties:
             message:
               type: string
+            report:
+              type: object
+              description: 新增/更新/跳过行数及每批耗时
     """
+    import pandas as pd
     file = request.files.get('file')
     if not file:
         return jsonify({"error": "未上传文件"}), 400
 
+    # ?async=1 时转为后台任务，立即返回任务 id
+    if request.args.get('async', type=int):
+        job = create_job('import', 'company', {'chunk_size': request.args.get('chunk_size', type=int)}, file=file)
+        return jsonify({"message": "已提交后台导入", "job_id": job.id}), 202
+
     try:
         df = pd.read_excel(file, dtype=str)
     except Exception as e:
         return jsonify({"error": "无法读取Excel文件，请确认格式"}), 400
 
-    expected_fields = [
-        "company_name", "visitor_name", "actual_people_count",
-        "other_carrier", "key_person_name", "key_person_phone",
-        "competitor_services", "competitor_price", "competitor_expiry",
-        "remarks", "update_time"
-    ]
-
-    if list(df.columns[:len(expected_fields)]) != expected_fields:
+    if not COMPANY_IMPORT.header_matches(df):
         return jsonify({"error": "Excel表头不符合预期"}), 400
 
-    for _, row in df.iterrows():
-        row_data = row.to_dict()
-        company_name = row_data.get("company_name")
-        if not company_name or pd.isna(company_name):
-            continue
-
-        if pd.isna(row_data.get("update_time")) or not str(row_data.get("update_time")).strip():
-            row_data["update_time"] = datetime.now().strftime('%Y%m%d')
-
-        company = CompanyModel.query.filter_by(company_name=company_name).first()
-        if company:
-            for field, value in row_data.items():
-                if field != 'company_name' and pd.notna(value) and str(value).strip() != '':
-                    setattr(company, field, value)
-        else:
-            filtered_data = {
-                k: v for k, v in row_data.items() if pd.notna(v) and str(v).strip() != ''
-            }
-            company = CompanyModel(**filtered_data)
-            db.session.add(company)
-
-    db.session.commit()
-    return jsonify({"message": "导入完成"})
+    report = run_import(COMPANY_IMPORT, df, chunk_size=request.args.get('chunk_size', type=int))
+    return jsonify({"message": "导入完成", "report": report})
 
 
 @company_api_bp.route('/export', methods=['GET'])
@@ -277,62 +326,29 @@ def export_park_company():
     ---
     tags:
       - Company
+    parameters:
+      - in: query
+        name: async
+        type: integer
+        required: false
+        description: 为 1 时提交后台任务并立即返回 job_id，进度见 /api/job/{job_id}
     responses:
       200:
         description: 返回 Excel 文件
         schema:
           type: file
     """
-    pc_list = BusinessParkModel.query.all()
-    if not pc_list:
+    if db.session.execute(select(BusinessParkModel.id).limit(1)).first() is None:
         return jsonify({"error": "没有楼园数据"}), 400
 
-    output_data = []
-    for pc in pc_list:
-        company_detail = CompanyModel.query.filter_by(company_name=pc.company_name).first()
-        row_dict = {
-            'name': pc.name,
-            'company_name': pc.company_name
-        }
-        if company_detail:
-            row_dict.update({
-                'actual_people_count': company_detail.actual_people_count,
-                'other_carrier': company_detail.other_carrier,
-                'key_person_name': company_detail.key_person_name,
-                'key_person_phone': company_detail.key_person_phone,
-                'competitor_services': company_detail.competitor_services,
-                'competitor_price': company_detail.competitor_price,
-                'competitor_expiry': company_detail.competitor_expiry,
-                'visitor_name': company_detail.visitor_name,
-                'remarks': company_detail.remarks,
-                'update_time': company_detail.update_time
-            })
-        else:
-            row_dict.update({
-                'actual_people_count': '', 'other_carrier': '', 'key_person_name': '',
-                'key_person_phone': '', 'competitor_services': '', 'competitor_price': '',
-                'competitor_expiry': '', 'visitor_name': '', 'remarks': '', 'update_time': ''
-            })
-        output_data.append(row_dict)
-
-    df = pd.DataFrame(output_data)
-    df.rename(columns={
-        "name": "楼园名称", "company_name": "企业名称", "actual_people_count": "单位实际人数",
-        "other_carrier": "异网运营商", "key_person_name": "关键人姓名", "key_person_phone": "关键人电话",
-        "competitor_services": "友商已有业务", "competitor_price": "友商合同价格",
-        "competitor_expiry": "友商产品到期时间", "visitor_name": "拜访人", "remarks": "备注",
-        "update_time": "更新时间"
-    }, inplace=True)
-
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='楼园企业导出')
-    output.seek(0)
+    if request.args.get('async', type=int):
+        job = create_job('export', 'park_company', {'format': 'xlsx'})
+        return jsonify({"message": "已提交后台导出", "job_id": job.id}), 202
 
     now_str = datetime.now().strftime('%Y%m%d_%H%M%S')
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=f"楼园企业导出_{now_str}.xlsx",
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return stream_xlsx(
+        park_company_rows(),
+        headers=[title for _, title in PARK_COMPANY_EXPORT_COLUMNS],
+        sheet_name='楼园企业导出',
+        download_name=f"楼园企业导出_{now_str}.xlsx"
     )
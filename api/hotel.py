@@ -1,12 +1,24 @@
 from flask import Blueprint, request, jsonify, send_file
 from exts import db
-from blueprint.hotel import HotelModel
+from blueprint.hotel import HotelModel, HOTEL_IMPORT
+from utils.bulk_import import run_import
+from utils.jobs import create_job
+from utils.list_filters import apply_list_filters
+from utils.pagination import keyset_list
+from utils.serialization import RowMapper
+from sqlalchemy.orm import joinedload
 from datetime import datetime
-import pandas as pd
 import io
 
 hotel_api_bp = Blueprint('hotel_api', __name__, url_prefix='/api/hotel')
 
+# 列表接口返回的字段
+HOTEL_LIST = RowMapper(HotelModel, [
+    "id", "hotel_name", "actual_people_count", "other_carrier", "key_person_name",
+    "key_person_phone", "competitor_services", "competitor_price", "competitor_expiry",
+    "visitor_name", "remarks", "update_time", "business_park", "business_park_id"
+])
+
 
 @hotel_api_bp.route('/list', methods=['GET'])
 def list_hotels():
@@ -24,32 +36,77 @@ def list_hotels():
         name: per_page
         type: integer
         default: 20
+      - in: query
+        name: cursor
+        type: string
+        required: false
+        description: 传入时使用游标分页（首页传空字符串，之后传上一页返回的 next_cursor），不再计算 COUNT(*)
+      - in: query
+        name: with_total
+        type: integer
+        default: 0
+        description: 游标分页时为 1 则附带总数（无筛选条件时为缓存的近似值）
+      - in: query
+        name: name_prefix
+        type: string
+        description: 名称前缀
+      - in: query
+        name: name
+        type: string
+        description: 名称包含的关键字（n-gram 索引）
+      - in: query
+        name: visitor_name
+        type: string
+      - in: query
+        name: other_carrier
+        type: string
+      - in: query
+        name: expiry_from
+        type: string
+        description: 友商产品到期时间下限（日期，例如 2026-01-05），按解析后的到期日期比较
+      - in: query
+        name: expiry_to
+        type: string
+        description: 友商产品到期时间上限（日期），按解析后的到期日期比较
+      - in: query
+        name: update_from
+        type: string
+        description: 更新时间下限（yyyymmdd）
+      - in: query
+        name: update_to
+        type: string
+        description: 更新时间上限（yyyymmdd）
+      - in: query
+        name: sort
+        type: string
+        description: 排序字段，逗号分隔，前加 - 为倒序，例如 -update_time
     responses:
       200:
         description: 酒店列表数据
     """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
-    pagination = HotelModel.query.paginate(page=page, per_page=per_page, error_out=False)
-    hotels = pagination.items
+    use_cursor = 'cursor' in request.args
+    try:
+        query, order_by, filtered = apply_list_filters(HotelModel.query, 'hotel', request.args)
+        # 只查询列表需要的列，结果为行元组
+        query = HOTEL_LIST.with_entities(query)
+        if use_cursor:
+            if order_by:
+                raise ValueError('游标分页只支持按 id 排序')
+            hotels, cursor_meta = keyset_list(query, HotelModel, request.args, per_page, filtered)
+        else:
+            query = query.order_by(*(order_by or [HotelModel.id]))
+            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            hotels = pagination.items
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    data = HOTEL_LIST.to_dicts(hotels)
+
+    if use_cursor:
+        return jsonify({"data": data, **cursor_meta})
 
-    data = []
-    for h in hotels:
-        data.append({
-            "id": h.id,
-            "hotel_name": h.hotel_name,
-            "actual_people_count": h.actual_people_count,
-            "other_carrier": h.other_carrier,
-            "key_person_name": h.key_person_name,
-            "key_person_phone": h.key_person_phone,
-            "competitor_services": h.competitor_services,
-            "competitor_price": h.competitor_price,
-            "competitor_expiry": h.competitor_expiry,
-            "visitor_name": h.visitor_name,
-            "remarks": h.remarks,
-            "update_time": h.update_time,
-            "business_park": h.business_park
-        })
     return jsonify({
         "total": pagination.total,
         "pages": pagination.pages,
@@ -206,51 +263,40 @@ def import_hotels():
         type: file
         required: true
         description: 包含酒店数据的 Excel 文件（.xlsx）
+      - in: query
+        name: chunk_size
+        type: integer
+        required: false
+        description: 每批写入的行数，默认取配置 IMPORT_CHUNK_SIZE
+      - in: query
+        name: async
+        type: integer
+        required: false
+        description: 为 1 时提交后台任务并立即返回 job_id，进度见 /api/job/{job_id}
     responses:
       200:
         description: 导入成功
     """
+    import pandas as pd
     file = request.files.get('file')
     if not file:
         return jsonify({"error": "未上传文件"}), 400
 
+    # ?async=1 时转为后台任务，立即返回任务 id
+    if request.args.get('async', type=int):
+        job = create_job('import', 'hotel', {'chunk_size': request.args.get('chunk_size', type=int)}, file=file)
+        return jsonify({"message": "已提交后台导入", "job_id": job.id}), 202
+
     try:
         df = pd.read_excel(file, dtype=str)
     except Exception as e:
         return jsonify({"error": "无法读取Excel文件，请确认格式"}), 400
 
-    expected_fields = [
-        "hotel_name", "visitor_name", "actual_people_count", "other_carrier",
-        "key_person_name", "key_person_phone", "competitor_services",
-        "competitor_price", "competitor_expiry", "remarks", "update_time"
-    ]
-
-    if list(df.columns[:len(expected_fields)]) != expected_fields:
+    if not HOTEL_IMPORT.header_matches(df):
         return jsonify({"error": "Excel表头不符合预期"}), 400
 
-    for _, row in df.iterrows():
-        row_data = row.to_dict()
-        hotel_name = row_data.get("hotel_name")
-        if not hotel_name or pd.isna(hotel_name):
-            continue
-
-        if pd.isna(row_data.get("update_time")) or not str(row_data.get("update_time")).strip():
-            row_data["update_time"] = datetime.now().strftime('%Y%m%d')
-
-        hotel = HotelModel.query.filter_by(hotel_name=hotel_name).first()
-        if hotel:
-            for field, value in row_data.items():
-                if field != 'hotel_name' and pd.notna(value) and str(value).strip() != '':
-                    setattr(hotel, field, value)
-        else:
-            filtered_data = {
-                k: v for k, v in row_data.items() if pd.notna(v) and str(v).strip() != ''
-            }
-            hotel = HotelModel(**filtered_data)
-            db.session.add(hotel)
-
-    db.session.commit()
-    return jsonify({"message": "导入完成"})
+    report = run_import(HOTEL_IMPORT, df, chunk_size=request.args.get('chunk_size', type=int))
+    return jsonify({"message": "导入完成", "report": report})
 
 
 @hotel_api_bp.route('/export', methods=['GET'])
@@ -266,7 +312,8 @@ def export_hotels():
         schema:
           type: file
     """
-    hotels = HotelModel.query.all()
+    import pandas as pd
+    hotels = HotelModel.query.options(joinedload(HotelModel.park)).all()
     if not hotels:
         return jsonify({"error": "无可导出数据"}), 400
 
@@ -274,7 +321,7 @@ def export_hotels():
     for h in hotels:
         data.append({
             "hotel_name": h.hotel_name,
-            "business_park": h.business_park,
+            "business_park": h.park.name if h.park else h.business_park,
             "visitor_name": h.visitor_name,
             "actual_people_count": h.actual_people_count,
             "other_carrier": h.other_carrier,
@@ -0,0 +1,145 @@
+import os
+
+from flask import Blueprint, request, jsonify, send_file
+from exts import db
+from utils.jobs import JobModel, JOB_DONE, JobError, create_job, import_specs, export_sources
+
+job_api_bp = Blueprint('job_api', __name__, url_prefix='/api/job')
+
+
+@job_api_bp.app_errorhandler(JobError)
+def job_error(e):
+    # 各列表接口的 ?async=1 也会提交任务，统一在这里返回 400
+    return jsonify({"error": str(e)}), 400
+
+
+@job_api_bp.route('/import/<target>', methods=['POST'])
+def submit_import(target):
+    """
+    提交后台导入任务（Excel），立即返回任务 id
+    ---
+    tags:
+      - Job
+    consumes:
+      - multipart/form-data
+    parameters:
+      - in: path
+        name: target
+        type: string
+        required: true
+        enum: [company, hotel, chain_store, chain_band, park]
+      - in: formData
+        name: file
+        type: file
+        required: true
+        description: 待导入的 Excel 文件（.xlsx）
+      - in: query
+        name: chunk_size
+        type: integer
+        required: false
+        description: 每批写入的行数，默认取配置 IMPORT_CHUNK_SIZE
+    responses:
+      202:
+        description: 任务已提交
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            job_id:
+              type: string
+    """
+    if target not in import_specs():
+        return jsonify({"error": "不支持的导入类型"}), 404
+
+    file = request.files.get('file')
+    if not file:
+        return jsonify({"error": "未上传文件"}), 400
+
+    job = create_job('import', target, {'chunk_size': request.args.get('chunk_size', type=int)}, file=file)
+    return jsonify({"message": "已提交后台导入", "job_id": job.id}), 202
+
+
+@job_api_bp.route('/export/<target>', methods=['POST'])
+def submit_export(target):
+    """
+    提交后台导出任务，立即返回任务 id
+    ---
+    tags:
+      - Job
+    parameters:
+      - in: path
+        name: target
+        type: string
+        required: true
+        enum: [park_company, chain_band_store]
+      - in: query
+        name: format
+        type: string
+        enum: [xlsx, csv]
+        default: xlsx
+    responses:
+      202:
+        description: 任务已提交
+    """
+    if target not in export_sources():
+        return jsonify({"error": "不支持的导出类型"}), 404
+
+    export_format = request.args.get('format', 'xlsx')
+    if export_format not in ('xlsx', 'csv'):
+        return jsonify({"error": "不支持的导出格式"}), 400
+
+    job = create_job('export', target, {'format': export_format})
+    return jsonify({"message": "已提交后台导出", "job_id": job.id}), 202
+
+
+@job_api_bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    查询任务状态与进度
+    ---
+    tags:
+      - Job
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: 任务状态、已解析行数、已写入行数及错误信息
+    """
+    job = db.session.get(JobModel, job_id)
+    if not job:
+        return jsonify({"error": "任务不存在"}), 404
+    return jsonify(job.to_dict())
+
+
+@job_api_bp.route('/<job_id>/download', methods=['GET'])
+def download_job(job_id):
+    """
+    下载导出任务生成的文件
+    ---
+    tags:
+      - Job
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: 导出文件
+        schema:
+          type: file
+      410:
+        description: 导出文件已过期（保留 JOB_RETENTION_SECONDS 秒）
+    """
+    job = db.session.get(JobModel, job_id)
+    if not job:
+        return jsonify({"error": "任务不存在"}), 404
+    if job.kind != 'export' or job.status != JOB_DONE:
+        return jsonify({"error": "任务尚未完成或没有可下载的文件"}), 400
+    if not job.result_path or not os.path.exists(job.result_path):
+        return jsonify({"error": "导出文件已过期，请重新导出"}), 410
+    return send_file(job.result_path, as_attachment=True, download_name=job.download_name)
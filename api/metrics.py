@@ -0,0 +1,24 @@
+from flask import Blueprint, Response
+
+from utils.metrics import collect, render
+
+metrics_api_bp = Blueprint('metrics_api', __name__)
+
+
+@metrics_api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    请求耗时、SQL 查询数、连接池等指标（Prometheus 文本格式，供采集器抓取）
+    ---
+    tags:
+      - System
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: >
+          http_request_duration_seconds、db_queries_per_request 为按接口（endpoint）的直方图；
+          n_plus_one_requests_total 为 SQL 条数超过 N_PLUS_ONE_THRESHOLD 的请求数。
+          多 worker 部署且配置了 METRICS_DIR 时为所有 worker 的汇总
+    """
+    return Response(render(collect()), mimetype='text/plain', content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,149 @@
+import math
+from datetime import date, timedelta
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func, literal, select, union_all
+
+from exts import db
+from blueprint.company import CompanyModel
+from blueprint.hotel import HotelModel
+from blueprint.chain_store import ChainStoreModel
+from utils.normalization import parse_dates, parse_value
+
+renewal_api_bp = Blueprint('renewal_api', __name__, url_prefix='/api/renewal')
+
+# 实体 -> (模型, 名称列)
+RENEWAL_SOURCES = {
+    'company': (CompanyModel, CompanyModel.company_name),
+    'hotel': (HotelModel, HotelModel.hotel_name),
+    'chain_store': (ChainStoreModel, ChainStoreModel.chain_store_name),
+}
+
+RENEWAL_SORTS = {
+    'expiry': ('competitor_expiry_date', False),
+    '-expiry': ('competitor_expiry_date', True),
+    'price': ('competitor_price_value', False),
+    '-price': ('competitor_price_value', True),
+}
+
+
+def renewal_select(entity, model, name_column, start, end):
+    return select(
+        literal(entity).label('entity'),
+        model.id.label('id'),
+        name_column.label('name'),
+        model.other_carrier.label('other_carrier'),
+        model.competitor_services.label('competitor_services'),
+        model.competitor_price.label('competitor_price'),
+        model.competitor_price_value.label('competitor_price_value'),
+        model.competitor_expiry.label('competitor_expiry'),
+        model.competitor_expiry_date.label('competitor_expiry_date'),
+        model.key_person_name.label('key_person_name'),
+        model.key_person_phone.label('key_person_phone'),
+        model.visitor_name.label('visitor_name'),
+    ).where(model.competitor_expiry_date.between(start, end))
+
+
+def parse_date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = parse_value(parse_dates, value)
+    if parsed is None:
+        raise ValueError(f'日期格式不正确：{name}={value}')
+    return parsed
+
+
+@renewal_api_bp.route('/list', methods=['GET'])
+def list_renewals():
+    """
+    友商合同即将到期的企业、酒店、连锁门店（按解析后的到期日期查询）
+    ---
+    tags:
+      - Renewal
+    parameters:
+      - in: query
+        name: days
+        type: integer
+        default: 90
+        description: 从 from 起多少天内到期，传 to 时忽略
+      - in: query
+        name: from
+        type: string
+        required: false
+        description: 到期日期下限，默认今天
+      - in: query
+        name: to
+        type: string
+        required: false
+        description: 到期日期上限
+      - in: query
+        name: entity
+        type: string
+        required: false
+        description: 实体类型，逗号分隔，可选 company,hotel,chain_store，默认全部
+      - in: query
+        name: sort
+        type: string
+        default: expiry
+        enum: [expiry, -expiry, price, -price]
+      - in: query
+        name: page
+        type: integer
+        default: 1
+      - in: query
+        name: per_page
+        type: integer
+        default: 20
+    responses:
+      200:
+        description: 到期记录分页列表，entity 表示记录类型
+      400:
+        description: 参数错误
+    """
+    try:
+        start = parse_date_arg('from') or date.today()
+        end = parse_date_arg('to') or start + timedelta(days=max(request.args.get('days', 90, type=int), 0))
+        entities = [e.strip() for e in request.args.get('entity', '').split(',') if e.strip()] or list(RENEWAL_SOURCES)
+        unknown = [e for e in entities if e not in RENEWAL_SOURCES]
+        if unknown:
+            raise ValueError(f'不支持的实体：{",".join(unknown)}')
+        sort = request.args.get('sort', 'expiry')
+        if sort not in RENEWAL_SORTS:
+            raise ValueError(f'不支持的排序：{sort}')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(request.args.get('per_page', 20, type=int), 1)
+
+    # 每个分支都走各自表上 competitor_expiry_date 的索引
+    windows = union_all(*[
+        renewal_select(entity, *RENEWAL_SOURCES[entity], start, end) for entity in entities
+    ]).subquery('renewal')
+    column, descending = RENEWAL_SORTS[sort]
+    order = windows.c[column].desc() if descending else windows.c[column]
+    rows = db.session.execute(
+        select(windows)
+        .order_by(order, windows.c.entity, windows.c.id)
+        .limit(per_page).offset((page - 1) * per_page)
+    ).mappings().all()
+    total = db.session.execute(select(func.count()).select_from(windows)).scalar()
+
+    data = []
+    for row in rows:
+        item = dict(row)
+        item['competitor_expiry_date'] = row['competitor_expiry_date'].isoformat()
+        if row['competitor_price_value'] is not None:
+            item['competitor_price_value'] = float(row['competitor_price_value'])
+        data.append(item)
+
+    return jsonify({
+        "data": data,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "pages": math.ceil(total / per_page) if total else 0
+    })
@@ -0,0 +1,59 @@
+import math
+
+from flask import Blueprint, request, jsonify
+
+from utils.global_search import GLOBAL_SEARCHABLE, search
+
+search_api_bp = Blueprint('search_api', __name__, url_prefix='/api/search')
+
+
+@search_api_bp.route('', methods=['GET'])
+def unified_search():
+    """
+    跨企业、酒店、连锁门店的统一搜索（名称、关键人、关键人电话、拜访人）
+    ---
+    tags:
+      - Search
+    parameters:
+      - in: query
+        name: q
+        type: string
+        required: true
+        description: 关键字，名称和关键人支持包含匹配，电话支持前几位或尾号
+      - in: query
+        name: entity
+        type: string
+        required: false
+        description: 实体类型，逗号分隔，可选 company,hotel,chain_store，默认全部
+      - in: query
+        name: page
+        type: integer
+        default: 1
+      - in: query
+        name: per_page
+        type: integer
+        default: 20
+    responses:
+      200:
+        description: 按相关度从高到低的结果，entity 表示记录类型，entity_id 为该类型下的 id
+      400:
+        description: 参数错误
+    """
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({"error": "请输入搜索关键字"}), 400
+    entities = [e.strip() for e in request.args.get('entity', '').split(',') if e.strip()]
+    unknown = [e for e in entities if e not in GLOBAL_SEARCHABLE]
+    if unknown:
+        return jsonify({"error": f'不支持的实体：{",".join(unknown)}'}), 400
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    data, total = search(text, entities or None, page, per_page)
+    return jsonify({
+        "data": data,
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "pages": math.ceil(total / per_page) if total else 0
+    })
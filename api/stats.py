@@ -0,0 +1,155 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func, select
+
+from exts import db
+from utils.stats import ROLLUPS, TOTAL, StatsRollupModel, rollup
+
+stats_api_bp = Blueprint('stats_api', __name__, url_prefix='/api/stats')
+
+# 支持的统计维度，见各模型的 register_rollup
+DIMENSIONS = ['visitor', 'carrier', 'park', 'brand', 'month']
+
+# 可在数据库中聚合的数值影子列，见 utils.normalization
+METRICS = {
+    'people': 'actual_people_count_value',
+    'price': 'competitor_price_value',
+}
+
+
+@stats_api_bp.route('/summary', methods=['GET'])
+def stats_summary():
+    """
+    各实体记录总数（读汇总表）
+    ---
+    tags:
+      - Stats
+    responses:
+      200:
+        description: 例如 {"company": 120, "hotel": 30, "chain_store": 56}
+    """
+    stmt = select(StatsRollupModel.entity, StatsRollupModel.count).where(StatsRollupModel.dimension == TOTAL)
+    totals = {entity: 0 for entity in ROLLUPS}
+    totals.update({entity: count for entity, count in db.session.execute(stmt)})
+    return jsonify(totals)
+
+
+@stats_api_bp.route('/aggregate', methods=['GET'])
+def stats_aggregate():
+    """
+    按维度对人数、友商价格做数据库聚合（基于解析后的数值影子列）
+    ---
+    tags:
+      - Stats
+    parameters:
+      - in: query
+        name: entity
+        type: string
+        required: true
+        enum: [company, hotel, chain_store]
+      - in: query
+        name: metric
+        type: string
+        required: true
+        enum: [people, price]
+        description: people 单位实际人数，price 友商合同价格
+      - in: query
+        name: by
+        type: string
+        required: true
+        enum: [visitor, carrier, park, brand]
+        description: 分组维度，park 仅企业、酒店，brand 仅连锁门店
+    responses:
+      200:
+        description: 每组有数值的记录数及合计、平均、最小、最大值，按合计从大到小
+      400:
+        description: 参数不支持
+    """
+    entity = request.args.get('entity')
+    metric = request.args.get('metric')
+    by = request.args.get('by')
+    if entity not in ROLLUPS:
+        return jsonify({"error": f"不支持的实体：{entity}"}), 400
+    if metric not in METRICS:
+        return jsonify({"error": f"不支持的指标：{metric}"}), 400
+    model, dimensions = ROLLUPS[entity]
+    if by == 'month' or by not in dimensions:
+        return jsonify({"error": f"{entity} 不支持按 {by} 分组"}), 400
+
+    group = getattr(model, dimensions[by])
+    value = getattr(model, METRICS[metric])
+    total = func.sum(value).label('sum')
+    stmt = (
+        select(group, func.count(value), total, func.avg(value), func.min(value), func.max(value))
+        .where(value.isnot(None))
+        .group_by(group)
+        .order_by(total.desc())
+    )
+    data = [{
+        "key": key or '',
+        "count": count,
+        "sum": float(value_sum),
+        "avg": round(float(value_avg), 2),
+        "min": float(value_min),
+        "max": float(value_max)
+    } for key, count, value_sum, value_avg, value_min, value_max in db.session.execute(stmt)]
+    return jsonify({"entity": entity, "metric": metric, "by": by, "data": data})
+
+
+@stats_api_bp.route('/<dimension>', methods=['GET'])
+def stats_by_dimension(dimension):
+    """
+    按维度统计拜访记录数（读汇总表）
+    ---
+    tags:
+      - Stats
+    parameters:
+      - in: path
+        name: dimension
+        type: string
+        required: true
+        enum: [visitor, carrier, park, brand, month]
+        description: visitor 拜访人，carrier 异网运营商，park 楼园（企业、酒店），brand 品牌（连锁门店），month 更新月份
+      - in: query
+        name: entity
+        type: string
+        required: false
+        enum: [company, hotel, chain_store]
+        description: 只统计该实体，不传时合计
+      - in: query
+        name: top
+        type: integer
+        required: false
+        description: 只返回前 N 项
+    responses:
+      200:
+        description: 统计结果，key 为空字符串表示未填写
+        schema:
+          type: object
+          properties:
+            dimension:
+              type: string
+            entity:
+              type: string
+            data:
+              type: array
+              items:
+                type: object
+                properties:
+                  key:
+                    type: string
+                  count:
+                    type: integer
+      400:
+        description: 维度或实体不支持
+    """
+    if dimension not in DIMENSIONS:
+        return jsonify({"error": f"不支持的统计维度：{dimension}"}), 400
+    entity = request.args.get('entity')
+    if entity and entity not in ROLLUPS:
+        return jsonify({"error": f"不支持的实体：{entity}"}), 400
+    top = request.args.get('top', type=int)
+    return jsonify({
+        "dimension": dimension,
+        "entity": entity,
+        "data": rollup(dimension, entity, top if top and top > 0 else None)
+    })
@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify
+
+from exts import db
+from utils.db_pool import pool_stats
+
+system_api_bp = Blueprint('system_api', __name__, url_prefix='/api/system')
+
+
+@system_api_bp.route('/pool', methods=['GET'])
+def get_pool_stats():
+    """
+    当前 worker 进程的数据库连接池状态
+    ---
+    tags:
+      - System
+    responses:
+      200:
+        description: >
+          size/checked_in/checked_out/overflow 为连接池当前状态；
+          checkouts、timeouts、connects、invalidations、wait_*_ms 为进程启动以来的累计值（仅 MySQL 连接池统计）。
+          多 worker 部署时每次请求由其中一个 worker 响应，pid 表示响应的进程
+    """
+    return jsonify(pool_stats(db.engine))
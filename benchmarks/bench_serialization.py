@@ -0,0 +1,105 @@
+'''
+列表接口序列化耗时对比
+
+在内存 SQLite 中生成企业数据，对比两种序列化方式每次请求的 CPU 时间：
+  orm     原实现：查询 ORM 对象，逐个属性拼字典，标准库 json 编码
+  rows    现实现：只查询列表列（行元组），RowMapper 拼字典，orjson 编码
+
+用法：
+  python benchmarks/bench_serialization.py --rows 10000 --per-page 500 --repeat 20
+'''
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import config
+from exts import db
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_ECHO'] = False
+    db.init_app(app)
+    from api.company import company_api_bp
+    app.register_blueprint(company_api_bp)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(rows):
+    from blueprint.company import CompanyModel
+    db.session.execute(CompanyModel.__table__.insert(), [{
+        'company_name': f'企业{i:06d}',
+        'actual_people_count': str(i % 500),
+        'other_carrier': ('移动', '联通', '电信')[i % 3],
+        'key_person_name': f'联系人{i}',
+        'key_person_phone': f'138{i:08d}',
+        'competitor_services': '宽带',
+        'competitor_price': '199',
+        'competitor_expiry': '2025-12-31',
+        'visitor_name': f'走访人{i % 20}',
+        'remarks': '备注' * 10,
+        'update_time': '20250101',
+        'business_park': f'园区{i % 50}',
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def orm_page(per_page):
+    '''原实现：ORM 对象 + 手工拼字典 + 标准库 json'''
+    from api.company import COMPANY_LIST
+    from blueprint.company import CompanyModel
+    items = CompanyModel.query.order_by(CompanyModel.id).paginate(page=1, per_page=per_page, error_out=False).items
+    data = [{f: getattr(c, f) for f in COMPANY_LIST.fields} for c in items]
+    return json.dumps({"data": data}, ensure_ascii=False)
+
+
+def measure(fn, repeat):
+    fn()  # 预热
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--per-page', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    from utils.json_provider import install_json_provider
+
+    app = make_app()
+    client = app.test_client()
+    url = f'/api/company/list?per_page={args.per_page}'
+    results = {}
+    with app.app_context():
+        seed(args.rows)
+        results['orm (direct)'] = measure(lambda: orm_page(args.per_page), args.repeat)
+
+    app.json = DefaultJSONProvider(app)
+    results['rows + json (endpoint)'] = measure(lambda: client.get(url), args.repeat)
+    if install_json_provider(app):
+        results['rows + orjson (endpoint)'] = measure(lambda: client.get(url), args.repeat)
+    else:
+        print('未安装 orjson，跳过 orjson 对比')
+
+    print(f'rows={args.rows} per_page={args.per_page} repeat={args.repeat}')
+    for name, ms in results.items():
+        print(f'{name:<28}{ms:8.2f} ms CPU / request')
+
+
+if __name__ == '__main__':
+    main()
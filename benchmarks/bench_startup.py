@@ -0,0 +1,108 @@
+'''
+应用冷启动耗时
+
+在新的子进程中用 python -X importtime 导入 app 并调用 create_app()，多次运行取中位数，输出：
+  - import app、create_app() 的墙钟时间；
+  - 启动后是否已加载 pandas、openpyxl 等重型依赖（应只在导入、导出、分析时加载）；
+  - 各模块的导入耗时（cumulative 含其导入的子模块，self 为模块本身），按 cumulative 从大到小。
+
+用法：
+  python benchmarks/bench_startup.py --profile prod --repeat 5 --top 30
+  python benchmarks/bench_startup.py --project-only    # 只看本项目的模块
+数据库默认使用临时 SQLite 文件（--database-uri 可指定），prod 环境启动时不访问数据库。
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'flasgger', 'wtforms', 'orjson']
+PROJECT_PACKAGES = ('app', 'api', 'blueprint', 'utils', 'migrations', 'exts', 'config')
+
+# 子进程中执行：计时并把结果以 JSON 输出到 stdout（importtime 的输出在 stderr）
+CHILD_CODE = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app({profile!r})
+created = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "create_app": created - imported,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+'''
+
+
+def run_once(profile, database_uri):
+    env = dict(os.environ, ECC_PROFILE=profile, ECC_SQLALCHEMY_DATABASE_URI=database_uri, ECC_LOG_LEVEL='WARNING')
+    # prod 环境未设置密钥时拒绝启动，基准测试使用临时密钥
+    env.setdefault('ECC_SECRET_KEY', 'bench-startup')
+    code = CHILD_CODE.format(profile=profile, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    timing = json.loads(proc.stdout.strip().splitlines()[-1])
+    modules = {}
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return timing, modules
+
+
+def is_project_module(name):
+    return name.split('.')[0] in PROJECT_PACKAGES
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', default='prod', help='运行环境 dev / test / prod')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=30, help='输出耗时最多的模块数')
+    parser.add_argument('--project-only', action='store_true', help='只输出本项目的模块')
+    parser.add_argument('--database-uri', help='默认使用临时 SQLite 文件')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        database_uri = args.database_uri or 'sqlite:///' + os.path.join(work_dir, 'bench.db')
+        run_once(args.profile, database_uri)  # 预热：生成 .pyc，dev/test 环境建表
+        runs = [run_once(args.profile, database_uri) for _ in range(args.repeat)]
+
+    import_ms = statistics.median(timing['import'] for timing, _ in runs) * 1000
+    create_ms = statistics.median(timing['create_app'] for timing, _ in runs) * 1000
+    samples = defaultdict(list)
+    for _, modules in runs:
+        for name, values in modules.items():
+            samples[name].append(values)
+    medians = {
+        name: (statistics.median(v[0] for v in values), statistics.median(v[1] for v in values))
+        for name, values in samples.items()
+    }
+
+    print(f'profile={args.profile} repeat={args.repeat}')
+    print(f'{"import app":<28}{import_ms:8.1f} ms')
+    print(f'{"create_app()":<28}{create_ms:8.1f} ms')
+    loaded = runs[-1][0]['loaded']
+    print('启动后已加载：' + ', '.join(loaded) if loaded else '启动后已加载：无')
+    print('启动后未加载：' + ', '.join(name for name in HEAVY_MODULES if name not in loaded))
+    print()
+    print(f'{"module":<52}{"cumulative ms":>14}{"self ms":>10}')
+    names = [name for name in medians if not args.project_only or is_project_module(name)]
+    for name in sorted(names, key=lambda n: medians[n][1], reverse=True)[:args.top]:
+        self_us, cumulative_us = medians[name]
+        print(f'{name:<52}{cumulative_us / 1000:14.1f}{self_us / 1000:10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,76 +1,378 @@
 import os
 import json
-from flask import Blueprint, request, render_template
+import multiprocessing
+import pickle
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import Blueprint, current_app, request, render_template
 from werkzeug.utils import secure_filename
-from openpyxl import load_workbook
-from sqlalchemy import JSON
 from flask import send_from_directory
 
-import config
+from sqlalchemy import delete, insert
+
 from exts import db
+from blueprint.questionaire import get_template, get_templates
+from utils.remarks import RemarkReport, remark_answers
 
 analysis_bp = Blueprint('analysis', __name__, url_prefix='/a')
-os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
 
 
 # ----------- 模型 -------------
-class QuestionaireModel(db.Model):
+class AnswerModel(db.Model):
     '''
-    问卷列表模型
+    分析结果：每行拜访记录的每个问题一条，供统计查询
+    source 为上传的文件名，同一文件重新分析时先删除原有结果
     '''
-    __tablename__ = 'q_list'
-    __table_args__ = {'extend_existing': True}
+    __tablename__ = 'answers'
+    __table_args__ = (
+        db.Index('ix_answers_distribution', 'code', 'question_index', 'value'),
+        {'extend_existing': True}
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    area = db.Column(db.String(10))
-    code = db.Column(db.String(10))
-    questions = db.Column(JSON)
+    code = db.Column(db.String(10), nullable=False)
+    source = db.Column(db.String(255), index=True)
+    row_key = db.Column(db.String(100), nullable=False)
+    question_index = db.Column(db.Integer, nullable=False)
+    value = db.Column(db.String(500))
+
+
+class AnswerWriter:
+    '''
+    分析过程中收集答案，每 IMPORT_CHUNK_SIZE 条批量插入一次；空答案不写入
+    '''
+
+    def __init__(self, sources, chunk_size=None):
+        self.chunk_size = chunk_size or current_app.config['IMPORT_CHUNK_SIZE']
+        self.batch = []
+        self.written = 0
+        self.conn = db.session.connection()
+        self.conn.execute(delete(AnswerModel.__table__).where(AnswerModel.source.in_(list(sources))))
+
+    def add(self, source, code, row_key, answers):
+        for index, value in enumerate(answers or []):
+            if value is None or value == '':
+                continue
+            if not isinstance(value, str):
+                value = json.dumps(value, ensure_ascii=False)
+            self.batch.append({"code": code, "source": source, "row_key": row_key,
+                               "question_index": index, "value": value[:500]})
+        if len(self.batch) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.conn.execute(insert(AnswerModel.__table__), self.batch)
+            self.written += len(self.batch)
+            self.batch = []
+
+    def close(self):
+        self.flush()
+        db.session.commit()
+        return self.written
 
 
 # ----------- 工具函数 -------------
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in config.ALLOWED_EXTENSIONS
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 
-def extract_questionaire_code(sheet, remark_col_index):
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        remark = row[remark_col_index - 1]
-        if not remark:
-            continue
-        try:
-            remark_data = json.loads(remark)
-            if isinstance(remark_data, dict):
-                print('获取问卷代码')
-                print(f'remark_data的类型：{type(remark_data)}')
-                return remark_data.get('c')
-        except (json.JSONDecodeError, TypeError):
-            continue
-    return None
+class AnalysisError(Exception):
+    '''
+    上传的表格无法分析（缺少 Sheet、备注列或问卷 code），message 直接展示给用户
+    '''
+    pass
 
 
-def write_answers_to_sheet(sheet, remark_col_index):
-    for i, row in enumerate(sheet.iter_rows(min_row=2), start=2):
-        remark_cell = sheet.cell(row=i, column=remark_col_index)
-        remark = remark_cell.value
-        if not remark:
-            continue
+def expand_row(row, remark_col_index, answers):
+    '''
+    把答案写到备注列之后（与原来逐个单元格写入的效果一致：覆盖备注后面的列，不够时补列）
+    '''
+    row = list(row)
+    end = remark_col_index + len(answers)
+    if len(row) < end:
+        row.extend([None] * (end - len(row)))
+    row[remark_col_index:end] = answers
+    return row
+
+
+def pick_sheet(workbook):
+    sheet_name = '企业拜访明细'
+    return workbook[sheet_name] if sheet_name in workbook.sheetnames else workbook.active
+
+
+def copy_sheet(source, output):
+    ws = output.create_sheet(source.title)
+    for row in source.iter_rows(values_only=True):
+        ws.append(row)
 
-        try:
-            remark_data = json.loads(remark)
-            if isinstance(remark_data, dict):
-                print('即将写入单元格')
-                print(f'remark_data的类型：{type(remark_data)}')
-                answers = remark_data.get('analysis', [])
-                for j, value in enumerate(answers):
-                    target_col = remark_col_index + j + 1
-                    sheet.cell(row=i, column=target_col, value=value)
-        except json.JSONDecodeError:
+
+def write_analysis_sheet(source, ws, find_titles, report, writer=None, source_name=None):
+    '''
+    单次遍历源 Sheet：每行的备注只解析一次，展开后的行直接追加到只写 Sheet。
+    表头要等到拿到问卷 code 才能确定，在此之前读到的行先缓存（通常只有表头和第一行数据）。
+    :param find_titles: code -> 问题标题列表，找不到时返回 None
+    :param report: RemarkReport，登记解析失败及答案数不一致的行
+    :param writer: AnswerWriter，不为空时同时把答案写入 answers 表
+    :return: 问卷 code
+    '''
+    rows = source.iter_rows(values_only=True)
+    header = next(rows, None)
+    if not header or '备注' not in header:
+        raise AnalysisError("未找到“备注”列，您上传的excel文件是易查查导出的excel吗？")
+    remark_col_index = header.index('备注') + 1
+
+    code = None
+    titles = None
+
+    def expand(row_number, row, remark_data):
+        if remark_data is None:
+            return row
+        answers = remark_answers(remark_data)
+        row_code = str(remark_data.get('c'))
+        if row_code == code:
+            report.check_answers(code, answers, len(titles), source.title, row_number)
+        if writer is not None and remark_data.get('c'):
+            writer.add(source_name, row_code, f'{source.title}:{row_number}', answers)
+        return expand_row(row, remark_col_index, answers or [])
+
+    pending = []
+    for row_number, row in enumerate(rows, start=2):
+        remark = row[remark_col_index - 1] if len(row) >= remark_col_index else None
+        remark_data = report.row(remark, source.title, row_number)
+        if code is None:
+            pending.append((row_number, row, remark_data))
+            if remark_data is None:
+                continue
+            if not remark_data.get('c'):
+                raise AnalysisError("未找到问卷code，请检查上传文件是否是易查查导出的excel表格")
+            code = str(remark_data.get('c'))
+            titles = find_titles(code)
+            if titles is None:
+                raise AnalysisError(f"问卷 code [{code}] 未在系统中找到")
+            ws.append(expand_row(header, remark_col_index, titles))
+            for buffered in pending:
+                ws.append(expand(*buffered))
+            pending = None
             continue
+        ws.append(expand(row_number, row, remark_data))
+
+    if code is None:
+        raise AnalysisError("未找到问卷code，请检查上传文件是否是易查查导出的excel表格")
+    return code
 
 
-def write_question_titles(sheet, remark_col_index, questions):
-    titles = [q.get('title') for q in questions]
-    for i, title in enumerate(titles):
-        sheet.cell(row=1, column=remark_col_index + i + 1, value=title)
+def analyze_workbook(src_path, dst_path, find_titles, source_name=None):
+    '''
+    流式分析易查查导出的拜访表：源文件只读打开，结果写入新的只写工作簿，
+    内存占用与单行大小相关而与文件行数无关。拜访明细以外的 Sheet 按原值复制。
+    :param source_name: 不为空时答案同时写入 answers 表，以此作为来源文件名
+    :return: 备注解析报告（RemarkReport.to_dict()，另含问卷 code 及写入的答案数）
+    '''
+    from openpyxl import Workbook, load_workbook
+    report = RemarkReport()
+    source = load_workbook(src_path, read_only=True, data_only=True)
+    try:
+        target = pick_sheet(source)
+        if target is None:
+            raise AnalysisError("上传的 Excel 中未找到正确的 Sheet")
+        output = Workbook(write_only=True)
+        writer = AnswerWriter([source_name]) if source_name else None
+        code = None
+        for sheet in source.worksheets:
+            if sheet.title == target.title:
+                code = write_analysis_sheet(sheet, output.create_sheet(sheet.title), find_titles, report,
+                                            writer, source_name)
+            else:
+                copy_sheet(sheet, output)
+        output.save(dst_path)
+        written = writer.close() if writer else 0
+        return dict(report.to_dict(), code=code, answers_written=written)
+    finally:
+        source.close()
+
+
+def find_titles(code):
+    template = get_template(code)
+    return template.titles if template else None
+
+
+# ----------- 批量分析 -------------
+# 批量模式：所有上传文件的所有 Sheet 按备注中的问卷 code 分组，每个问卷输出一个 Sheet。
+# 第一步逐个文件扫描（多个文件时在进程池中并行），展开后的行按 code 追加到临时文件；
+# 第二步一次查询取出全部问卷模板，按 code 写入结果工作簿。
+UNMATCHED_SHEET = '未识别'
+SOURCE_COLUMNS = ['来源文件', '来源Sheet']
+
+
+def sheet_title(code):
+    title = ''.join('_' if ch in '[]:*?/\\' else ch for ch in str(code))
+    return title[:31] or '_'
+
+
+def iter_records(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def scan_workbook(src_path, display_name, work_dir):
+    '''
+    扫描一个工作簿的所有 Sheet，不访问数据库（可在子进程中执行）
+    每行写入临时文件：有问卷 code 的按 code 分文件，记录 (表头序号, Sheet, 行号, 备注及之前的列, 答案)；
+    没有 code 的行写入 unmatched 文件，记录 (Sheet, 原始行)
+    :return: {"file", "headers", "codes": {code: 临时文件}, "unmatched", "report", "skipped_sheets"}
+    '''
+    from openpyxl import load_workbook
+    report = RemarkReport()
+    result = {"file": display_name, "headers": [], "codes": {}, "unmatched": None, "report": report,
+              "skipped_sheets": []}
+    outputs = {}
+
+    def output(key):
+        if key not in outputs:
+            path = os.path.join(work_dir, f'{uuid.uuid4().hex}.pkl')
+            outputs[key] = open(path, 'wb')
+            if key is None:
+                result["unmatched"] = path
+            else:
+                result["codes"][key] = path
+        return outputs[key]
+
+    source = load_workbook(src_path, read_only=True, data_only=True)
+    try:
+        for sheet in source.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header or '备注' not in header:
+                result["skipped_sheets"].append(sheet.title)
+                continue
+            remark_col_index = header.index('备注') + 1
+            header_id = len(result["headers"])
+            result["headers"].append(list(header[:remark_col_index]))
+            for row_number, row in enumerate(rows, start=2):
+                remark = row[remark_col_index - 1] if len(row) >= remark_col_index else None
+                remark_data = report.row(remark, sheet.title, row_number, display_name)
+                code = remark_data.get('c') if remark_data else None
+                if not code:
+                    pickle.dump((sheet.title, row), output(None))
+                    continue
+                pickle.dump((header_id, sheet.title, row_number, row[:remark_col_index], remark_answers(remark_data)),
+                            output(str(code)))
+    finally:
+        source.close()
+        for f in outputs.values():
+            f.close()
+    return result
+
+
+def merge_scans(scans, dst_path, templates, report, writer=None):
+    '''
+    把扫描结果写成一个工作簿，每个问卷 code 一个 Sheet。
+    列为 来源文件、来源Sheet、第一次出现该问卷的 Sheet 中备注及之前的列、问题标题；
+    其他 Sheet 的列名不同时按列名对应，缺少的列留空；答案数与问卷问题数不一致的行登记到 report。
+    writer 不为空时答案同时写入 answers 表。
+    :return: {code: 行数} 以及未在系统中找到的 code
+    '''
+    from openpyxl import Workbook
+    output = Workbook(write_only=True)
+    codes = sorted({code for scan in scans for code in scan["codes"]})
+    counts = {}
+    for code in codes:
+        columns = None
+        ws = None
+        count = 0
+        for scan in scans:
+            path = scan["codes"].get(code)
+            if not path:
+                continue
+            headers = scan["headers"]
+            template = templates.get(code)
+            for header_id, sheet_name, row_number, base, answers in iter_records(path):
+                if columns is None:
+                    columns = headers[header_id]
+                    ws = output.create_sheet(sheet_title(code))
+                    ws.append(SOURCE_COLUMNS + columns + (template.titles if template else []))
+                header = headers[header_id]
+                if header != columns:
+                    values = dict(zip(header, base))
+                    base = [values.get(name) for name in columns]
+                if template:
+                    report.check_answers(code, answers, len(template.titles), sheet_name, row_number, scan["file"])
+                if writer is not None:
+                    writer.add(scan["file"], code, f'{sheet_name}:{row_number}', answers)
+                ws.append([scan["file"], sheet_name] + list(base) + list(answers or []))
+                count += 1
+        counts[code] = count
+
+    unmatched = [scan for scan in scans if scan["unmatched"]]
+    if unmatched:
+        ws = output.create_sheet(UNMATCHED_SHEET)
+        ws.append(SOURCE_COLUMNS)
+        for scan in unmatched:
+            for sheet_name, row in iter_records(scan["unmatched"]):
+                ws.append([scan["file"], sheet_name] + list(row))
+    output.save(dst_path)
+    return {"sheets": counts, "missing_codes": [code for code in codes if code not in templates]}
+
+
+_scan_executor = None
+
+
+def get_scan_executor():
+    '''
+    多文件扫描的进程池，按需创建并在请求之间复用（spawn 每启动一个进程都要重新加载解释器），
+    进程数取首次创建时应用配置的 JOB_WORKERS 或 CPU 核数，与 utils/jobs.py 的任务进程池相互独立
+    '''
+    global _scan_executor
+    if _scan_executor is None:
+        _scan_executor = ProcessPoolExecutor(max_workers=current_app.config.get('JOB_WORKERS') or os.cpu_count(),
+                                             mp_context=multiprocessing.get_context('spawn'))
+    return _scan_executor
+
+
+def analyze_batch(files, dst_path):
+    '''
+    批量分析多个文件
+    :param files: [(文件路径, 显示名)]
+    :return: 汇总信息 {"files", "sheets", "missing_codes", "skipped_sheets", "report"}
+    '''
+    global _scan_executor
+    work_dir = tempfile.mkdtemp(dir=current_app.config['UPLOAD_FOLDER'])
+    try:
+        if len(files) > 1:
+            try:
+                scans = list(get_scan_executor().map(scan_workbook, [f[0] for f in files], [f[1] for f in files],
+                                                     [work_dir] * len(files)))
+            except BrokenProcessPool:
+                # 子进程异常退出后进程池不能再用，下次请求时重建
+                _scan_executor = None
+                raise
+        else:
+            scans = [scan_workbook(path, name, work_dir) for path, name in files]
+
+        codes = {code for scan in scans for code in scan["codes"]}
+        if not codes:
+            raise AnalysisError("未找到问卷code，请检查上传文件是否是易查查导出的excel表格")
+        report = RemarkReport()
+        for scan in scans:
+            report.merge(scan["report"])
+        writer = AnswerWriter([scan["file"] for scan in scans])
+        summary = merge_scans(scans, dst_path, get_templates(codes), report, writer)
+        summary.update({
+            "answers_written": writer.close(),
+            "files": len(scans),
+            "report": report.to_dict(),
+            "skipped_sheets": [f'{scan["file"]}/{name}' for scan in scans for name in scan["skipped_sheets"]],
+        })
+        return summary
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
 
 
 # ----------- 路由入口 -------------
@@ -87,48 +389,69 @@ def upload_file():
         return render_template('error/400.html', error="仅支持 .xlsx 文件")
 
     try:
-        # 保存上传文件
+        # 保存上传文件，分析结果写入新文件
+        upload_folder = current_app.config['UPLOAD_FOLDER']
         filename = secure_filename(file.filename)
-        filepath = os.path.join(config.UPLOAD_FOLDER, filename)
+        filepath = os.path.join(upload_folder, filename)
         file.save(filepath)
+        result_name = f'{os.path.splitext(filename)[0]}_analysis.xlsx'
 
-        # 加载 Excel
-        workbook = load_workbook(filepath, data_only=True)
-        sheet_name = '企业拜访明细'
-        sheet = workbook[sheet_name] if sheet_name in workbook.sheetnames else workbook.active
+        report = analyze_workbook(filepath, os.path.join(upload_folder, result_name), find_titles,
+                                  source_name=file.filename)
 
-        if not sheet:
-            return render_template("error/400.html", error="上传的 Excel 中未找到正确的 Sheet")
+        return render_template('analysis/success.html', filename=result_name, report=report)
 
-        header = [cell.value for cell in sheet[1]]
-        if '备注' not in header:
-            return render_template("error/400.html", error="未找到“备注”列，您上传的excel文件是易查查导出的excel吗？")
+    except AnalysisError as e:
+        db.session.rollback()
+        return render_template("error/400.html", error=str(e))
+    except Exception as e:
+        db.session.rollback()
+        return render_template("error/500.html", e=str(e))
 
-        remark_col_index = header.index('备注') + 1
 
-        # 提取 code -> 查询问卷模板
-        code = extract_questionaire_code(sheet, remark_col_index)
-        if not code:
-            return render_template("error/400.html", error="未找到问卷code，请检查上传文件是否是易查查导出的excel表格")
+@analysis_bp.route('/download/<filename>')
+def download_file(filename):
+    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
 
-        questionaire = QuestionaireModel.query.filter_by(code=code).first()
-        if not questionaire:
-            return render_template("error/400.html", error=f"问卷 code [{code}] 未在系统中找到")
 
-        questions = questionaire.questions
+@analysis_bp.route('/batch', methods=['GET', 'POST'])
+def upload_batch():
+    '''
+    批量分析：可一次上传多个文件，所有 Sheet 按问卷分组输出到一个工作簿
+    '''
+    if request.method == 'GET':
+        return render_template('analysis/upload.html', batch=True)
 
-        # 写入 titles & answers
-        write_question_titles(sheet, remark_col_index, questions)
-        write_answers_to_sheet(sheet, remark_col_index)
+    files = [f for f in request.files.getlist('files') if f and f.filename]
+    if not files:
+        return render_template('error/400.html', error="文件为空或未选择文件")
+    if not all(allowed_file(f.filename) for f in files):
+        return render_template('error/400.html', error="仅支持 .xlsx 文件")
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    saved = []
+    try:
+        for f in files:
+            filename = secure_filename(f.filename)
+            filepath = os.path.join(upload_folder, f'{uuid.uuid4().hex[:8]}_{filename}')
+            f.save(filepath)
+            saved.append((filepath, f.filename))
+        # 同一秒内的多个请求也不会互相覆盖结果文件
+        result_name = f'batch_{uuid.uuid4().hex}_analysis.xlsx'
 
-        workbook.save(filepath)
+        summary = analyze_batch(saved, os.path.join(upload_folder, result_name))
 
-        return render_template('analysis/success.html', filename=filename)
+        return render_template('analysis/success.html', filename=result_name, summary=summary,
+                               report=summary["report"])
 
+    except AnalysisError as e:
+        db.session.rollback()
+        return render_template("error/400.html", error=str(e))
     except Exception as e:
+        db.session.rollback()
         return render_template("error/500.html", e=str(e))
-
-
-@analysis_bp.route('/download/<filename>')
-def download_file(filename):
-    return send_from_directory(config.UPLOAD_FOLDER, filename, as_attachment=True)
+    finally:
+        # 上传的源文件分析完即删除，只保留结果文件供下载
+        for filepath, _ in saved:
+            if os.path.exists(filepath):
+                os.remove(filepath)
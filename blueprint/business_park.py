@@ -1,15 +1,16 @@
 import os
 from datetime import datetime
 
-import pandas as pd
 from flask import Blueprint, render_template, request, flash, redirect
 from sqlalchemy import Column, Integer
+from sqlalchemy.orm import selectinload
 from werkzeug.utils import secure_filename
 from wtforms.fields.simple import StringField, SubmitField, HiddenField
 from wtforms.validators import DataRequired
 from flask_wtf import FlaskForm
 
 from exts import db
+from utils.bulk_import import ImportSpec, run_import
 
 business_park_bp = Blueprint('business_park', __name__, url_prefix='/park')
 
@@ -21,10 +22,23 @@ class BusinessParkModel(db.Model):
     __tablename__ = 'business_park'
     __table_args__ = {'extend_existing': True}
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    name = db.Column(db.String(500))
+    name = db.Column(db.String(500), index=True)
     area = db.Column(db.String(500))
-    company_name = db.Column(db.String(500))
+    company_name = db.Column(db.String(500), index=True)
     remark = db.Column(db.String(500))
+    # 本行企业名称对应的企业、酒店（名称唯一，每行最多一条）；楼园表只追加，同一企业可出现在多行
+    company = db.relationship('CompanyModel', uselist=False, viewonly=True,
+                              primaryjoin='foreign(BusinessParkModel.company_name) == CompanyModel.company_name')
+    hotel = db.relationship('HotelModel', uselist=False, viewonly=True,
+                            primaryjoin='foreign(BusinessParkModel.company_name) == HotelModel.hotel_name')
+
+
+# 楼园只追加，不按名称合并
+BUSINESS_PARK_IMPORT = ImportSpec(
+    BusinessParkModel,
+    fields=["name", "area", "company_name", "remark"],
+    required='name'
+)
 
 
 class BusinessParkForm(FlaskForm):
@@ -37,8 +51,24 @@ class BusinessParkForm(FlaskForm):
 
 @business_park_bp.route('/list')
 def index():
-    businessParkList = BusinessParkModel.query.all()
-    return render_template('business_park/list.html', businessParkList=businessParkList)
+    # 从查询参数中获取分页参数
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+
+    # 本页楼园的企业、酒店按企业名称各用一条 IN 查询取回
+    pagination = (
+        BusinessParkModel.query
+        .options(selectinload(BusinessParkModel.company), selectinload(BusinessParkModel.hotel))
+        .order_by(BusinessParkModel.id)
+        .paginate(page=page, per_page=per_page, error_out=False)
+    )
+
+    return render_template(
+        'business_park/list.html',
+        businessParkList=pagination.items,
+        pagination=pagination,
+        per_page=per_page
+    )
 
 
 @business_park_bp.route('/add', methods=['GET', 'POST'])
@@ -87,6 +117,7 @@ def delete(id):
 
 @business_park_bp.route('/import', methods=['GET', 'POST'])
 def upload_file():
+    import pandas as pd
     if request.method == 'GET':
         return render_template('business_park/upload.html')
 
@@ -105,29 +136,11 @@ def upload_file():
     except Exception as e:
         return render_template('error/400.html', error='无法读取Excel文件，请确认格式')
 
-    expected_fields = [
-        "name", "area", "company_name", "remark"
-    ]
-
-    if list(df.columns[:len(expected_fields)]) != expected_fields:
+    if not BUSINESS_PARK_IMPORT.header_matches(df):
         return render_template('error/400.html', error='Excel表头不符合预期')
 
-    # 遍历每一行数据
-    for _, row in df.iterrows():
-        row_data = row.to_dict()
-        name = row_data.get("name")
-
-        if not name or pd.isna(name):
-            continue
-
-        # 新增公司
-        filtered_data = {
-            k: v for k, v in row_data.items() if pd.notna(v) and str(v).strip() != ''
-        }
-        business_park = BusinessParkModel(**filtered_data)
-        db.session.add(business_park)
-
-    db.session.commit()
-    flash('导入完成')
+    # 批量追加
+    report = run_import(BUSINESS_PARK_IMPORT, df)
+    flash(f"导入完成：新增 {report['inserted']} 条")
     return index()
 
@@ -1,6 +1,5 @@
 import os
 
-import pandas as pd
 from flask import Blueprint, render_template, request, flash, redirect
 from sqlalchemy import Column, Integer
 from werkzeug.utils import secure_filename
@@ -9,6 +8,7 @@ from wtforms.validators import DataRequired
 from flask_wtf import FlaskForm
 
 from exts import db
+from utils.bulk_import import ImportSpec, run_import
 
 chain_band_bp = Blueprint('chain_band', __name__, url_prefix='/chain_band')
 
@@ -22,10 +22,18 @@ class ChainBandModel(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     band = db.Column(db.String(500))
     area = db.Column(db.String(500))
-    store = db.Column(db.String(500))
+    store = db.Column(db.String(500), index=True)
     remark = db.Column(db.String(500))
 
 
+# 连锁品牌只追加，不按名称合并
+CHAIN_BAND_IMPORT = ImportSpec(
+    ChainBandModel,
+    fields=["band", "area", "store", "remark"],
+    required='band'
+)
+
+
 class ChainBandForm(FlaskForm):
     # id = Column(Integer, primary_key=True)
     id = HiddenField()
@@ -36,8 +44,18 @@ class ChainBandForm(FlaskForm):
 
 @chain_band_bp.route('/list')
 def index():
-    chanBandList = ChainBandModel.query.all()
-    return render_template('chain_band/list.html', chanBandList=chanBandList)
+    # 从查询参数中获取分页参数
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+
+    pagination = ChainBandModel.query.order_by(ChainBandModel.id).paginate(page=page, per_page=per_page, error_out=False)
+
+    return render_template(
+        'chain_band/list.html',
+        chanBandList=pagination.items,
+        pagination=pagination,
+        per_page=per_page
+    )
 
 
 @chain_band_bp.route('/add', methods=['GET', 'POST'])
@@ -86,6 +104,7 @@ def delete(id):
 
 @chain_band_bp.route('/import', methods=['GET', 'POST'])
 def upload_file():
+    import pandas as pd
     if request.method == 'GET':
         return render_template('chain_band/upload.html')
 
@@ -104,30 +123,12 @@ def upload_file():
     except Exception as e:
         return render_template('error/400.html', error='无法读取Excel文件，请确认格式')
 
-    expected_fields = [
-        "band", "area", "store", "remark"
-    ]
-
-    if list(df.columns[:len(expected_fields)]) != expected_fields:
+    if not CHAIN_BAND_IMPORT.header_matches(df):
         return render_template('error/400.html', error='Excel表头不符合预期')
 
-    # 遍历每一行数据
-    for _, row in df.iterrows():
-        row_data = row.to_dict()
-        name = row_data.get("band")
-
-        if not name or pd.isna(name):
-            continue
-
-        # 新增连锁品牌
-        filtered_data = {
-            k: v for k, v in row_data.items() if pd.notna(v) and str(v).strip() != ''
-        }
-        chain_band = ChainBandModel(**filtered_data)
-        db.session.add(chain_band)
-
-    db.session.commit()
-    flash('导入完成')
+    # 批量追加
+    report = run_import(CHAIN_BAND_IMPORT, df)
+    flash(f"导入完成：新增 {report['inserted']} 条")
     return index()
 
 
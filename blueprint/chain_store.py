@@ -2,11 +2,9 @@ import io
 import os
 from datetime import datetime
 
-import pandas as pd
-
 from flask import Blueprint, render_template, request, flash, redirect, send_file
 from flask_wtf import FlaskForm
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, select
 from werkzeug.utils import secure_filename
 from wtforms.fields.choices import SelectField
 from wtforms.fields.simple import StringField, SubmitField
@@ -14,7 +12,14 @@ from wtforms.validators import DataRequired
 
 # from blueprint import business_park
 # from blueprint.business_park import BusinessParkModel
+from blueprint.chain_band import ChainBandModel
 from exts import db
+from utils.bulk_import import ImportSpec, run_import, today
+from utils.search_index import register_searchable
+from utils.global_search import register_global_search
+from utils.stats import register_rollup
+from utils.normalization import TYPED_COLUMNS, register_typed
+from utils.excel_export import QUERY_YIELD_PER, stream_csv, stream_xlsx
 
 chain_store_bp = Blueprint('chain_store', __name__, url_prefix='/chain_store')
 
@@ -30,38 +35,100 @@ chain_store_bp = Blueprint('chain_store', __name__, url_prefix='/chain_store')
 #         self.update_time = update_time
 #
 
-class ChainBandModel(db.Model):
-    '''
-    连锁品牌模型
-    '''
-    __tablename__ = 'chain_band'
-    __table_args__ = {'extend_existing': True}
-    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    band = db.Column(db.String(500))
-    area = db.Column(db.String(500))
-    store = db.Column(db.String(500))
-    remark = db.Column(db.String(500))
-
 class ChainStoreModel(db.Model):
     __tablename__ = 'chain_store'
     __table_args__ = {'extend_existing': True}
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    chain_store_name = db.Column(db.String(500))
+    chain_store_name = db.Column(db.String(500), unique=True, index=True)
     actual_people_count = db.Column(db.String(500))
-    other_carrier = db.Column(db.String(500))
+    # 由 actual_people_count 解析得到的影子列，见 utils.normalization
+    actual_people_count_value = db.Column(db.Integer, index=True)
+    other_carrier = db.Column(db.String(500), index=True)
     key_person_name = db.Column(db.String(500))
     key_person_phone = db.Column(db.String(500))
     competitor_services = db.Column(db.String(500))
     competitor_price = db.Column(db.String(500))
     competitor_expiry = db.Column(db.String(500))
-    visitor_name = db.Column(db.String(500))
+    # 由 competitor_price / competitor_expiry 解析得到的影子列
+    competitor_price_value = db.Column(db.Numeric(12, 2), index=True)
+    competitor_expiry_date = db.Column(db.Date, index=True)
+    visitor_name = db.Column(db.String(500), index=True)
     remarks = db.Column(db.String(500))
-    update_time = db.Column(db.String(500))
+    update_time = db.Column(db.String(500), index=True)
     # business_park_id = db.Column(db.Integer, ForeignKey('business_park.id'))
     # business_park = db.relationship('BusinessParkModel')
     chain_band = db.Column(db.String(500))
 
 
+register_searchable('chain_store', ChainStoreModel, ChainStoreModel.chain_store_name)
+register_rollup('chain_store', ChainStoreModel, {
+    'visitor': 'visitor_name', 'carrier': 'other_carrier', 'brand': 'chain_band', 'month': 'update_time'
+})
+register_typed(ChainStoreModel, TYPED_COLUMNS)
+register_global_search('chain_store', ChainStoreModel, {
+    'name': 'chain_store_name', 'person': 'key_person_name', 'phone': 'key_person_phone', 'visitor': 'visitor_name'
+})
+
+CHAIN_STORE_IMPORT = ImportSpec(
+    ChainStoreModel,
+    fields=[
+        "chain_store_name", "chain_band", "visitor_name", "actual_people_count",
+        "other_carrier", "key_person_name", "key_person_phone",
+        "competitor_services", "competitor_price", "competitor_expiry",
+        "remarks", "update_time"
+    ],
+    key='chain_store_name',
+    defaults={'update_time': today},
+    derived=TYPED_COLUMNS
+)
+
+
+# 连锁品牌-门店导出的列及表头
+CHAIN_STORE_EXPORT_COLUMNS = [
+    (ChainBandModel.band, "连锁品牌名称"),
+    (ChainBandModel.store, "连锁商铺名称"),
+    (ChainStoreModel.actual_people_count, "单位实际人数"),
+    (ChainStoreModel.other_carrier, "异网运营商"),
+    (ChainStoreModel.key_person_name, "关键人姓名"),
+    (ChainStoreModel.key_person_phone, "关键人电话"),
+    (ChainStoreModel.competitor_services, "友商已有业务"),
+    (ChainStoreModel.competitor_price, "友商合同价格"),
+    (ChainStoreModel.competitor_expiry, "友商产品到期时间"),
+    (ChainStoreModel.visitor_name, "拜访人"),
+    (ChainStoreModel.remarks, "备注"),
+    (ChainStoreModel.update_time, "更新时间"),
+]
+
+
+def chain_band_store_rows():
+    '''
+    连锁品牌 LEFT JOIN 门店，一条 SQL 取回全部导出数据，
+    使用 yield_per 走服务端游标分批读取，不会一次性加载到内存
+    '''
+    stmt = (
+        select(*[column for column, _ in CHAIN_STORE_EXPORT_COLUMNS])
+        .select_from(ChainBandModel)
+        .outerjoin(ChainStoreModel, ChainStoreModel.chain_store_name == ChainBandModel.store)
+        .order_by(ChainBandModel.id)
+        .execution_options(yield_per=QUERY_YIELD_PER)
+    )
+    return db.session.execute(stmt)
+
+
+def export_chain_band_store(export_format):
+    '''按 xlsx（默认）或 csv 导出连锁品牌-门店数据'''
+    now_str = datetime.now().strftime('%Y%m%d_%H%M%S')
+    headers = [title for _, title in CHAIN_STORE_EXPORT_COLUMNS]
+    if export_format == 'csv':
+        return stream_csv(chain_band_store_rows(), headers, download_name=f"连锁品牌商铺导出_{now_str}.csv")
+    return stream_xlsx(
+        chain_band_store_rows(),
+        headers=headers,
+        sheet_name='连锁品牌商铺导出',
+        download_name=f"连锁品牌商铺导出_{now_str}.xlsx"
+    )
+
+
 class ChainStoreForm(FlaskForm):
     chain_store_name = StringField('企业名称', validators=[DataRequired()])
     actual_people_count = StringField('单位实际人数')
@@ -152,6 +219,7 @@ def add():
 
 @chain_store_bp.route('/import', methods=['GET', 'POST'])
 def upload_file():
+    import pandas as pd
     if request.method == 'GET':
         return render_template('chain_store/upload.html')
 
@@ -170,45 +238,12 @@ def upload_file():
     except Exception as e:
         return render_template('error/400.html', error='无法读取Excel文件，请确认格式')
 
-    expected_fields = [
-        "chain_store_name", "chain_band", "visitor_name", "actual_people_count", "other_carrier", "key_person_name",
-        "key_person_phone", "competitor_services", "competitor_price", "competitor_expiry", "remarks", "update_time"
-    ]
-
-    if list(df.columns[:len(expected_fields)]) != expected_fields:
+    if not CHAIN_STORE_IMPORT.header_matches(df):
         return render_template('error/400.html', error='Excel表头不符合预期')
 
-    # 遍历每一行数据
-    for _, row in df.iterrows():
-        row_data = row.to_dict()
-        chain_store_name = row_data.get("chain_store_name")
-
-        if not chain_store_name or pd.isna(chain_store_name):
-            continue
-
-        # 格式化 update_time
-        update_time = row_data.get("update_time")
-        if pd.isna(update_time) or not str(update_time).strip():
-            # 自动生成 yyyymmdd 格式
-            row_data["update_time"] = datetime.now().strftime('%Y%m%d')
-
-        chain_store = ChainStoreModel.query.filter_by(chain_store_name=chain_store_name).first()
-
-        if chain_store:
-            # 更新：仅非空字段更新
-            for field, value in row_data.items():
-                if field != 'chain_store_name' and pd.notna(value) and str(value).strip() != '':
-                    setattr(chain_store, field, value)
-        else:
-            # 新增公司
-            filtered_data = {
-                k: v for k, v in row_data.items() if pd.notna(v) and str(v).strip() != ''
-            }
-            chain_store = ChainStoreModel(**filtered_data)
-            db.session.add(chain_store)
-
-    db.session.commit()
-    flash('导入完成')
+    # 批量新增/更新：仅非空字段覆盖已有数据
+    report = run_import(CHAIN_STORE_IMPORT, df)
+    flash(f"导入完成：新增 {report['inserted']} 条，更新 {report['updated']} 条")
     return redirect(request.url)
 
 
@@ -254,6 +289,8 @@ def update():
 
 @chain_store_bp.route('/export_old', methods=['GET'])
 def export_file_old():
+    import pandas as pd
+
     # 1. 查询数据库中的数据
     companies = ChainStoreModel.query.all()
 
@@ -301,83 +338,13 @@ def export_file_old():
 
 @chain_store_bp.route('/export', methods=['GET'])
 def export_file():
-    # 1. 获取所有“品牌-商店”记录
-    bs_list = ChainBandModel.query.all()
-
     # 如果没有数据，可以酌情返回提示
-    if not bs_list:
+    if db.session.execute(select(ChainBandModel.id).limit(1)).first() is None:
         return "没有设置连锁企业"
 
-    # 2. 逐行查找企业详细信息，并将信息拼在一起
-    output_data = []
-    for bs in bs_list:
-        # pc 是 ParkCompanyModel 的一行（id, business_park, company_name）
-        store_detail = ChainStoreModel.query.filter_by(chain_store_name=bs.store).first()
-
-        # 把楼园+企业拼到一个字典
-        row_dict = {
-            'band': bs.band,
-            'store': bs.store
-        }
-        if store_detail:
-            # 如果查到对应的企业信息，就把详细字段加上
-            row_dict['actual_people_count'] = store_detail.actual_people_count
-            row_dict['other_carrier'] = store_detail.other_carrier
-            row_dict['key_person_name'] = store_detail.key_person_name
-            row_dict['key_person_phone'] = store_detail.key_person_phone
-            row_dict['competitor_services'] = store_detail.competitor_services
-            row_dict['competitor_price'] = store_detail.competitor_price
-            row_dict['competitor_expiry'] = store_detail.competitor_expiry
-            row_dict['visitor_name'] = store_detail.visitor_name
-            row_dict['remarks'] = store_detail.remarks
-            row_dict['update_time'] = store_detail.update_time
-        else:
-            # 如果公司详细信息里没有匹配到，就留空或自定义提示
-            row_dict['actual_people_count'] = ''
-            row_dict['other_carrier'] = ''
-            row_dict['key_person_name'] = ''
-            row_dict['key_person_phone'] = ''
-            row_dict['competitor_services'] = ''
-            row_dict['competitor_price'] = ''
-            row_dict['competitor_expiry'] = ''
-            row_dict['visitor_name'] = ''
-            row_dict['remarks'] = ''
-            row_dict['update_time'] = ''
-
-        output_data.append(row_dict)
-
-    # 3. 用 pandas 生成 DataFrame
-    df = pd.DataFrame(output_data)
-
-    df.rename(columns={
-        "band": "连锁品牌名称",
-        "store": "连锁商铺名称",
-        "actual_people_count": "单位实际人数",
-        "other_carrier": "异网运营商",
-        "key_person_name": "关键人姓名",
-        "key_person_phone": "关键人电话",
-        "competitor_services": "友商已有业务",
-        "competitor_price": "友商合同价格",
-        "competitor_expiry": "友商产品到期时间",
-        "visitor_name": "拜访人",
-        "remarks": "备注",
-        "update_time": "更新时间"
-    }, inplace=True)
-
-    # 4. 写入到 Excel 并使用内存对象保存文件
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='连锁品牌商铺导出')
-    output.seek(0)
+    # 品牌+门店一次联表查询，?format=csv 时以 csv 边查边输出
+    return export_chain_band_store(request.args.get('format', 'xlsx'))
 
-    # 5. 以附件形式返回给浏览器
-    now_str = datetime.now().strftime('%Y%m%d_%H%M%S')
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=f"连锁品牌商铺导出_{now_str}.xlsx",
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
 
 @chain_store_bp.route('/delete/<int:id>')
 def delete(id):
@@ -2,19 +2,25 @@ import io
 import os
 from datetime import datetime
 
-import pandas as pd
-
 from flask import Blueprint, render_template, request, flash, redirect, send_file
 from flask_wtf import FlaskForm
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, select
+from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
 from wtforms.fields.choices import SelectField
 from wtforms.fields.simple import StringField, SubmitField
 from wtforms.validators import DataRequired
 
 # from blueprint import business_park
-# from blueprint.business_park import BusinessParkModel
+from blueprint.business_park import BusinessParkModel
 from exts import db
+from utils.bulk_import import ImportSpec, run_import, today
+from utils.search_index import register_searchable
+from utils.global_search import register_global_search
+from utils.park_links import register_park_link
+from utils.stats import register_rollup
+from utils.normalization import TYPED_COLUMNS, register_typed
+from utils.excel_export import QUERY_YIELD_PER, stream_xlsx
 
 company_bp = Blueprint('company', __name__, url_prefix='/company')
 
@@ -30,39 +36,89 @@ company_bp = Blueprint('company', __name__, url_prefix='/company')
 #         self.update_time = update_time
 #
 
-class BusinessParkModel(db.Model):
-    '''
-    园区模型
-    '''
-    __tablename__ = 'business_park'
-    __table_args__ = {'extend_existing': True}
-    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    name = db.Column(db.String(500))
-    area = db.Column(db.String(500))
-    company_name = db.Column(db.String(500))
-    remark = db.Column(db.String(500))
-
-
 class CompanyModel(db.Model):
     __tablename__ = 'company'
     __table_args__ = {'extend_existing': True}
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    company_name = db.Column(db.String(500))
+    company_name = db.Column(db.String(500), unique=True, index=True)
     actual_people_count = db.Column(db.String(500))
-    other_carrier = db.Column(db.String(500))
+    # 由 actual_people_count 解析得到的影子列，见 utils.normalization
+    actual_people_count_value = db.Column(db.Integer, index=True)
+    other_carrier = db.Column(db.String(500), index=True)
     key_person_name = db.Column(db.String(500))
     key_person_phone = db.Column(db.String(500))
     competitor_services = db.Column(db.String(500))
     competitor_price = db.Column(db.String(500))
     competitor_expiry = db.Column(db.String(500))
-    visitor_name = db.Column(db.String(500))
+    # 由 competitor_price / competitor_expiry 解析得到的影子列
+    competitor_price_value = db.Column(db.Numeric(12, 2), index=True)
+    competitor_expiry_date = db.Column(db.Date, index=True)
+    visitor_name = db.Column(db.String(500), index=True)
     remarks = db.Column(db.String(500))
-    update_time = db.Column(db.String(500))
-    # business_park_id = db.Column(db.Integer, ForeignKey('business_park.id'))
-    # business_park = db.relationship('BusinessParkModel')
+    update_time = db.Column(db.String(500), index=True)
+    # 楼园外键，由 utils.park_links 按企业名称解析维护；business_park 保留原来填写的楼园名称
+    business_park_id = db.Column(db.Integer, ForeignKey('business_park.id', ondelete='SET NULL'), index=True)
+    park = db.relationship('BusinessParkModel')
     business_park = db.Column(db.String(500))
 
 
+register_searchable('company', CompanyModel, CompanyModel.company_name)
+register_rollup('company', CompanyModel, {
+    'visitor': 'visitor_name', 'carrier': 'other_carrier', 'park': 'business_park', 'month': 'update_time'
+})
+register_typed(CompanyModel, TYPED_COLUMNS)
+register_global_search('company', CompanyModel, {
+    'name': 'company_name', 'person': 'key_person_name', 'phone': 'key_person_phone', 'visitor': 'visitor_name'
+})
+register_park_link(CompanyModel, 'company_name')
+
+COMPANY_IMPORT = ImportSpec(
+    CompanyModel,
+    fields=[
+        "company_name", "visitor_name", "actual_people_count",
+        "other_carrier", "key_person_name", "key_person_phone",
+        "competitor_services", "competitor_price", "competitor_expiry",
+        "remarks", "update_time"
+    ],
+    key='company_name',
+    defaults={'update_time': today},
+    derived=TYPED_COLUMNS
+)
+
+
+# 楼园-企业导出的列及表头
+PARK_COMPANY_EXPORT_COLUMNS = [
+    (BusinessParkModel.name, "楼园名称"),
+    (BusinessParkModel.company_name, "企业名称"),
+    (CompanyModel.actual_people_count, "单位实际人数"),
+    (CompanyModel.other_carrier, "异网运营商"),
+    (CompanyModel.key_person_name, "关键人姓名"),
+    (CompanyModel.key_person_phone, "关键人电话"),
+    (CompanyModel.competitor_services, "友商已有业务"),
+    (CompanyModel.competitor_price, "友商合同价格"),
+    (CompanyModel.competitor_expiry, "友商产品到期时间"),
+    (CompanyModel.visitor_name, "拜访人"),
+    (CompanyModel.remarks, "备注"),
+    (CompanyModel.update_time, "更新时间"),
+]
+
+
+def park_company_rows():
+    '''
+    楼园 LEFT JOIN 企业，一条 SQL 取回全部导出数据；按企业名称关联（企业名称唯一，每个楼园行最多一条），
+    同一企业在楼园表中出现多行时每行都带出企业数据。
+    使用 yield_per 走服务端游标分批读取，不会一次性加载到内存
+    '''
+    stmt = (
+        select(*[column for column, _ in PARK_COMPANY_EXPORT_COLUMNS])
+        .select_from(BusinessParkModel)
+        .outerjoin(CompanyModel, CompanyModel.company_name == BusinessParkModel.company_name)
+        .order_by(BusinessParkModel.id)
+        .execution_options(yield_per=QUERY_YIELD_PER)
+    )
+    return db.session.execute(stmt)
+
+
 class CompanyForm(FlaskForm):
     company_name = StringField('企业名称', validators=[DataRequired()])
     actual_people_count = StringField('单位实际人数')
@@ -105,7 +161,11 @@ def index():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
 
-    pagination = CompanyModel.query.paginate(page=page, per_page=per_page, error_out=False)
+    # 楼园随企业一起联表取回，模板中读取 company.park 不再逐行查询
+    pagination = (
+        CompanyModel.query.options(joinedload(CompanyModel.park))
+        .paginate(page=page, per_page=per_page, error_out=False)
+    )
     company_list = pagination.items
 
     return render_template(
@@ -153,6 +213,7 @@ def add():
 
 @company_bp.route('/import', methods=['GET', 'POST'])
 def upload_file():
+    import pandas as pd
     if request.method == 'GET':
         return render_template('company/upload.html')
 
@@ -171,47 +232,12 @@ def upload_file():
     except Exception as e:
         return render_template('error/400.html', error='无法读取Excel文件，请确认格式')
 
-    expected_fields = [
-        "company_name", "visitor_name", "actual_people_count",
-        "other_carrier", "key_person_name", "key_person_phone",
-        "competitor_services", "competitor_price", "competitor_expiry",
-        "remarks", "update_time"
-    ]
-
-    if list(df.columns[:len(expected_fields)]) != expected_fields:
+    if not COMPANY_IMPORT.header_matches(df):
         return render_template('error/400.html', error='Excel表头不符合预期')
 
-    # 遍历每一行数据
-    for _, row in df.iterrows():
-        row_data = row.to_dict()
-        company_name = row_data.get("company_name")
-
-        if not company_name or pd.isna(company_name):
-            continue
-
-        # 格式化 update_time
-        update_time = row_data.get("update_time")
-        if pd.isna(update_time) or not str(update_time).strip():
-            # 自动生成 yyyymmdd 格式
-            row_data["update_time"] = datetime.now().strftime('%Y%m%d')
-
-        company = CompanyModel.query.filter_by(company_name=company_name).first()
-
-        if company:
-            # 更新：仅非空字段更新
-            for field, value in row_data.items():
-                if field != 'company_name' and pd.notna(value) and str(value).strip() != '':
-                    setattr(company, field, value)
-        else:
-            # 新增公司
-            filtered_data = {
-                k: v for k, v in row_data.items() if pd.notna(v) and str(v).strip() != ''
-            }
-            company = CompanyModel(**filtered_data)
-            db.session.add(company)
-
-    db.session.commit()
-    flash('导入完成')
+    # 批量新增/更新：仅非空字段覆盖已有数据
+    report = run_import(COMPANY_IMPORT, df)
+    flash(f"导入完成：新增 {report['inserted']} 条，更新 {report['updated']} 条")
     return redirect(request.url)
 
 
@@ -256,8 +282,10 @@ def update():
 
 @company_bp.route('/export_old', methods=['GET'])
 def export_file():
+    import pandas as pd
+
     # 1. 查询数据库中的数据
-    companies = CompanyModel.query.all()
+    companies = CompanyModel.query.options(joinedload(CompanyModel.park)).all()
 
     # 如果表中没有数据，可以考虑给出提示或返回一个空 Excel
     if not companies:
@@ -270,7 +298,7 @@ def export_file():
     for company in companies:
         data.append({
             "company_name": company.company_name,
-            "business_park": company.business_park,
+            "business_park": company.park.name if company.park else company.business_park,
             "visitor_name": company.visitor_name,
             "actual_people_count": company.actual_people_count,
             "other_carrier": company.other_carrier,
@@ -303,84 +331,20 @@ def export_file():
 
 @company_bp.route('/export', methods=['GET'])
 def export_park_company():
-    # 1. 获取所有“楼园-企业”记录
-    pc_list = BusinessParkModel.query.all()
-
     # 如果没有数据，可以酌情返回提示
-    if not pc_list:
+    if db.session.execute(select(BusinessParkModel.id).limit(1)).first() is None:
         return "没有设置楼园"
 
-    # 2. 逐行查找企业详细信息，并将信息拼在一起
-    output_data = []
-    for pc in pc_list:
-        # pc 是 ParkCompanyModel 的一行（id, business_park, company_name）
-        company_detail = CompanyModel.query.filter_by(company_name=pc.company_name).first()
-
-        # 把楼园+企业拼到一个字典
-        row_dict = {
-            'name': pc.name,
-            'company_name': pc.company_name
-        }
-        if company_detail:
-            # 如果查到对应的企业信息，就把详细字段加上
-            row_dict['actual_people_count'] = company_detail.actual_people_count
-            row_dict['other_carrier'] = company_detail.other_carrier
-            row_dict['key_person_name'] = company_detail.key_person_name
-            row_dict['key_person_phone'] = company_detail.key_person_phone
-            row_dict['competitor_services'] = company_detail.competitor_services
-            row_dict['competitor_price'] = company_detail.competitor_price
-            row_dict['competitor_expiry'] = company_detail.competitor_expiry
-            row_dict['visitor_name'] = company_detail.visitor_name
-            row_dict['remarks'] = company_detail.remarks
-            row_dict['update_time'] = company_detail.update_time
-        else:
-            # 如果公司详细信息里没有匹配到，就留空或自定义提示
-            row_dict['actual_people_count'] = ''
-            row_dict['other_carrier'] = ''
-            row_dict['key_person_name'] = ''
-            row_dict['key_person_phone'] = ''
-            row_dict['competitor_services'] = ''
-            row_dict['competitor_price'] = ''
-            row_dict['competitor_expiry'] = ''
-            row_dict['visitor_name'] = ''
-            row_dict['remarks'] = ''
-            row_dict['update_time'] = ''
-
-        output_data.append(row_dict)
-
-    # 3. 用 pandas 生成 DataFrame
-    df = pd.DataFrame(output_data)
-
-    df.rename(columns={
-        "name": "楼园名称",
-        "company_name": "企业名称",
-        "actual_people_count": "单位实际人数",
-        "other_carrier": "异网运营商",
-        "key_person_name": "关键人姓名",
-        "key_person_phone": "关键人电话",
-        "competitor_services": "友商已有业务",
-        "competitor_price": "友商合同价格",
-        "competitor_expiry": "友商产品到期时间",
-        "visitor_name": "拜访人",
-        "remarks": "备注",
-        "update_time": "更新时间"
-    }, inplace=True)
-
-    # 4. 写入到 Excel 并使用内存对象保存文件
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='楼园企业导出')
-    output.seek(0)
-
-    # 5. 以附件形式返回给浏览器
+    # 楼园+企业一次联表查询，逐行写入 xlsx 后分块返回给浏览器
     now_str = datetime.now().strftime('%Y%m%d_%H%M%S')
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=f"楼园企业导出_{now_str}.xlsx",
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return stream_xlsx(
+        park_company_rows(),
+        headers=[title for _, title in PARK_COMPANY_EXPORT_COLUMNS],
+        sheet_name='楼园企业导出',
+        download_name=f"楼园企业导出_{now_str}.xlsx"
     )
 
+
 @company_bp.route('/delete/<int:id>')
 def delete(id):
     company = CompanyModel.query.get(id)
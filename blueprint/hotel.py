@@ -2,11 +2,10 @@ import io
 import os
 from datetime import datetime
 
-import pandas as pd
-
 from flask import Blueprint, render_template, request, flash, redirect, send_file
 from flask_wtf import FlaskForm
 from sqlalchemy import ForeignKey
+from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
 from wtforms.fields.choices import SelectField
 from wtforms.fields.simple import StringField, SubmitField
@@ -15,6 +14,12 @@ from wtforms.validators import DataRequired
 # from blueprint import business_park
 # from blueprint.business_park import BusinessParkModel
 from exts import db
+from utils.bulk_import import ImportSpec, run_import, today
+from utils.search_index import register_searchable
+from utils.global_search import register_global_search
+from utils.park_links import register_park_link
+from utils.stats import register_rollup
+from utils.normalization import TYPED_COLUMNS, register_typed
 
 hotel_bp = Blueprint('hotel', __name__, url_prefix='/hotel')
 
@@ -34,22 +39,51 @@ class HotelModel(db.Model):
     __tablename__ = 'hotel'
     __table_args__ = {'extend_existing': True}
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    hotel_name = db.Column(db.String(500))
+    hotel_name = db.Column(db.String(500), unique=True, index=True)
     actual_people_count = db.Column(db.String(500))
-    other_carrier = db.Column(db.String(500))
+    # 由 actual_people_count 解析得到的影子列，见 utils.normalization
+    actual_people_count_value = db.Column(db.Integer, index=True)
+    other_carrier = db.Column(db.String(500), index=True)
     key_person_name = db.Column(db.String(500))
     key_person_phone = db.Column(db.String(500))
     competitor_services = db.Column(db.String(500))
     competitor_price = db.Column(db.String(500))
     competitor_expiry = db.Column(db.String(500))
-    visitor_name = db.Column(db.String(500))
+    # 由 competitor_price / competitor_expiry 解析得到的影子列
+    competitor_price_value = db.Column(db.Numeric(12, 2), index=True)
+    competitor_expiry_date = db.Column(db.Date, index=True)
+    visitor_name = db.Column(db.String(500), index=True)
     remarks = db.Column(db.String(500))
-    update_time = db.Column(db.String(500))
-    # business_park_id = db.Column(db.Integer, ForeignKey('business_park.id'))
-    # business_park = db.relationship('BusinessParkModel')
+    update_time = db.Column(db.String(500), index=True)
+    # 楼园外键，由 utils.park_links 按企业名称解析维护；business_park 保留原来填写的楼园名称
+    business_park_id = db.Column(db.Integer, ForeignKey('business_park.id', ondelete='SET NULL'), index=True)
+    park = db.relationship('BusinessParkModel')
     business_park = db.Column(db.String(500))
 
 
+register_searchable('hotel', HotelModel, HotelModel.hotel_name)
+register_rollup('hotel', HotelModel, {
+    'visitor': 'visitor_name', 'carrier': 'other_carrier', 'park': 'business_park', 'month': 'update_time'
+})
+register_typed(HotelModel, TYPED_COLUMNS)
+register_global_search('hotel', HotelModel, {
+    'name': 'hotel_name', 'person': 'key_person_name', 'phone': 'key_person_phone', 'visitor': 'visitor_name'
+})
+register_park_link(HotelModel, 'hotel_name')
+
+HOTEL_IMPORT = ImportSpec(
+    HotelModel,
+    fields=[
+        "hotel_name", "visitor_name", "actual_people_count", "other_carrier",
+        "key_person_name", "key_person_phone", "competitor_services",
+        "competitor_price", "competitor_expiry", "remarks", "update_time"
+    ],
+    key='hotel_name',
+    defaults={'update_time': today},
+    derived=TYPED_COLUMNS
+)
+
+
 class HotelForm(FlaskForm):
     hotel_name = StringField('企业名称', validators=[DataRequired()])
     actual_people_count = StringField('单位实际人数')
@@ -93,7 +127,11 @@ def index():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
 
-    pagination = HotelModel.query.paginate(page=page, per_page=per_page, error_out=False)
+    # 楼园随酒店一起联表取回，模板中读取 hotel.park 不再逐行查询
+    pagination = (
+        HotelModel.query.options(joinedload(HotelModel.park))
+        .paginate(page=page, per_page=per_page, error_out=False)
+    )
     hotel_list = pagination.items
 
     return render_template(
@@ -141,6 +179,7 @@ def add():
 
 @hotel_bp.route('/import', methods=['GET', 'POST'])
 def upload_file():
+    import pandas as pd
     if request.method == 'GET':
         return render_template('hotel/upload.html')
 
@@ -159,46 +198,12 @@ def upload_file():
     except Exception as e:
         return render_template('error/400.html', error='无法读取Excel文件，请确认格式')
 
-    expected_fields = [
-        "hotel_name", "visitor_name", "actual_people_count", "other_carrier", "key_person_name", "key_person_phone",
-        "competitor_services", "competitor_price", "competitor_expiry", "remarks", "update_time"
-
-    ]
-
-    if list(df.columns[:len(expected_fields)]) != expected_fields:
+    if not HOTEL_IMPORT.header_matches(df):
         return render_template('error/400.html', error='Excel表头不符合预期')
 
-    # 遍历每一行数据
-    for _, row in df.iterrows():
-        row_data = row.to_dict()
-        hotel_name = row_data.get("hotel_name")
-
-        if not hotel_name or pd.isna(hotel_name):
-            continue
-
-        # 格式化 update_time
-        update_time = row_data.get("update_time")
-        if pd.isna(update_time) or not str(update_time).strip():
-            # 自动生成 yyyymmdd 格式
-            row_data["update_time"] = datetime.now().strftime('%Y%m%d')
-
-        hotel = HotelModel.query.filter_by(hotel_name=hotel_name).first()
-
-        if hotel:
-            # 更新：仅非空字段更新
-            for field, value in row_data.items():
-                if field != 'hotel_name' and pd.notna(value) and str(value).strip() != '':
-                    setattr(hotel, field, value)
-        else:
-            # 新增公司
-            filtered_data = {
-                k: v for k, v in row_data.items() if pd.notna(v) and str(v).strip() != ''
-            }
-            hotel = HotelModel(**filtered_data)
-            db.session.add(hotel)
-
-    db.session.commit()
-    flash('导入完成')
+    # 批量新增/更新：仅非空字段覆盖已有数据
+    report = run_import(HOTEL_IMPORT, df)
+    flash(f"导入完成：新增 {report['inserted']} 条，更新 {report['updated']} 条")
     return redirect(request.url)
 
 
@@ -243,8 +248,10 @@ def update():
 
 @hotel_bp.route('/export', methods=['GET'])
 def export_file():
+    import pandas as pd
+
     # 1. 查询数据库中的数据
-    companies = HotelModel.query.all()
+    companies = HotelModel.query.options(joinedload(HotelModel.park)).all()
 
     # 如果表中没有数据，可以考虑给出提示或返回一个空 Excel
     if not companies:
@@ -257,7 +264,7 @@ def export_file():
     for hotel in companies:
         data.append({
             "hotel_name": hotel.hotel_name,
-            "business_park": hotel.business_park,
+            "business_park": hotel.park.name if hotel.park else hotel.business_park,
             "visitor_name": hotel.visitor_name,
             "actual_people_count": hotel.actual_people_count,
             "other_carrier": hotel.other_carrier,
@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template
-from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy import JSON, event, inspect
+from sqlalchemy.orm import Session
+
 from exts import db
+from utils.cache import LRUCache, caching_enabled
 
 
 # 创建问卷蓝图
@@ -20,10 +23,99 @@ class QuestionaireModel(db.Model):
     __table_args__ = {'extend_existing': True}
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     area = db.Column(db.String(10))
-    code = db.Column(db.String(10))
+    code = db.Column(db.String(10), index=True)
     questions = db.Column(JSON)
 
 
+class QuestionaireTemplate:
+    '''
+    解析后的问卷模板（缓存用，与会话无关），titles 为按顺序的问题标题
+    '''
+
+    def __init__(self, id, area, code, questions):
+        self.id = id
+        self.area = area
+        self.code = code
+        self.questions = questions or []
+        self.titles = [q.get('title') for q in self.questions]
+
+
+# 问卷模板缓存，key 为 code；大小和过期时间在创建应用时按运行环境配置
+template_cache = LRUCache()
+
+
+def configure_template_cache(app_config):
+    '''按运行环境的配置调整模板缓存，在创建应用时调用'''
+    maxsize = app_config['QUESTIONAIRE_CACHE_SIZE'] if caching_enabled(app_config) else 0
+    template_cache.configure(maxsize, app_config['QUESTIONAIRE_CACHE_SECONDS'])
+
+
+def load_template(code):
+    questionaire = QuestionaireModel.query.filter_by(code=code).first()
+    if not questionaire:
+        return None
+    return QuestionaireTemplate(questionaire.id, questionaire.area, questionaire.code, questionaire.questions)
+
+
+def get_template(code):
+    '''
+    按 code 取问卷模板，找不到时返回 None（不缓存，新增后立即可见）
+    '''
+    return template_cache.get(str(code), load_template)
+
+
+def get_templates(codes):
+    '''
+    批量取问卷模板，缓存未命中的 code 合并为一次查询
+    :return: {code: QuestionaireTemplate}，找不到的 code 不在结果中
+    '''
+    templates = {}
+    missing = []
+    for code in {str(code) for code in codes}:
+        template = template_cache.get(code)
+        if template is None:
+            missing.append(code)
+        else:
+            templates[code] = template
+    if missing:
+        rows = QuestionaireModel.query.filter(QuestionaireModel.code.in_(missing)).order_by(QuestionaireModel.id)
+        for questionaire in rows:
+            # 与 filter_by(code).first() 一致，重复的 code 取 id 最小的一条
+            if questionaire.code in templates:
+                continue
+            template = QuestionaireTemplate(questionaire.id, questionaire.area, questionaire.code,
+                                            questionaire.questions)
+            template_cache.set(questionaire.code, template)
+            templates[questionaire.code] = template
+    return templates
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_templates(session, flush_context):
+    '''q_list 有增删改时记录涉及的 code（包括修改前的 code），立即失效并在提交后再失效一次'''
+    codes = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, QuestionaireModel):
+            continue
+        history = inspect(obj).attrs.code.history
+        codes.update(str(code) for code in (obj.code, *history.deleted) if code is not None)
+    if codes:
+        for code in codes:
+            template_cache.invalidate(code)
+        session.info.setdefault('questionaire_codes', set()).update(codes)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_templates(session):
+    for code in session.info.pop('questionaire_codes', ()):
+        template_cache.invalidate(code)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changed_templates(session, previous_transaction):
+    session.info.pop('questionaire_codes', None)
+
+
 @questionaire_bp.route('/')
 def index():
     return render_template('questionnaire/code.html')
@@ -37,7 +129,7 @@ def find_questionaire(code):
     :return: 问卷模板及其问题
     '''
     # 查询数据库，根据传入的 code 查找对应的问卷
-    questionaire = QuestionaireModel.query.filter_by(code=code).first()
+    questionaire = get_template(code)
 
     # 如果找不到问卷，返回一个错误页面或信息
     if not questionaire:
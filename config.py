@@ -1,4 +1,5 @@
 # config.py
+# 默认配置；运行环境（dev / test / prod）的覆盖项见文件末尾的 PROFILES，加载顺序见 utils/settings.py
 import os
 
 # Database connection settings
@@ -14,6 +15,14 @@ DB_URI = f'mysql+pymysql://{USERNAME}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}?charse
 # SQLAlchemy settings to let SQLAlchemy know how to connect to the database
 SQLALCHEMY_DATABASE_URI = DB_URI
 
+# 数据库连接池（仅 MySQL，见 utils/db_pool.py）：每个 worker 进程的常驻连接数、高峰时可额外开启的连接数、
+# 连接耗尽时的等待秒数、连接回收秒数（须小于 MySQL 的 wait_timeout）、取连接前是否探活
+DB_POOL_SIZE = 5
+DB_MAX_OVERFLOW = 5
+DB_POOL_TIMEOUT = 30
+DB_POOL_RECYCLE = 1800
+DB_POOL_PRE_PING = True
+
 # Enables or disables Flask-SQLAlchemy's modification tracking
 SQLALCHEMY_TRACK_MODIFICATIONS = True
 
@@ -21,8 +30,86 @@ SQLALCHEMY_TRACK_MODIFICATIONS = True
 # Log SQL queries for debugging purposes
 SQLALCHEMY_ECHO = True
 
+SECRET_KEY = '1234567890'
+
+# 是否提供 Swagger 接口文档（/apidocs）
+SWAGGER_ENABLED = True
+
+# 启动时是否自动执行数据库迁移；关闭时用 flask --app app schema upgrade 执行
+AUTO_UPGRADE_SCHEMA = False
+
+# 应用日志级别，启动时在 INFO 级别输出生效的配置
+LOG_LEVEL = 'INFO'
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'upload')
 ALLOWED_EXTENSIONS = {'xlsx'}
 
+# 上传文件大小上限（字节），为空时不限制，超出时返回 413
+MAX_CONTENT_LENGTH = None
+
+# Excel 批量导入时每批写入数据库的行数
+IMPORT_CHUNK_SIZE = 1000
+
+# 后台导入/导出任务的进程数，为空时取 CPU 核数
+JOB_WORKERS = None
+# 等待中、执行中的任务超过该秒数没有进展时视为执行进程已退出，标记为失败；
+# 已结束的任务及其导出文件保留的秒数，过期后删除
+JOB_STALE_SECONDS = 3600
+JOB_RETENTION_SECONDS = 24 * 3600
+
+# 游标分页时附带的总数为缓存的近似值，缓存秒数
+LIST_COUNT_CACHE_SECONDS = 60
+
+# 请求耗时与 SQL 查询统计（/metrics）：是否开启；单个请求的 SQL 条数超过阈值时记为疑似 N+1 查询并记录警告日志
+METRICS_ENABLED = True
+N_PLUS_ONE_THRESHOLD = 20
+# 多 worker 部署时各进程统计的汇总目录（gunicorn.conf.py 中设置），为空时只统计本进程；各进程写入统计的间隔秒数
+METRICS_DIR = None
+METRICS_FLUSH_SECONDS = 1
+
+# 缓存方式：memory 进程内缓存；none 不缓存，每次都查询数据库
+CACHE_BACKEND = 'memory'
+
+# 问卷模板进程内缓存：最多缓存的问卷数、过期秒数
+QUESTIONAIRE_CACHE_SIZE = 128
+QUESTIONAIRE_CACHE_SECONDS = 300
+
+# 各运行环境在上面默认值基础上的覆盖项，由环境变量 ECC_PROFILE 选择
+PROFILES = {
+    # 开发：输出 SQL，单进程开发服务器用较小的连接池，启动时自动迁移
+    'dev': {
+        'AUTO_UPGRADE_SCHEMA': True,
+    },
+    # 测试：内存 SQLite，不缓存，结果总是与数据库一致
+    'test': {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'SQLALCHEMY_ECHO': False,
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'WTF_CSRF_ENABLED': False,
+        'CACHE_BACKEND': 'none',
+        'AUTO_UPGRADE_SCHEMA': True,
+        'LOG_LEVEL': 'WARNING',
+    },
+    # 生产：关闭 SQL 日志和修改跟踪；连接池按 gunicorn 每进程 8 个线程配置；限制上传大小；
+    # 不加载接口文档，启动时不执行迁移（发布时执行 flask --app app schema upgrade）；
+    # 数据库地址、密钥用 ECC_SQLALCHEMY_DATABASE_URI、ECC_SECRET_KEY 环境变量设置，未设置密钥时拒绝启动
+    'prod': {
+        'SECRET_KEY': None,
+        'SWAGGER_ENABLED': False,
+        'AUTO_UPGRADE_SCHEMA': False,
+        'SQLALCHEMY_ECHO': False,
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'DB_POOL_SIZE': 10,
+        'DB_MAX_OVERFLOW': 10,
+        'DB_POOL_TIMEOUT': 10,
+        'DB_POOL_RECYCLE': 1800,
+        'DB_POOL_PRE_PING': True,
+        'MAX_CONTENT_LENGTH': 50 * 1024 * 1024,
+        'CACHE_BACKEND': 'memory',
+        'QUESTIONAIRE_CACHE_SIZE': 512,
+        'QUESTIONAIRE_CACHE_SECONDS': 600,
+        'LIST_COUNT_CACHE_SECONDS': 120,
+    },
+}
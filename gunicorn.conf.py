@@ -0,0 +1,47 @@
+'''
+gunicorn 配置：多进程 + 每进程多线程（gthread）
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+各项可用环境变量覆盖。每个 worker 进程各有一个数据库连接池，
+线程数不应超过 DB_POOL_SIZE + DB_MAX_OVERFLOW，否则线程会在取连接时排队；
+所有 worker 的连接总数 workers × (DB_POOL_SIZE + DB_MAX_OVERFLOW) 不应超过 MySQL 的 max_connections。
+'''
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# 处理一定数量的请求后重启 worker，避免内存缓慢增长；jitter 使各 worker 错开重启
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+# 不预加载应用：每个 worker 各自创建应用和连接池，避免 fork 后多个进程共用同一个数据库连接
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# 各 worker 的请求统计写入同一目录，/metrics 汇总所有 worker（见 utils/metrics.py）
+metrics_dir = os.environ.setdefault('ECC_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'ecc_metrics'))
+
+
+def on_starting(server):
+    # 清除上次运行留下的统计
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from utils.metrics import mark_process_dead
+    mark_process_dead(metrics_dir, worker.pid)
@@ -0,0 +1,128 @@
+'''
+数据库结构迁移
+
+每个迁移是 migrations 包下的一个模块，提供 version、description、upgrade(conn)、downgrade(conn)，
+按 MIGRATIONS 中的顺序执行；已执行的版本记录在 schema_migration 表中。
+
+命令行：
+    flask --app app schema status
+    flask --app app schema upgrade [--to 版本号]
+    flask --app app schema downgrade --to 版本号
+'''
+import importlib
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, delete, insert, select
+
+from exts import db
+
+# 按执行顺序登记迁移模块
+MIGRATIONS = [
+    'v001_baseline',
+    'v002_natural_key_indexes',
+    'v003_list_filters',
+    'v004_questionaire_code_index',
+    'v005_answers',
+    'v006_stats_rollup',
+    'v007_competitor_typed_columns',
+    'v008_people_count_typed_column',
+    'v009_search_entry',
+    'v010_park_foreign_key',
+    'v011_job_updated_at',
+]
+
+schema_migration = Table(
+    'schema_migration', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200)),
+    Column('applied_at', DateTime)
+)
+
+schema_cli = AppGroup('schema', help='数据库结构迁移')
+
+
+class MigrationError(Exception):
+    '''迁移无法执行时抛出，信息中说明需要人工处理的内容'''
+
+
+def load_migrations():
+    return [importlib.import_module(f'{__name__}.{name}') for name in MIGRATIONS]
+
+
+def applied_versions(conn):
+    schema_migration.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migration.c.version)).scalars())
+
+
+def upgrade(to=None):
+    '''
+    依次执行尚未执行的迁移
+    :param to: 目标版本，为空时升级到最新
+    :return: 本次执行的版本号列表
+    '''
+    done = []
+    for migration in load_migrations():
+        if to is not None and migration.version > to:
+            break
+        # MySQL 的 DDL 会隐式提交，每个迁移单独一个事务，成功后才登记版本
+        with db.engine.begin() as conn:
+            if migration.version in applied_versions(conn):
+                continue
+            migration.upgrade(conn)
+            conn.execute(insert(schema_migration).values(
+                version=migration.version, description=migration.description, applied_at=datetime.now()
+            ))
+        done.append(migration.version)
+    return done
+
+
+def downgrade(to):
+    '''
+    回滚版本号大于 to 的迁移
+    :return: 本次回滚的版本号列表
+    '''
+    done = []
+    for migration in reversed(load_migrations()):
+        if migration.version <= to:
+            break
+        with db.engine.begin() as conn:
+            if migration.version not in applied_versions(conn):
+                continue
+            migration.downgrade(conn)
+            conn.execute(delete(schema_migration).where(schema_migration.c.version == migration.version))
+        done.append(migration.version)
+    return done
+
+
+@schema_cli.command('status')
+def status_command():
+    '''查看各迁移的执行状态'''
+    with db.engine.begin() as conn:
+        applied = applied_versions(conn)
+    for migration in load_migrations():
+        flag = '已执行' if migration.version in applied else '未执行'
+        click.echo(f'{migration.version:03d} [{flag}] {migration.description}')
+
+
+@schema_cli.command('upgrade')
+@click.option('--to', type=int, default=None, help='目标版本，默认升级到最新')
+def upgrade_command(to):
+    '''执行尚未执行的迁移'''
+    try:
+        done = upgrade(to)
+    except MigrationError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'已执行迁移：{done}' if done else '数据库已是最新版本')
+
+
+@schema_cli.command('downgrade')
+@click.option('--to', type=int, required=True, help='回滚到的版本')
+def downgrade_command(to):
+    '''回滚到指定版本'''
+    try:
+        done = downgrade(to)
+    except MigrationError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'已回滚迁移：{done}' if done else '没有需要回滚的迁移')
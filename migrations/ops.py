@@ -0,0 +1,70 @@
+'''
+迁移中使用的幂等操作：先检查再变更，新库（由基线迁移按当前模型建表）和已有的生产库都能安全执行
+'''
+from sqlalchemy import Column, Index, MetaData, Table, column, func, inspect, select, table
+
+
+def has_table(conn, table_name):
+    return inspect(conn).has_table(table_name)
+
+
+def has_column(conn, table_name, column_name):
+    return any(c['name'] == column_name for c in inspect(conn).get_columns(table_name))
+
+
+def has_index(conn, table_name, index_name):
+    return any(i['name'] == index_name for i in inspect(conn).get_indexes(table_name))
+
+
+def add_column_if_missing(conn, table_name, column_obj):
+    if has_column(conn, table_name, column_obj.name):
+        return False
+    column_type = column_obj.type.compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f'ALTER TABLE {table_name} ADD COLUMN {column_obj.name} {column_type}')
+    return True
+
+
+def drop_column_if_exists(conn, table_name, column_name):
+    if not has_column(conn, table_name, column_name):
+        return False
+    conn.exec_driver_sql(f'ALTER TABLE {table_name} DROP COLUMN {column_name}')
+    return True
+
+
+def create_index_if_missing(conn, table_name, index_name, column_names, unique=False):
+    if has_index(conn, table_name, index_name):
+        return False
+    t = Table(table_name, MetaData(), *[Column(name) for name in column_names])
+    Index(index_name, *[t.c[name] for name in column_names], unique=unique).create(conn)
+    return True
+
+
+def drop_index_if_exists(conn, table_name, index_name):
+    if not has_index(conn, table_name, index_name):
+        return False
+    if conn.dialect.name == 'mysql':
+        conn.exec_driver_sql(f'DROP INDEX {index_name} ON {table_name}')
+    else:
+        conn.exec_driver_sql(f'DROP INDEX {index_name}')
+    return True
+
+
+def drop_foreign_keys_to(conn, table_name, referred_table):
+    '''
+    删除 table_name 上引用 referred_table 的外键（名称可能由数据库自动生成，按引用的表查找）
+    :return: 是否已没有这类外键；SQLite 不能单独删除外键，存在时返回 False
+    '''
+    foreign_keys = [fk for fk in inspect(conn).get_foreign_keys(table_name) if fk['referred_table'] == referred_table]
+    if conn.dialect.name == 'sqlite':
+        return not foreign_keys
+    for fk in foreign_keys:
+        conn.exec_driver_sql(f'ALTER TABLE {table_name} DROP FOREIGN KEY {fk["name"]}')
+    return True
+
+
+def duplicated_values(conn, table_name, column_name, limit=10):
+    '''返回重复出现的非空值（最多 limit 个），用于建唯一索引前的检查'''
+    t = table(table_name, column(column_name))
+    c = t.c[column_name]
+    stmt = select(c).where(c.isnot(None)).group_by(c).having(func.count() > 1).limit(limit)
+    return list(conn.execute(stmt).scalars())
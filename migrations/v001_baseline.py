@@ -0,0 +1,16 @@
+'''
+基线：按当前模型创建缺失的表，等同于原来启动时的 db.create_all()
+'''
+from exts import db
+
+version = 1
+description = '基线：创建缺失的表'
+
+
+def upgrade(conn):
+    db.metadata.create_all(bind=conn, checkfirst=True)
+
+
+def downgrade(conn):
+    from migrations import MigrationError
+    raise MigrationError('基线迁移不支持回滚，以免误删业务数据')
@@ -0,0 +1,40 @@
+'''
+为导入、导出按名称查找的列建立索引：
+企业、酒店、门店名称建唯一索引，连锁品牌门店名、楼园企业名建普通索引
+'''
+from migrations.ops import create_index_if_missing, drop_index_if_exists, duplicated_values
+
+version = 2
+description = '自然键索引：企业/酒店/门店名称唯一，品牌门店名、楼园企业名普通索引'
+
+UNIQUE_INDEXES = [
+    ('company', 'ix_company_company_name', 'company_name'),
+    ('hotel', 'ix_hotel_hotel_name', 'hotel_name'),
+    ('chain_store', 'ix_chain_store_chain_store_name', 'chain_store_name'),
+]
+
+INDEXES = [
+    ('chain_band', 'ix_chain_band_store', 'store'),
+    ('business_park', 'ix_business_park_company_name', 'company_name'),
+]
+
+
+def upgrade(conn):
+    from migrations import MigrationError
+
+    for table_name, index_name, column_name in INDEXES:
+        create_index_if_missing(conn, table_name, index_name, [column_name])
+
+    # 唯一索引前先检查已有数据，存在重名时需要先人工合并
+    for table_name, index_name, column_name in UNIQUE_INDEXES:
+        duplicated = duplicated_values(conn, table_name, column_name)
+        if duplicated:
+            raise MigrationError(
+                f'{table_name}.{column_name} 存在重复值，无法建立唯一索引，请先合并后重试：{duplicated}'
+            )
+        create_index_if_missing(conn, table_name, index_name, [column_name], unique=True)
+
+
+def downgrade(conn):
+    for table_name, index_name, _ in UNIQUE_INDEXES + INDEXES:
+        drop_index_if_exists(conn, table_name, index_name)
@@ -0,0 +1,31 @@
+'''
+列表筛选：拜访人、异网运营商、更新时间建普通索引；新建名称 n-gram 索引表并回填已有数据
+'''
+from sqlalchemy import select
+
+from migrations.ops import create_index_if_missing, drop_index_if_exists
+from utils.search_index import NameNgramModel, SEARCHABLE, reindex_ids
+
+version = 3
+description = '列表筛选索引及名称 n-gram 索引表'
+
+TABLES = ['company', 'hotel', 'chain_store']
+COLUMNS = ['visitor_name', 'other_carrier', 'update_time']
+
+
+def upgrade(conn):
+    for table_name in TABLES:
+        for column_name in COLUMNS:
+            create_index_if_missing(conn, table_name, f'ix_{table_name}_{column_name}', [column_name])
+
+    NameNgramModel.__table__.create(conn, checkfirst=True)
+    for entity, (model, _) in SEARCHABLE.items():
+        ids = list(conn.execute(select(model.id).order_by(model.id)).scalars())
+        reindex_ids(conn, entity, ids)
+
+
+def downgrade(conn):
+    NameNgramModel.__table__.drop(conn, checkfirst=True)
+    for table_name in TABLES:
+        for column_name in COLUMNS:
+            drop_index_if_exists(conn, table_name, f'ix_{table_name}_{column_name}')
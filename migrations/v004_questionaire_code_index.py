@@ -0,0 +1,17 @@
+'''
+问卷模板按 code 查询，为 q_list.code 建普通索引
+'''
+from migrations.ops import create_index_if_missing, drop_index_if_exists, has_table
+
+version = 4
+description = '问卷 code 索引'
+
+
+def upgrade(conn):
+    if has_table(conn, 'q_list'):
+        create_index_if_missing(conn, 'q_list', 'ix_q_list_code', ['code'])
+
+
+def downgrade(conn):
+    if has_table(conn, 'q_list'):
+        drop_index_if_exists(conn, 'q_list', 'ix_q_list_code')
@@ -0,0 +1,15 @@
+'''
+分析结果表 answers：按问卷、题号、答案建索引，供分布统计
+'''
+from blueprint.analysis import AnswerModel
+
+version = 5
+description = '分析结果表 answers'
+
+
+def upgrade(conn):
+    AnswerModel.__table__.create(conn, checkfirst=True)
+
+
+def downgrade(conn):
+    AnswerModel.__table__.drop(conn, checkfirst=True)
@@ -0,0 +1,16 @@
+'''
+统计汇总表 stats_rollup：建表并按业务表全量计算一次
+'''
+from utils.stats import StatsRollupModel, rebuild
+
+version = 6
+description = '统计汇总表 stats_rollup'
+
+
+def upgrade(conn):
+    StatsRollupModel.__table__.create(conn, checkfirst=True)
+    rebuild(conn)
+
+
+def downgrade(conn):
+    StatsRollupModel.__table__.drop(conn, checkfirst=True)
@@ -0,0 +1,33 @@
+'''
+友商合同价格、到期时间的影子列：competitor_price_value（数值）、competitor_expiry_date（日期），
+建索引并按原字段解析回填已有数据
+'''
+from sqlalchemy import Column, Date, Numeric
+
+from migrations.ops import add_column_if_missing, create_index_if_missing, drop_column_if_exists, drop_index_if_exists
+from utils.normalization import COMPETITOR_COLUMNS, TYPED_MODELS, backfill
+
+version = 7
+description = '友商合同价格、到期时间影子列及索引'
+
+COLUMNS = [
+    Column('competitor_price_value', Numeric(12, 2)),
+    Column('competitor_expiry_date', Date),
+]
+
+
+def upgrade(conn):
+    for model in TYPED_MODELS:
+        table_name = model.__tablename__
+        for column_obj in COLUMNS:
+            add_column_if_missing(conn, table_name, column_obj)
+            create_index_if_missing(conn, table_name, f'ix_{table_name}_{column_obj.name}', [column_obj.name])
+        backfill(conn, model, COMPETITOR_COLUMNS)
+
+
+def downgrade(conn):
+    for model in TYPED_MODELS:
+        table_name = model.__tablename__
+        for column_obj in COLUMNS:
+            drop_index_if_exists(conn, table_name, f'ix_{table_name}_{column_obj.name}')
+            drop_column_if_exists(conn, table_name, column_obj.name)
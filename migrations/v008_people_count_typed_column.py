@@ -0,0 +1,28 @@
+'''
+单位实际人数的影子列 actual_people_count_value（整数），建索引并回填已有数据
+'''
+from sqlalchemy import Column, Integer
+
+from migrations.ops import add_column_if_missing, create_index_if_missing, drop_column_if_exists, drop_index_if_exists
+from utils.normalization import TYPED_COLUMNS, TYPED_MODELS, backfill
+
+version = 8
+description = '单位实际人数影子列及索引'
+
+COLUMN = Column('actual_people_count_value', Integer)
+DERIVED = {COLUMN.name: TYPED_COLUMNS[COLUMN.name]}
+
+
+def upgrade(conn):
+    for model in TYPED_MODELS:
+        table_name = model.__tablename__
+        add_column_if_missing(conn, table_name, COLUMN)
+        create_index_if_missing(conn, table_name, f'ix_{table_name}_{COLUMN.name}', [COLUMN.name])
+        backfill(conn, model, DERIVED)
+
+
+def downgrade(conn):
+    for model in TYPED_MODELS:
+        table_name = model.__tablename__
+        drop_index_if_exists(conn, table_name, f'ix_{table_name}_{COLUMN.name}')
+        drop_column_if_exists(conn, table_name, COLUMN.name)
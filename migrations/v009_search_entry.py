@@ -0,0 +1,17 @@
+'''
+统一搜索索引表 search_entry：建表并按企业、酒店、门店回填
+'''
+from utils.global_search import GLOBAL_SEARCHABLE, SearchEntryModel, reindex_all
+
+version = 9
+description = '统一搜索索引表 search_entry'
+
+
+def upgrade(conn):
+    SearchEntryModel.__table__.create(conn, checkfirst=True)
+    for entity in GLOBAL_SEARCHABLE:
+        reindex_all(conn, entity)
+
+
+def downgrade(conn):
+    SearchEntryModel.__table__.drop(conn, checkfirst=True)
@@ -0,0 +1,36 @@
+'''
+企业、酒店增加楼园外键 business_park_id，按楼园表中的企业名称批量回填
+'''
+from sqlalchemy import Column, Integer
+
+from migrations.ops import (add_column_if_missing, create_index_if_missing, drop_column_if_exists,
+                            drop_foreign_keys_to, drop_index_if_exists)
+from utils.park_links import PARK_LINKED, link_parks
+
+version = 10
+description = '企业、酒店楼园外键'
+
+COLUMN = Column('business_park_id', Integer)
+
+
+def upgrade(conn):
+    create_index_if_missing(conn, 'business_park', 'ix_business_park_name', ['name'])
+    for model in PARK_LINKED:
+        table_name = model.__tablename__
+        if add_column_if_missing(conn, table_name, COLUMN) and conn.dialect.name == 'mysql':
+            conn.exec_driver_sql(
+                f'ALTER TABLE {table_name} ADD CONSTRAINT fk_{table_name}_business_park '
+                f'FOREIGN KEY (business_park_id) REFERENCES business_park (id) ON DELETE SET NULL'
+            )
+        create_index_if_missing(conn, table_name, f'ix_{table_name}_business_park_id', ['business_park_id'])
+        link_parks(conn, model)
+
+
+def downgrade(conn):
+    for model in PARK_LINKED:
+        table_name = model.__tablename__
+        drop_index_if_exists(conn, table_name, f'ix_{table_name}_business_park_id')
+        # SQLite 上由建表语句带出的外键无法单独删除，保留该列（重新升级时跳过添加）
+        if drop_foreign_keys_to(conn, table_name, 'business_park'):
+            drop_column_if_exists(conn, table_name, 'business_park_id')
+    drop_index_if_exists(conn, 'business_park', 'ix_business_park_name')
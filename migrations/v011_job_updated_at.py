@@ -0,0 +1,21 @@
+'''
+后台任务表增加 updated_at（最后一次状态或进度更新的时间），按状态建索引，用于清理过期任务和识别已中断的任务
+'''
+from sqlalchemy import Column, DateTime
+
+from migrations.ops import add_column_if_missing, create_index_if_missing, drop_column_if_exists, drop_index_if_exists
+
+version = 11
+description = '后台任务更新时间及状态索引'
+
+COLUMN = Column('updated_at', DateTime)
+
+
+def upgrade(conn):
+    add_column_if_missing(conn, 'job', COLUMN)
+    create_index_if_missing(conn, 'job', 'ix_job_status', ['status'])
+
+
+def downgrade(conn):
+    drop_index_if_exists(conn, 'job', 'ix_job_status')
+    drop_column_if_exists(conn, 'job', 'updated_at')
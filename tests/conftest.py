@@ -0,0 +1,21 @@
+'''
+测试使用 test 运行环境：内存 SQLite，启动时执行全部迁移，不缓存
+'''
+import pytest
+
+from app import create_app
+from exts import db
+
+
+@pytest.fixture
+def app():
+    app = create_app('test')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,68 @@
+import io
+import json
+import os
+
+import pytest
+from openpyxl import Workbook
+
+from app import create_app
+from blueprint.analysis import AnswerModel
+from blueprint.questionaire import QuestionaireModel
+from exts import db
+
+
+def workbook(rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['企业', '备注'])
+    for name, code, answers in rows:
+        ws.append([name, json.dumps({'c': code, 'analysis': answers})])
+    data = io.BytesIO()
+    wb.save(data)
+    return data.getvalue()
+
+
+@pytest.fixture
+def upload_client(tmp_path, monkeypatch):
+    '''上传目录由环境变量覆盖，应用创建时建立'''
+    folder = tmp_path / 'upload'
+    monkeypatch.setenv('ECC_UPLOAD_FOLDER', str(folder))
+    app = create_app('test')
+    assert folder.is_dir()
+    with app.app_context():
+        yield app.test_client(), folder
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_batch_results_are_unique_and_uploads_removed(upload_client):
+    client, upload_folder = upload_client
+    db.session.add(QuestionaireModel(area='a', code='1', questions=[{'title': 'Q1'}, {'title': 'Q2'}]))
+    db.session.commit()
+    files = [workbook([('A', '1', ['是', '否'])]), workbook([('B', '1', ['否', '是'])])]
+
+    results = set()
+    for _ in range(2):
+        response = client.post('/a/batch', content_type='multipart/form-data', data={
+            'files': [(io.BytesIO(data), f'f{i}.xlsx') for i, data in enumerate(files)]
+        })
+        assert response.status_code == 200
+        results.update(name for name in os.listdir(upload_folder) if name.startswith('batch_'))
+
+    assert len(results) == 2
+    # 同一文件名重新分析时替换原有答案
+    assert AnswerModel.query.count() == 4
+    # 只剩下结果文件，上传的源文件和临时目录都已删除
+    assert sorted(os.listdir(upload_folder)) == sorted(results)
+
+
+def test_single_upload_uses_configured_folder(upload_client):
+    client, upload_folder = upload_client
+    db.session.add(QuestionaireModel(area='a', code='1', questions=[{'title': 'Q1'}]))
+    db.session.commit()
+
+    response = client.post('/a/', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(workbook([('A', '1', ['是'])])), 'one.xlsx')})
+    assert response.status_code == 200
+    assert (upload_folder / 'one_analysis.xlsx').exists()
+    assert client.get('/a/download/one_analysis.xlsx').status_code == 200
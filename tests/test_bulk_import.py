@@ -0,0 +1,117 @@
+import pandas as pd
+
+from blueprint.company import COMPANY_IMPORT, CompanyModel
+from exts import db
+from utils.bulk_import import run_import
+
+
+def company_frame(rows):
+    '''rows 为 {字段: 值}，未给出的字段为空单元格'''
+    return pd.DataFrame([[row.get(field) for field in COMPANY_IMPORT.fields] for row in rows],
+                        columns=COMPANY_IMPORT.fields, dtype=object)
+
+
+def get_company(name):
+    db.session.expire_all()
+    return CompanyModel.query.filter_by(company_name=name).one()
+
+
+def test_insert_then_update_existing(app):
+    report = run_import(COMPANY_IMPORT, company_frame([
+        {'company_name': 'A', 'visitor_name': '张三', 'other_carrier': '联通'},
+        {'company_name': 'B', 'visitor_name': '李四'},
+    ]))
+    assert (report['inserted'], report['updated']) == (2, 0)
+
+    report = run_import(COMPANY_IMPORT, company_frame([
+        {'company_name': 'A', 'visitor_name': '王五'},
+        {'company_name': 'C'},
+    ]))
+    assert (report['inserted'], report['updated']) == (1, 1)
+    assert CompanyModel.query.count() == 3
+    assert get_company('A').visitor_name == '王五'
+
+
+def test_blank_cells_keep_existing_values(app):
+    run_import(COMPANY_IMPORT, company_frame([{'company_name': 'A', 'other_carrier': '联通', 'remarks': '原备注'}]))
+    run_import(COMPANY_IMPORT, company_frame([{'company_name': 'A', 'other_carrier': '  ', 'remarks': '新备注'}]))
+    company = get_company('A')
+    assert company.other_carrier == '联通'
+    assert company.remarks == '新备注'
+
+
+def test_duplicate_names_merge_later_non_blank_values(app):
+    report = run_import(COMPANY_IMPORT, company_frame([
+        {'company_name': 'A', 'visitor_name': '张三', 'other_carrier': '联通'},
+        {'company_name': 'A', 'visitor_name': '李四'},
+    ]))
+    assert report['inserted'] == 1
+    company = get_company('A')
+    assert (company.visitor_name, company.other_carrier) == ('李四', '联通')
+
+
+def test_rows_without_key_are_skipped(app):
+    report = run_import(COMPANY_IMPORT, company_frame([{'company_name': 'A'}, {'visitor_name': '张三'}]))
+    assert (report['rows'], report['inserted'], report['skipped']) == (2, 1, 1)
+
+
+def test_default_update_time_and_chunking(app):
+    report = run_import(COMPANY_IMPORT, company_frame([{'company_name': f'企业{i}'} for i in range(5)]), chunk_size=2)
+    assert [batch['rows'] for batch in report['batches']] == [2, 2, 1]
+    assert get_company('企业0').update_time is not None
+
+
+def test_unparseable_text_clears_typed_competitor_columns(app):
+    run_import(COMPANY_IMPORT, company_frame([
+        {'company_name': 'A', 'competitor_price': '100元', 'competitor_expiry': '2026-12-01'},
+        {'company_name': 'B', 'competitor_price': '200元', 'competitor_expiry': '2026-06-30'},
+    ]))
+    run_import(COMPANY_IMPORT, company_frame([
+        {'company_name': 'A', 'competitor_price': '面议', 'competitor_expiry': '待定'},
+        # 空单元格保留原字段，影子列也保留
+        {'company_name': 'B'},
+    ]))
+    a, b = get_company('A'), get_company('B')
+    assert (a.competitor_price, a.competitor_price_value) == ('面议', None)
+    assert (a.competitor_expiry, a.competitor_expiry_date) == ('待定', None)
+    assert (b.competitor_price, float(b.competitor_price_value)) == ('200元', 200)
+    assert str(b.competitor_expiry_date) == '2026-06-30'
+
+
+def test_typed_columns_follow_merged_duplicate_rows(app):
+    run_import(COMPANY_IMPORT, company_frame([
+        {'company_name': 'A', 'competitor_price': '100元'},
+        {'company_name': 'A', 'competitor_expiry': '2026-01-31'},
+    ]))
+    company = get_company('A')
+    assert float(company.competitor_price_value) == 100
+    assert str(company.competitor_expiry_date) == '2026-01-31'
+
+
+def test_unparseable_text_clears_people_count_value(app, client):
+    run_import(COMPANY_IMPORT, company_frame([
+        {'company_name': 'A', 'actual_people_count': '50', 'visitor_name': '张三'},
+        {'company_name': 'B', 'actual_people_count': '约30人', 'visitor_name': '张三'},
+    ]))
+    run_import(COMPANY_IMPORT, company_frame([{'company_name': 'A', 'actual_people_count': '不详'}]))
+    company = get_company('A')
+    assert (company.actual_people_count, company.actual_people_count_value) == ('不详', None)
+
+    # 聚合只统计解析出人数的记录
+    data = client.get('/api/stats/aggregate?entity=company&metric=people&by=visitor').get_json()['data']
+    assert [(row['key'], row['count'], row['sum']) for row in data] == [('张三', 1, 30.0)]
+
+
+def test_out_of_range_numbers_are_stored_as_null(app):
+    run_import(COMPANY_IMPORT, company_frame([
+        {'company_name': 'A', 'actual_people_count': '13800001111', 'competitor_price': '13800001111'},
+        {'company_name': 'B', 'actual_people_count': '2147483647', 'competitor_price': '9999999999.99'},
+    ]))
+    a, b = get_company('A'), get_company('B')
+    assert (a.actual_people_count, a.actual_people_count_value, a.competitor_price_value) == ('13800001111', None, None)
+    assert (b.actual_people_count_value, float(b.competitor_price_value)) == (2147483647, 9999999999.99)
+
+    # ORM 写入同样按上限处理
+    b.actual_people_count = '2147483648'
+    db.session.commit()
+    assert get_company('B').actual_people_count_value is None
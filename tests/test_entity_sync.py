@@ -0,0 +1,61 @@
+import gc
+
+from sqlalchemy import select
+
+from blueprint.company import COMPANY_IMPORT, CompanyModel
+from exts import db
+from tests.test_bulk_import import company_frame
+from utils.bulk_import import run_import
+from utils.global_search import search
+from utils.search_index import NameNgramModel, matching_ids
+from utils.stats import rollup
+
+
+def name_matches(text):
+    return set(db.session.execute(matching_ids('company', text)).scalars())
+
+
+def state(text):
+    '''n-gram 索引命中的 id、统一搜索结果的名称、按拜访人汇总的计数'''
+    return (name_matches(text), [row['name'] for row in search(text, ['company'])[0]],
+            {row['key']: row['count'] for row in rollup('visitor', 'company')})
+
+
+def test_orm_writes_keep_all_derived_tables_in_sync(app):
+    # 监听函数注册在登记表内部，不能被回收
+    gc.collect()
+    company = CompanyModel(company_name='华为技术', visitor_name='张三')
+    db.session.add(company)
+    db.session.commit()
+    assert state('华为') == ({company.id}, ['华为技术'], {'张三': 1})
+
+    company.company_name = '中兴通讯'
+    company.visitor_name = '李四'
+    db.session.commit()
+    assert state('华为') == (set(), [], {'李四': 1})
+    assert state('中兴')[:2] == ({company.id}, ['中兴通讯'])
+
+    # 不参与派生的字段变化不重建
+    before = db.session.execute(select(NameNgramModel.id).order_by(NameNgramModel.id)).scalars().all()
+    company.remarks = '备注'
+    db.session.commit()
+    assert db.session.execute(select(NameNgramModel.id).order_by(NameNgramModel.id)).scalars().all() == before
+
+    db.session.delete(company)
+    db.session.commit()
+    assert state('中兴') == (set(), [], {})
+
+
+def test_import_keeps_all_derived_tables_in_sync(app):
+    run_import(COMPANY_IMPORT, company_frame([
+        {'company_name': '华为技术', 'visitor_name': '张三'},
+        {'company_name': '华为终端', 'visitor_name': '张三'},
+    ]))
+    assert len(state('华为')[0]) == 2
+    assert state('华为')[2] == {'张三': 2}
+
+    run_import(COMPANY_IMPORT, company_frame([{'company_name': '华为终端', 'visitor_name': '李四'}]))
+    matches, names, counts = state('华为')
+    assert len(matches) == 2
+    assert sorted(names) == ['华为技术', '华为终端']
+    assert counts == {'张三': 1, '李四': 1}
@@ -0,0 +1,25 @@
+import pytest
+
+from blueprint.chain_band import ChainBandModel
+from exts import db
+from utils.jobs import JobModel
+
+
+@pytest.mark.parametrize('query', ['format=pdf', 'format=pdf&async=1'])
+def test_chain_store_export_rejects_unknown_format(client, query):
+    db.session.add(ChainBandModel(band='品牌', store='门店1'))
+    db.session.commit()
+
+    response = client.get(f'/api/chain_store/export?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == '不支持的导出格式'
+    assert JobModel.query.count() == 0
+
+
+def test_chain_store_export_csv(client):
+    db.session.add(ChainBandModel(band='品牌', store='门店1'))
+    db.session.commit()
+
+    response = client.get('/api/chain_store/export?format=csv')
+    assert response.status_code == 200
+    assert '门店1' in response.get_data().decode('utf-8-sig')
@@ -0,0 +1,72 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from blueprint.business_park import BusinessParkModel
+from exts import db
+from utils.jobs import (JOB_DONE, JOB_FAILED, JOB_RUNNING, JobModel, cleanup_jobs, get_worker_app, run_job,
+                        worker_settings)
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    '''后台任务需要子进程也能访问的数据库，使用 SQLite 文件'''
+    app = create_app('test', SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "jobs.db"}',
+                     UPLOAD_FOLDER=str(tmp_path))
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_in_memory_sqlite_is_rejected(client):
+    response = client.post('/api/job/export/park_company')
+    assert response.status_code == 400
+    assert '内存' in response.get_json()['error']
+    assert JobModel.query.count() == 0
+
+
+def test_worker_uses_submitting_profile_and_settings(file_app):
+    db.session.add(BusinessParkModel(name='园区1', company_name='A'))
+    db.session.add(JobModel(id='j1', kind='export', target='park_company', params={'format': 'csv'}))
+    db.session.commit()
+
+    profile, settings = worker_settings(file_app.config)
+    run_job('j1', profile, settings)
+
+    worker = get_worker_app(profile, settings)
+    assert worker.config['PROFILE'] == 'test'
+    assert worker.config['SQLALCHEMY_DATABASE_URI'] == file_app.config['SQLALCHEMY_DATABASE_URI']
+    db.session.expire_all()
+    job = db.session.get(JobModel, 'j1')
+    assert job.status == JOB_DONE
+    assert job.rows_written == 1
+    assert os.path.dirname(job.result_path) == os.path.join(file_app.config['UPLOAD_FOLDER'], 'jobs')
+
+
+def test_cleanup_fails_stale_jobs_and_removes_expired_results(app, client, tmp_path):
+    now = datetime.now()
+    result = tmp_path / 'old.csv'
+    result.write_text('x')
+    db.session.add_all([
+        JobModel(id='stale', kind='import', target='company', params={}, status=JOB_RUNNING,
+                 created_at=now - timedelta(hours=3), updated_at=now - timedelta(hours=2)),
+        JobModel(id='active', kind='import', target='company', params={}, status=JOB_RUNNING,
+                 created_at=now - timedelta(hours=3), updated_at=now),
+        JobModel(id='expired', kind='export', target='park_company', params={}, status=JOB_DONE,
+                 result_path=str(result), finished_at=now - timedelta(days=2)),
+        JobModel(id='recent', kind='export', target='park_company', params={}, status=JOB_DONE,
+                 result_path=str(tmp_path / 'missing.csv'), finished_at=now),
+    ])
+    db.session.commit()
+
+    assert cleanup_jobs(now) == (1, 1)
+    db.session.expire_all()
+    assert db.session.get(JobModel, 'stale').status == JOB_FAILED
+    assert db.session.get(JobModel, 'active').status == JOB_RUNNING
+    assert db.session.get(JobModel, 'expired') is None
+    assert not result.exists()
+    # 文件已不存在的任务下载时返回 410
+    assert client.get('/api/job/recent/download').status_code == 410
@@ -0,0 +1,27 @@
+from blueprint.company import CompanyModel
+from exts import db
+
+
+def add_companies(expiries):
+    db.session.add_all([CompanyModel(company_name=name, competitor_expiry=expiry) for name, expiry in expiries])
+    db.session.commit()
+
+
+def names(response):
+    assert response.status_code == 200
+    return [row['company_name'] for row in response.get_json()['data']]
+
+
+def test_expiry_range_compares_parsed_dates(client):
+    add_companies([('A', '2026/1/5'), ('B', '2026-01-20'), ('C', '2026年2月1日'), ('D', '待定')])
+    assert names(client.get('/api/company/list?expiry_from=2026-01-05&expiry_to=2026/1/31')) == ['A', 'B']
+    assert names(client.get('/api/company/list?expiry_from=2026年1月10日')) == ['B', 'C']
+
+
+def test_expiry_sort_uses_parsed_dates(client):
+    add_companies([('A', '2026-10-01'), ('B', '2026/9/1'), ('C', '2026-01-15')])
+    assert names(client.get('/api/company/list?sort=competitor_expiry')) == ['C', 'B', 'A']
+
+
+def test_invalid_expiry_bound_is_rejected(client):
+    assert client.get('/api/company/list?expiry_from=soon').status_code == 400
@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import inspect, text
+
+from exts import db
+from migrations import MIGRATIONS, MigrationError, downgrade, upgrade
+
+
+def columns(table_name):
+    return {column['name'] for column in inspect(db.engine).get_columns(table_name)}
+
+
+def test_all_migrations_applied_at_startup(app):
+    assert upgrade() == []
+
+
+def test_downgrade_then_upgrade_restores_schema_and_backfills(app):
+    assert downgrade(1) == list(range(len(MIGRATIONS), 1, -1))
+    assert 'competitor_price_value' not in columns('company')
+    assert 'answers' not in inspect(db.engine).get_table_names()
+
+    # 回滚后写入的数据在重新升级时回填影子列和楼园外键
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO business_park (name, company_name) VALUES ('园区1', 'A')"))
+        conn.execute(text("INSERT INTO company (company_name, competitor_price, competitor_expiry, actual_people_count) "
+                          "VALUES ('A', '199元/月', '2026年3月', '约50人')"))
+
+    assert upgrade() == list(range(2, len(MIGRATIONS) + 1))
+    assert {'competitor_price_value', 'competitor_expiry_date', 'actual_people_count_value'} <= columns('company')
+    with db.engine.connect() as conn:
+        price, expiry, people, park_id = conn.execute(text(
+            'SELECT competitor_price_value, competitor_expiry_date, actual_people_count_value, business_park_id '
+            'FROM company')).one()
+    assert Decimal(str(price)) == Decimal('199')
+    assert str(expiry) == '2026-03-31'
+    assert people == 50
+    assert park_id is not None
+
+
+def test_partial_upgrade_and_baseline_cannot_be_reverted(app):
+    downgrade(5)
+    assert upgrade(to=7) == [6, 7]
+    assert upgrade() == list(range(8, len(MIGRATIONS) + 1))
+    with pytest.raises(MigrationError):
+        downgrade(0)
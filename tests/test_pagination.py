@@ -0,0 +1,49 @@
+from blueprint.company import CompanyModel
+from exts import db
+from utils.pagination import MAX_PER_PAGE, decode_cursor, encode_cursor, keyset_page
+
+
+def add_companies(count):
+    db.session.add_all([CompanyModel(company_name=f'企业{i:03d}') for i in range(count)])
+    db.session.commit()
+
+
+def test_keyset_pages_cover_all_rows_once(app):
+    add_companies(7)
+    seen = []
+    cursor = ''
+    while True:
+        items, cursor = keyset_page(CompanyModel.query, CompanyModel.id, cursor, 3)
+        seen.extend(item.id for item in items)
+        if cursor is None:
+            break
+    assert seen == sorted(company.id for company in CompanyModel.query)
+
+
+def test_exact_multiple_has_no_next_page(app):
+    add_companies(3)
+    items, cursor = keyset_page(CompanyModel.query, CompanyModel.id, '', 3)
+    assert len(items) == 3
+    assert cursor is None
+
+
+def test_empty_table(app):
+    assert keyset_page(CompanyModel.query, CompanyModel.id, '', 20) == ([], None)
+
+
+def test_cursor_round_trip_and_invalid_cursor(client):
+    assert decode_cursor(encode_cursor(42)) == 42
+    assert decode_cursor('') is None
+    response = client.get('/api/company/list?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+def test_cursor_list_clamps_per_page(client):
+    add_companies(3)
+    for per_page in (0, -1):
+        response = client.get(f'/api/company/list?cursor=&per_page={per_page}')
+        assert response.status_code == 200
+        body = response.get_json()
+        assert (body['per_page'], len(body['data']), body['has_next']) == (1, 1, True)
+    response = client.get(f'/api/hotel/list?cursor=&per_page={MAX_PER_PAGE + 1}')
+    assert response.get_json()['per_page'] == MAX_PER_PAGE
@@ -0,0 +1,54 @@
+from blueprint.business_park import BusinessParkModel
+from blueprint.company import CompanyModel, park_company_rows
+from blueprint.hotel import HotelModel
+from exts import db
+
+
+def test_new_company_sees_resolved_park_after_flush(app):
+    park = BusinessParkModel(name='P1', company_name='A')
+    db.session.add(park)
+    db.session.flush()
+
+    company = CompanyModel(company_name='A')
+    db.session.add(company)
+    db.session.flush()
+    assert company.business_park_id == park.id
+    assert company.park is park
+
+
+def test_loaded_companies_follow_park_changes(app):
+    company = CompanyModel(company_name='A')
+    db.session.add(company)
+    db.session.commit()
+    assert company.park is None
+
+    park = BusinessParkModel(name='P1', company_name='A')
+    db.session.add(park)
+    db.session.flush()
+    assert company.park is park
+
+    db.session.delete(park)
+    db.session.flush()
+    assert company.business_park_id is None
+
+
+def test_park_name_text_does_not_link_other_companies(app, client):
+    # Z 的楼园文本写的是 P1，但楼园表中 P1 只登记了 X；X 在楼园表中出现两行
+    db.session.add_all([
+        BusinessParkModel(name='P1', company_name='X'),
+        BusinessParkModel(name='P2', company_name='Y'),
+        BusinessParkModel(name='P3', company_name='X'),
+        CompanyModel(company_name='X', visitor_name='张三'),
+        CompanyModel(company_name='Z', business_park='P1', visitor_name='李四'),
+        HotelModel(hotel_name='Y', visitor_name='王五'),
+    ])
+    db.session.commit()
+
+    assert CompanyModel.query.filter_by(company_name='Z').one().business_park_id is None
+    rows = [(row[0], row[1], row[9]) for row in park_company_rows()]
+    assert rows == [('P1', 'X', '张三'), ('P2', 'Y', None), ('P3', 'X', '张三')]
+
+    page = client.get('/park/list').get_data(as_text=True)
+    assert page.count('张三') == 2
+    assert '王五' in page
+    assert '李四' not in page
@@ -0,0 +1,22 @@
+import pytest
+from flask import Flask
+
+from utils.settings import load_config
+
+
+def test_prod_requires_secret_key_from_environment(monkeypatch):
+    monkeypatch.delenv('ECC_SECRET_KEY', raising=False)
+    with pytest.raises(ValueError, match='SECRET_KEY'):
+        load_config(Flask(__name__), 'prod')
+
+    monkeypatch.setenv('ECC_SECRET_KEY', 'from-env')
+    app = Flask(__name__)
+    assert load_config(app, 'prod') == 'prod'
+    assert app.config['SECRET_KEY'] == 'from-env'
+
+
+def test_other_profiles_keep_default_secret_key(monkeypatch):
+    monkeypatch.delenv('ECC_SECRET_KEY', raising=False)
+    app = Flask(__name__)
+    load_config(app, 'test')
+    assert app.config['SECRET_KEY']
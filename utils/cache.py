@@ -0,0 +1,71 @@
+'''
+进程内缓存
+
+LRU + 过期时间：超过 maxsize 时淘汰最久未使用的条目，超过 ttl 秒的条目视为失效。
+多进程部署时每个进程各有一份，其他进程的修改最多延迟 ttl 秒可见。
+配置 CACHE_BACKEND = 'none' 时不缓存（测试环境）。
+'''
+import threading
+import time
+from collections import OrderedDict
+
+
+def caching_enabled(config):
+    return config.get('CACHE_BACKEND', 'memory') != 'none'
+
+
+class LRUCache:
+
+    def __init__(self, maxsize=128, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader=None, ttl=None):
+        '''
+        取缓存，未命中或已过期时调用 loader(key) 加载并缓存；loader 返回 None 时不缓存
+        '''
+        now = time.monotonic()
+        with self._lock:
+            cached = self._data.get(key)
+            if cached and cached[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        if loader is None:
+            return None
+        value = loader(key)
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def configure(self, maxsize, ttl):
+        '''按应用配置调整大小和过期时间，已缓存的条目清空；maxsize 为 0 时不缓存'''
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._data.clear()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses}
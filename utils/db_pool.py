@@ -0,0 +1,140 @@
+'''
+数据库连接池
+
+生产环境（MySQL）使用 QueuePool，池大小、溢出连接数、回收时间、取连接前探活均可在 config 中配置：
+- DB_POOL_SIZE：常驻连接数，建议不小于每个 worker 的线程数；
+- DB_MAX_OVERFLOW：高峰时允许临时多开的连接数，归还后关闭；
+- DB_POOL_TIMEOUT：连接耗尽时等待的秒数，超时抛出 TimeoutError；
+- DB_POOL_RECYCLE：连接使用超过该秒数后重建，须小于 MySQL 的 wait_timeout；
+- DB_POOL_PRE_PING：取出连接时先探活，避免拿到已被服务端断开的连接。
+多 worker 部署时每个进程各有一个池，数据库连接总数上限为 worker 数 ×（DB_POOL_SIZE + DB_MAX_OVERFLOW）。
+
+MeteredQueuePool 在 QueuePool 的基础上统计取连接的等待时间、超时次数、新建/失效连接数，
+由 /api/system/pool 返回，用于按实际流量调整 worker 数和池大小。
+'''
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_POOL_RECYCLE = 1800
+
+
+class PoolMetrics:
+    '''连接池累计指标，多线程共享'''
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    '''
+    记录取连接耗时的 QueuePool；耗时包括等待空闲连接和池未满时新建连接的时间
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        # recreate() 时监听随 _dispatch 一起复制到新池，不重复注册
+        if '_dispatch' not in kwargs:
+            event.listen(self, 'connect', lambda *_: self.metrics.count('connects'))
+            event.listen(self, 'invalidate', lambda *_: self.metrics.count('invalidations'))
+
+    def recreate(self):
+        # engine.dispose() 重建连接池时保留累计指标
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+def engine_options(config):
+    '''
+    按配置生成连接池参数；SQLite 使用 SQLAlchemy 默认的连接池，不设置
+    :param config: app.config
+    '''
+    if make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        "poolclass": MeteredQueuePool,
+        "pool_size": config.get('DB_POOL_SIZE', DEFAULT_POOL_SIZE),
+        "max_overflow": config.get('DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW),
+        "pool_timeout": config.get('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+        "pool_recycle": config.get('DB_POOL_RECYCLE', DEFAULT_POOL_RECYCLE),
+        "pool_pre_ping": config.get('DB_POOL_PRE_PING', True),
+    }
+
+
+def configure_pool(app):
+    '''在 db.init_app 之前调用；SQLALCHEMY_ENGINE_OPTIONS 中已显式设置的参数优先'''
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
+
+
+def pool_stats(engine):
+    '''当前进程连接池的状态'''
+    pool = engine.pool
+    stats = {"pid": os.getpid(), "pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # 负数表示池还没有建满
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    else:
+        stats["status"] = pool.status()
+    if isinstance(pool, MeteredQueuePool):
+        stats.update(pool.metrics.to_dict())
+    return stats
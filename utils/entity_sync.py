@@ -0,0 +1,101 @@
+'''
+派生表的实体登记与同步
+
+名称 n-gram 索引（utils/search_index.py）、统一搜索（utils/global_search.py）、统计汇总（utils/stats.py）
+都从企业、酒店、连锁门店派生，维护方式相同：
+- 按实体名登记模型和参与派生的列；
+- ORM flush 时找出新增、删除以及参与派生的列有变化的记录；
+- 批量导入后按自然键查出本次写入的记录（统计汇总还需要在写入前读取旧值）。
+这部分由 EntityRegistry 统一提供，各模块只实现“这些记录如何写入派生表”。
+'''
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from utils.bulk_import import after_import, before_import
+
+QUERY_CHUNK_SIZE = 1000
+
+
+def select_in_chunks(conn, stmt, column, values, chunk_size=QUERY_CHUNK_SIZE):
+    '''给 stmt 加上 column IN (values) 分块执行，逐行返回'''
+    values = list(values)
+    for start in range(0, len(values), chunk_size):
+        yield from conn.execute(stmt.where(column.in_(values[start:start + chunk_size])))
+
+
+class EntityRegistry(dict):
+    '''
+    实体名 -> (模型, 配置) 的登记表，配置的含义由使用方决定
+    :param watched: watched(配置) 返回参与派生的列名，修改时只有这些列变化才需要同步
+    '''
+
+    def __init__(self, watched):
+        super().__init__()
+        self.watched = watched
+
+    def register(self, entity, model, options):
+        self[entity] = (model, options)
+
+    def entity_of(self, model):
+        for entity, (registered, _) in self.items():
+            if registered is model:
+                return entity
+        return None
+
+    def changes(self, session):
+        '''
+        会话中需要同步的记录
+        :return: {实体名: [(对象, 'new' / 'dirty' / 'deleted')]}
+        '''
+        changes = {}
+        for kind, objs in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+            for obj in objs:
+                entity = self.entity_of(type(obj))
+                if entity is None:
+                    continue
+                if kind == 'dirty':
+                    attrs = inspect(obj).attrs
+                    if not any(attrs[name].history.has_changes() for name in self.watched(self[entity][1])):
+                        continue
+                changes.setdefault(entity, []).append((obj, kind))
+        return changes
+
+    def on_flush(self, event_name='after_flush'):
+        '''
+        注册 ORM 写入时的同步 fn(conn, entity, changes)，按实体分别调用，没有变化的实体不调用
+        :param event_name: after_flush（同步时已有 id）或 before_flush（需要读取修改前的值）
+        '''
+        def decorator(fn):
+            @event.listens_for(Session, event_name)
+            def listener(session, *args):
+                changes = self.changes(session)
+                if changes:
+                    conn = session.connection()
+                    for entity, rows in changes.items():
+                        fn(conn, entity, rows)
+            return fn
+        return decorator
+
+    def before_import(self, fn):
+        '''注册批量导入写入前的回调 fn(conn, entity, spec, frame)，只对登记的实体调用'''
+        @before_import
+        def hook(spec, conn, frame):
+            entity = self.entity_of(spec.model)
+            if entity is not None:
+                fn(conn, entity, spec, frame)
+        return fn
+
+    def after_import(self, fn):
+        '''注册批量导入写入后的回调 fn(conn, entity, spec, frame)，只对登记且有自然键的实体调用'''
+        @after_import
+        def hook(spec, conn, frame):
+            entity = self.entity_of(spec.model)
+            if entity is not None and spec.key:
+                fn(conn, entity, spec, frame)
+        return fn
+
+    def imported_ids(self, conn, entity, spec, frame):
+        '''按自然键查出本次导入写入的记录 id'''
+        model, _ = self[entity]
+        return [row[0] for row in select_in_chunks(conn, select(model.id), getattr(model, spec.key),
+                                                    frame[spec.key].tolist())]
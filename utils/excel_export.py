@@ -0,0 +1,110 @@
+'''
+流式导出工具
+
+xlsx：openpyxl 的 write-only 模式逐行写入临时文件，内存占用与行数无关；
+生成完毕后按块读取临时文件返回给浏览器，发送结束后删除临时文件。
+csv：边读游标边输出，行一产生就发送给浏览器。
+'''
+import csv
+import io
+import os
+import tempfile
+from urllib.parse import quote
+
+from flask import Response, stream_with_context
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_MIMETYPE = 'text/csv'
+STREAM_CHUNK_SIZE = 64 * 1024
+QUERY_YIELD_PER = 1000
+
+
+def content_disposition(download_name):
+    '''中文文件名需要按 RFC 5987 编码'''
+    return f"attachment; filename*=UTF-8''{quote(download_name)}"
+
+
+def write_xlsx(rows, headers, sheet_name, path=None):
+    '''
+    以 write-only 模式把行写入 xlsx 文件
+    :param rows: 可迭代的行（元组或列表）
+    :param headers: 表头
+    :param sheet_name: sheet 名称
+    :param path: 目标路径，为空时写入临时文件
+    :return: 文件路径，临时文件由调用方负责删除
+    '''
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(list(row))
+
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+    try:
+        workbook.save(path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def write_csv(rows, headers, path):
+    '''把行写入 csv 文件，文件头带 BOM，方便 Excel 直接打开中文内容'''
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(rows)
+    return path
+
+
+def stream_file(path, download_name, mimetype, remove=True):
+    '''按块发送文件，remove 为 True 时发送结束后删除文件'''
+    def generate():
+        try:
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            if remove:
+                os.remove(path)
+
+    response = Response(generate(), mimetype=mimetype)
+    response.headers['Content-Disposition'] = content_disposition(download_name)
+    response.headers['Content-Length'] = str(os.path.getsize(path))
+    return response
+
+
+def stream_xlsx(rows, headers, sheet_name, download_name):
+    '''把查询结果写成 xlsx 并以流的形式返回'''
+    path = write_xlsx(rows, headers, sheet_name)
+    return stream_file(path, download_name, XLSX_MIMETYPE)
+
+
+def stream_csv(rows, headers, download_name):
+    '''
+    边迭代查询结果边输出 csv，攒够 STREAM_CHUNK_SIZE 就发送一次
+    文件头带 BOM，方便 Excel 直接打开中文内容
+    '''
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+            if buffer.tell() >= STREAM_CHUNK_SIZE:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+
+    # 查询游标在生成器中继续读取，需要保持请求上下文
+    response = Response(stream_with_context(generate()), mimetype=CSV_MIMETYPE)
+    response.headers['Content-Disposition'] = content_disposition(download_name)
+    return response
@@ -0,0 +1,178 @@
+'''
+跨实体统一搜索
+
+企业、酒店、连锁门店的名称、关键人、关键人电话、拜访人写入同一张反规范化的 search_entry 表，
+每条记录按字段拆成若干检索词，并带上展示用的字段，一次按检索词前缀的索引查询即可返回三类结果：
+- 名称、关键人姓名：存每个后缀（"深圳华为技术" -> "深圳华为技术"、"圳华为技术"、"华为技术" …），
+  子串查询变成后缀上的前缀查询；
+- 电话：存数字本身和倒序的数字，可按前几位或后几位查找；
+- 拜访人：存全称。
+相关度 = 字段权重，从开头匹配（名称前缀、电话前缀/尾号）加倍，与检索词完全相同再加一倍。
+
+索引随写入维护：ORM 的新增/修改/删除在 flush 时同步，批量导入在写入后按自然键重建。
+'''
+import re
+
+from sqlalchemy import and_, case, delete, func, insert, or_, select
+
+from exts import db
+from utils.entity_sync import QUERY_CHUNK_SIZE, EntityRegistry
+
+# 实体名 -> (模型, {角色: 列名})，角色为 name、person、phone、visitor
+GLOBAL_SEARCHABLE = EntityRegistry(lambda columns: columns.values())
+
+# 各角色的基础权重
+WEIGHTS = {'name': 10, 'person': 8, 'phone': 8, 'phone_tail': 8, 'visitor': 3}
+TERM_LENGTH = 64
+MAX_SUFFIXES = 50
+
+
+class SearchEntryModel(db.Model):
+    '''
+    统一搜索索引表：每个检索词一行，冗余保存展示字段，查询时不再回表
+    '''
+    __tablename__ = 'search_entry'
+    __table_args__ = (
+        db.Index('ix_search_entry_term', 'term', 'entity', 'entity_id'),
+        db.Index('ix_search_entry_entity_id', 'entity', 'entity_id'),
+        {'extend_existing': True}
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    field = db.Column(db.String(20), nullable=False)
+    term = db.Column(db.String(TERM_LENGTH), nullable=False)
+    weight = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(500))
+    key_person_name = db.Column(db.String(500))
+    key_person_phone = db.Column(db.String(500))
+    visitor_name = db.Column(db.String(500))
+
+
+def register_global_search(entity, model, columns):
+    '''
+    登记参与统一搜索的实体
+    :param columns: {角色: 列名}，例如 {'name': 'company_name', 'phone': 'key_person_phone'}
+    '''
+    GLOBAL_SEARCHABLE.register(entity, model, dict(columns))
+
+
+def normalize(text):
+    return re.sub(r'\s+', '', str(text)).lower() if text is not None else ''
+
+
+def terms_for(values):
+    '''
+    一条记录的检索词
+    :param values: {角色: 值}
+    :return: [(字段, 检索词, 权重)]
+    '''
+    terms = []
+    for role in ('name', 'person'):
+        text = normalize(values.get(role))
+        for position in range(min(len(text), MAX_SUFFIXES)):
+            weight = WEIGHTS[role] * (2 if position == 0 else 1)
+            terms.append((role, text[position:position + TERM_LENGTH], weight))
+    digits = re.sub(r'\D', '', str(values.get('phone') or ''))[:TERM_LENGTH]
+    if digits:
+        terms.append(('phone', digits, WEIGHTS['phone'] * 2))
+        terms.append(('phone_tail', digits[::-1], WEIGHTS['phone_tail'] * 2))
+    visitor = normalize(values.get('visitor'))[:TERM_LENGTH]
+    if visitor:
+        terms.append(('visitor', visitor, WEIGHTS['visitor'] * 2))
+    return terms
+
+
+def reindex(conn, entity, rows):
+    '''
+    重建指定记录的检索词
+    :param rows: [(id, {角色: 值})]，值为 None 表示记录已删除，只删除检索词
+    '''
+    table = SearchEntryModel.__table__
+    ids = [row_id for row_id, _ in rows]
+    if not ids:
+        return
+    conn.execute(delete(table).where(table.c.entity == entity, table.c.entity_id.in_(ids)))
+    entries = []
+    for row_id, values in rows:
+        if values is None:
+            continue
+        display = {
+            'name': values.get('name'),
+            'key_person_name': values.get('person'),
+            'key_person_phone': values.get('phone'),
+            'visitor_name': values.get('visitor'),
+        }
+        for field, term, weight in terms_for(values):
+            entries.append(dict(display, entity=entity, entity_id=row_id, field=field, term=term, weight=weight))
+    if entries:
+        conn.execute(insert(table), entries)
+
+
+def reindex_ids(conn, entity, ids, chunk_size=QUERY_CHUNK_SIZE):
+    '''按 id 分块读取后重建，用于批量导入和回填'''
+    model, columns = GLOBAL_SEARCHABLE[entity]
+    roles = list(columns)
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        stmt = select(model.id, *[getattr(model, columns[role]) for role in roles]).where(model.id.in_(chunk))
+        rows = [(row[0], dict(zip(roles, row[1:]))) for row in conn.execute(stmt)]
+        found = {row_id for row_id, _ in rows}
+        reindex(conn, entity, rows + [(row_id, None) for row_id in chunk if row_id not in found])
+
+
+def reindex_all(conn, entity, chunk_size=QUERY_CHUNK_SIZE):
+    '''全量重建一个实体（迁移回填用），返回记录数'''
+    model, _ = GLOBAL_SEARCHABLE[entity]
+    ids = list(conn.execute(select(model.id).order_by(model.id)).scalars())
+    reindex_ids(conn, entity, ids, chunk_size)
+    return len(ids)
+
+
+def search(text, entities=None, page=1, per_page=20):
+    '''
+    统一搜索，一次查询按相关度排序返回
+    :return: (本页结果, 总数)
+    '''
+    table = SearchEntryModel.__table__
+    term = normalize(text)[:TERM_LENGTH]
+    digits = re.sub(r'\D', '', term)
+    conditions = [and_(table.c.field != 'phone_tail', table.c.term.startswith(term, autoescape=True))]
+    if digits and digits == term:
+        # 纯数字时同时按电话尾号查找
+        conditions.append(and_(table.c.field == 'phone_tail', table.c.term.startswith(digits[::-1])))
+    where = [or_(*conditions)]
+    if entities:
+        where.append(table.c.entity.in_(entities))
+
+    exact = and_(table.c.term == term, table.c.field != 'phone_tail')
+    score = func.max(table.c.weight + case((exact, table.c.weight), else_=0)).label('score')
+    group = [table.c.entity, table.c.entity_id, table.c.name, table.c.key_person_name,
+             table.c.key_person_phone, table.c.visitor_name]
+    stmt = select(*group, score).where(*where).group_by(*group)
+    rows = db.session.execute(
+        stmt.order_by(score.desc(), table.c.entity, table.c.entity_id)
+        .limit(per_page).offset((page - 1) * per_page)
+    ).mappings().all()
+    total = db.session.execute(
+        select(func.count()).select_from(
+            select(table.c.entity, table.c.entity_id).where(*where).distinct().subquery()
+        )
+    ).scalar()
+    return [dict(row) for row in rows], total
+
+
+@GLOBAL_SEARCHABLE.on_flush()
+def _sync_after_flush(conn, entity, changes):
+    '''ORM 写入时同步检索词，修改时只有参与搜索的字段变化才重建'''
+    _, columns = GLOBAL_SEARCHABLE[entity]
+    reindex(conn, entity, [
+        (obj.id, None if kind == 'deleted' else {role: getattr(obj, name) for role, name in columns.items()})
+        for obj, kind in changes
+    ])
+
+
+@GLOBAL_SEARCHABLE.after_import
+def _sync_after_import(conn, entity, spec, frame):
+    '''批量导入后按自然键查出 id 重建'''
+    reindex_ids(conn, entity, GLOBAL_SEARCHABLE.imported_ids(conn, entity, spec, frame))
@@ -0,0 +1,338 @@
+'''
+后台任务
+
+导入、导出在进程池中执行，上传接口立即返回任务 id；
+任务状态与进度保存在数据库 job 表中，不依赖额外的消息队列。
+子进程按提交任务的应用的运行环境（PROFILE）和 WORKER_SETTINGS 中的配置创建最小应用，连接同一个数据库。
+
+任务清理（提交任务时执行，也可用 flask --app app job cleanup 定时执行）：
+- 等待中、执行中的任务超过 JOB_STALE_SECONDS 没有进展（执行进程已退出）时标记为失败；
+- 已结束超过 JOB_RETENTION_SECONDS 的任务连同导出文件一起删除。
+执行进程异常退出导致进程池损坏时，本进程内提交的任务立即标记为失败，并重建进程池。
+'''
+import functools
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select, update
+from sqlalchemy.engine import make_url
+
+from exts import db
+from utils.bulk_import import run_import
+from utils.db_pool import configure_pool
+from utils.excel_export import QUERY_YIELD_PER, write_csv, write_xlsx
+from utils.settings import load_config
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+_executor = None
+
+DEFAULT_STALE_SECONDS = 3600
+DEFAULT_RETENTION_SECONDS = 24 * 3600
+
+job_cli = AppGroup('job', help='后台任务')
+
+# 随任务传给子进程的配置：子进程按提交任务的应用的运行环境加载配置后，再用这些值覆盖，
+# create_app(**settings) 中的覆盖项也能传到子进程
+WORKER_SETTINGS = [
+    'SQLALCHEMY_DATABASE_URI',
+    'DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_TIMEOUT', 'DB_POOL_RECYCLE', 'DB_POOL_PRE_PING',
+    'IMPORT_CHUNK_SIZE', 'UPLOAD_FOLDER',
+]
+
+
+class JobError(Exception):
+    '''任务无法提交，message 直接返回给调用方'''
+
+
+class JobModel(db.Model):
+    '''
+    后台任务模型
+    '''
+    __tablename__ = 'job'
+    __table_args__ = {'extend_existing': True}
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(20))  # import / export
+    target = db.Column(db.String(50))  # company / hotel / park_company ...
+    params = db.Column(db.JSON)
+    status = db.Column(db.String(20), default=JOB_PENDING)
+    rows_parsed = db.Column(db.Integer, default=0)
+    rows_written = db.Column(db.Integer, default=0)
+    errors = db.Column(db.JSON)
+    report = db.Column(db.JSON)
+    result_path = db.Column(db.String(500))
+    download_name = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    # 最后一次状态或进度更新的时间，用于识别执行进程已退出的任务
+    updated_at = db.Column(db.DateTime, default=datetime.now)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "target": self.target,
+            "status": self.status,
+            "rows_parsed": self.rows_parsed,
+            "rows_written": self.rows_written,
+            "errors": self.errors or [],
+            "report": self.report,
+            "download_name": self.download_name if self.status == JOB_DONE else None,
+            "created_at": self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            "finished_at": self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None
+        }
+
+
+def job_folder():
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'jobs')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def get_executor():
+    '''
+    进程池按需创建；使用 spawn 启动子进程，避免继承父进程中的数据库连接
+    '''
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=current_app.config.get('JOB_WORKERS') or os.cpu_count(),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
+
+
+def worker_settings(config):
+    '''
+    子进程使用的运行环境与配置；内存 SQLite 每个连接各是一个库，子进程无法访问，直接拒绝
+    :return: (运行环境, {配置项: 值})
+    '''
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        raise JobError('内存 SQLite 数据库无法在后台任务进程中访问，请使用 SQLite 文件或 MySQL')
+    return config.get('PROFILE'), {name: config[name] for name in WORKER_SETTINGS if name in config}
+
+
+def create_job(kind, target, params, file=None):
+    '''
+    登记任务并提交到进程池
+    :param kind: import / export
+    :param target: 导入的实体或导出的类型
+    :param params: 任务参数
+    :param file: 导入任务上传的文件，保存到任务目录后由子进程读取
+    :return: JobModel
+    '''
+    profile, settings = worker_settings(current_app.config)
+    job = JobModel(id=uuid.uuid4().hex, kind=kind, target=target, params=dict(params), status=JOB_PENDING)
+    if file is not None:
+        job.params['path'] = os.path.join(job_folder(), f'{job.id}.xlsx')
+        file.save(job.params['path'])
+    db.session.add(job)
+    db.session.commit()
+
+    future = get_executor().submit(run_job, job.id, profile, settings)
+    future.add_done_callback(functools.partial(_check_worker_exit, current_app._get_current_object(), job.id))
+    cleanup_jobs()
+    return job
+
+
+def _check_worker_exit(app, job_id, future):
+    '''
+    任务结束时的回调（在本进程中执行）：run_job 自己会记录任务的异常，
+    这里只处理执行进程异常退出（BrokenProcessPool）等 run_job 来不及记录的情况
+    '''
+    global _executor
+    if future.cancelled() or future.exception() is None:
+        return
+    if isinstance(future.exception(), BrokenProcessPool):
+        # 损坏的进程池不能再提交任务，下次提交时重建
+        _executor = None
+    with app.app_context():
+        fail_jobs(JobModel.id == job_id, f'执行进程异常退出：{future.exception()}')
+
+
+def fail_jobs(condition, message):
+    '''把满足条件且尚未结束的任务标记为失败，返回处理的任务数'''
+    table = JobModel.__table__
+    now = datetime.now()
+    with db.engine.begin() as conn:
+        return conn.execute(
+            update(table)
+            .where(condition, table.c.status.in_([JOB_PENDING, JOB_RUNNING]))
+            .values(status=JOB_FAILED, errors=[message], finished_at=now, updated_at=now)
+        ).rowcount
+
+
+def remove_file(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def cleanup_jobs(now=None):
+    '''
+    标记已中断的任务，删除过期的任务及其文件
+    :return: (标记为失败的任务数, 删除的任务数)
+    '''
+    now = now or datetime.now()
+    config = current_app.config
+    stale_before = now - timedelta(seconds=config.get('JOB_STALE_SECONDS', DEFAULT_STALE_SECONDS))
+    expire_before = now - timedelta(seconds=config.get('JOB_RETENTION_SECONDS', DEFAULT_RETENTION_SECONDS))
+
+    stale = fail_jobs(func.coalesce(JobModel.updated_at, JobModel.created_at) < stale_before,
+                      '任务长时间没有进展，执行进程可能已退出')
+
+    expired = db.session.execute(
+        select(JobModel).where(JobModel.status.in_([JOB_DONE, JOB_FAILED]), JobModel.finished_at < expire_before)
+    ).scalars().all()
+    for job in expired:
+        # 导出结果，以及未被执行的导入任务留下的上传文件
+        remove_file(job.result_path)
+        remove_file((job.params or {}).get('path'))
+        db.session.delete(job)
+    db.session.commit()
+    return stale, len(expired)
+
+
+@job_cli.command('cleanup')
+def cleanup_command():
+    '''标记已中断的任务为失败，删除过期的任务及导出文件'''
+    stale, expired = cleanup_jobs()
+    click.echo(f'标记为失败：{stale} 个，删除过期任务：{expired} 个')
+
+
+# ----------- 以下在子进程中执行 -------------
+_worker_apps = {}
+
+
+def get_worker_app(profile, settings):
+    '''
+    子进程内的最小应用，只用于提供数据库会话：与提交任务的应用使用相同的运行环境和数据库，
+    连接池参数（探活、回收）同样生效
+    '''
+    key = (profile, tuple(sorted(settings.items())))
+    if key not in _worker_apps:
+        app = Flask(__name__)
+        load_config(app, profile)
+        app.config.update(settings)
+        # 后台任务不输出 SQL 日志
+        app.config['SQLALCHEMY_ECHO'] = False
+        configure_pool(app)
+        db.init_app(app)
+        _worker_apps[key] = app
+    return _worker_apps[key]
+
+
+def update_job(job_id, **values):
+    '''进度单独开事务写入，不影响导入本身的事务'''
+    values.setdefault('updated_at', datetime.now())
+    with db.engine.begin() as conn:
+        conn.execute(update(JobModel.__table__).where(JobModel.__table__.c.id == job_id).values(**values))
+
+
+def run_job(job_id, profile, settings):
+    app = get_worker_app(profile, settings)
+    with app.app_context():
+        job = db.session.get(JobModel, job_id)
+        if job is None:
+            return
+        handler = JOB_HANDLERS[job.kind]
+        update_job(job_id, status=JOB_RUNNING)
+        try:
+            values = handler(job) or {}
+            update_job(job_id, status=JOB_DONE, finished_at=datetime.now(), **values)
+        except Exception as e:
+            db.session.rollback()
+            update_job(job_id, status=JOB_FAILED, finished_at=datetime.now(), errors=[str(e)])
+
+
+def import_specs():
+    from blueprint.business_park import BUSINESS_PARK_IMPORT
+    from blueprint.chain_band import CHAIN_BAND_IMPORT
+    from blueprint.chain_store import CHAIN_STORE_IMPORT
+    from blueprint.company import COMPANY_IMPORT
+    from blueprint.hotel import HOTEL_IMPORT
+    return {
+        'company': COMPANY_IMPORT,
+        'hotel': HOTEL_IMPORT,
+        'chain_store': CHAIN_STORE_IMPORT,
+        'chain_band': CHAIN_BAND_IMPORT,
+        'park': BUSINESS_PARK_IMPORT
+    }
+
+
+def export_sources():
+    '''导出类型 -> (列定义, 查询函数, sheet 名称)'''
+    from blueprint.chain_store import CHAIN_STORE_EXPORT_COLUMNS, chain_band_store_rows
+    from blueprint.company import PARK_COMPANY_EXPORT_COLUMNS, park_company_rows
+    return {
+        'park_company': (PARK_COMPANY_EXPORT_COLUMNS, park_company_rows, '楼园企业导出'),
+        'chain_band_store': (CHAIN_STORE_EXPORT_COLUMNS, chain_band_store_rows, '连锁品牌商铺导出')
+    }
+
+
+def run_import_job(job):
+    import pandas as pd
+    spec = import_specs()[job.target]
+    path = job.params['path']
+    try:
+        df = pd.read_excel(path, dtype=str)
+    except Exception:
+        raise ValueError('无法读取Excel文件，请确认格式')
+    finally:
+        os.remove(path)
+    if not spec.header_matches(df):
+        raise ValueError('Excel表头不符合预期')
+
+    update_job(job.id, rows_parsed=len(df))
+    # SQLite 写事务锁整个库，导入提交前无法另开事务写进度，只在结束时汇报
+    progress = None
+    if db.engine.dialect.name != 'sqlite':
+        progress = lambda written: update_job(job.id, rows_written=written)
+    report = run_import(spec, df, chunk_size=job.params.get('chunk_size'), progress=progress)
+    return {'rows_written': report['inserted'] + report['updated'], 'report': report}
+
+
+def run_export_job(job):
+    columns, query_rows, sheet_name = export_sources()[job.target]
+    export_format = job.params.get('format', 'xlsx')
+    headers = [title for _, title in columns]
+    counter = {'rows': 0}
+    # 与导入相同，SQLite 下读游标未关闭时无法另开事务写进度
+    report_progress = db.engine.dialect.name != 'sqlite'
+
+    def counted(rows):
+        for row in rows:
+            yield row
+            counter['rows'] += 1
+            if report_progress and counter['rows'] % QUERY_YIELD_PER == 0:
+                update_job(job.id, rows_parsed=counter['rows'], rows_written=counter['rows'])
+
+    path = os.path.join(job_folder(), f'{job.id}.{export_format}')
+    if export_format == 'csv':
+        write_csv(counted(query_rows()), headers, path)
+    else:
+        write_xlsx(counted(query_rows()), headers, sheet_name, path=path)
+
+    now_str = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return {
+        'rows_parsed': counter['rows'],
+        'rows_written': counter['rows'],
+        'result_path': path,
+        'download_name': f'{sheet_name}_{now_str}.{export_format}'
+    }
+
+
+JOB_HANDLERS = {
+    'import': run_import_job,
+    'export': run_export_job
+}
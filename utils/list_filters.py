@@ -0,0 +1,86 @@
+'''
+列表接口的筛选与排序
+
+支持的查询参数：
+    name_prefix            名称前缀，走名称列索引
+    name                   名称包含，走 n-gram 索引
+    visitor_name           拜访人
+    other_carrier          异网运营商
+    expiry_from/expiry_to  友商产品到期时间范围，按解析后的日期列 competitor_expiry_date 比较（走索引），
+                           参数支持 yyyy-mm-dd、yyyy/m/d、yyyy年m月d日 等写法
+    update_from/update_to  更新时间范围（yyyymmdd）
+    sort                   逗号分隔的排序字段，字段前加 - 表示倒序，例如 -update_time,id
+'''
+from utils.normalization import parse_dates, parse_value
+from utils.search_index import SEARCHABLE, matching_ids
+
+SORTABLE_FIELDS = ('id', 'update_time', 'visitor_name', 'other_carrier', 'competitor_expiry')
+
+# 排序字段 -> 实际排序的列：自由文本按解析后的影子列排序
+SORT_COLUMNS = {'competitor_expiry': 'competitor_expiry_date'}
+
+
+def apply_list_filters(query, entity, args):
+    '''
+    :param query: 基础查询，例如 CompanyModel.query
+    :param entity: search_index 中登记的实体名
+    :param args: request.args
+    :return: (过滤后的查询, 排序表达式列表，未指定 sort 时为空, 是否有筛选条件)
+    '''
+    model, name_column = SEARCHABLE[entity]
+    conditions = []
+
+    name_prefix = args.get('name_prefix', '').strip()
+    if name_prefix:
+        conditions.append(name_column.startswith(name_prefix, autoescape=True))
+
+    name = args.get('name', '').strip()
+    if name:
+        conditions.append(model.id.in_(matching_ids(entity, name)))
+        conditions.append(name_column.contains(name, autoescape=True))
+
+    for field in ('visitor_name', 'other_carrier'):
+        value = args.get(field, '').strip()
+        if value:
+            conditions.append(getattr(model, field) == value)
+
+    expiry_from = parse_date_arg(args, 'expiry_from')
+    if expiry_from:
+        conditions.append(model.competitor_expiry_date >= expiry_from)
+    expiry_to = parse_date_arg(args, 'expiry_to')
+    if expiry_to:
+        conditions.append(model.competitor_expiry_date <= expiry_to)
+
+    if args.get('update_from'):
+        conditions.append(model.update_time >= args['update_from'])
+    if args.get('update_to'):
+        conditions.append(model.update_time <= args['update_to'])
+
+    if conditions:
+        query = query.filter(*conditions)
+    return query, parse_sort(model, name_column, args.get('sort', '')), bool(conditions)
+
+
+def parse_date_arg(args, name):
+    '''日期参数按与 competitor_expiry_date 相同的规则解析，无法解析时抛出 ValueError'''
+    if not args.get(name):
+        return None
+    value = parse_value(parse_dates, args[name])
+    if value is None:
+        raise ValueError(f'{name} 不是有效的日期')
+    return value
+
+
+def parse_sort(model, name_column, sort):
+    allowed = set(SORTABLE_FIELDS) | {name_column.key}
+    order_by = []
+    for item in filter(None, (part.strip() for part in sort.split(','))):
+        field = item.lstrip('-')
+        if field not in allowed:
+            raise ValueError(f'不支持按 {field} 排序')
+        column = getattr(model, SORT_COLUMNS.get(field, field))
+        order_by.append(column.desc() if item.startswith('-') else column.asc())
+    if order_by:
+        # 以 id 兜底，保证分页结果稳定
+        order_by.append(model.id.asc())
+    return order_by
@@ -0,0 +1,310 @@
+'''
+请求耗时与 SQL 查询统计
+
+init_metrics(app) 注册请求钩子和 SQLAlchemy 引擎事件，按接口（Flask endpoint）累计：
+- 请求数（按方法、状态码）与耗时直方图；
+- 每个请求执行的 SQL 条数直方图、SQL 总条数与总耗时；
+- SQL 条数超过 N_PLUS_ONE_THRESHOLD 的请求数（疑似 N+1 查询），同时记录一条警告日志。
+另外附带连接池状态（见 utils/db_pool.py）。/metrics 以 Prometheus 文本格式输出。
+
+统计保存在进程内。gunicorn 多 worker 部署时配置 METRICS_DIR（gunicorn.conf.py 中已设置），
+各 worker 由后台线程每 METRICS_FLUSH_SECONDS 秒把自己的统计写入该目录下的 <pid>.json，/metrics 汇总目录中所有文件；
+worker 退出后其计数并入 archive.json，累计值不会因 worker 重启而减少。
+'''
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from exts import db
+from utils.db_pool import pool_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 20
+DEFAULT_FLUSH_SECONDS = 1
+ARCHIVE_FILE = 'archive.json'
+
+# 指标名 -> (类型, 说明)
+FAMILIES = {
+    'http_requests_total': ('counter', 'Requests by endpoint, method and status.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by endpoint and method.'),
+    'db_queries_per_request': ('histogram', 'SQL statements executed per request.'),
+    'db_queries_total': ('counter', 'SQL statements executed during requests.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent executing SQL during requests.'),
+    'n_plus_one_requests_total': ('counter', 'Requests whose SQL statement count exceeded N_PLUS_ONE_THRESHOLD.'),
+    'db_pool_size': ('gauge', 'Configured connection pool size, summed over workers.'),
+    'db_pool_checked_out': ('gauge', 'Connections currently checked out, summed over workers.'),
+    'db_pool_checkouts_total': ('counter', 'Connection checkouts.'),
+    'db_pool_timeouts_total': ('counter', 'Connection checkouts that timed out.'),
+    'db_pool_wait_seconds_total': ('counter', 'Time spent waiting for a pooled connection.'),
+}
+
+SUFFIXES = ('_bucket', '_sum', '_count')
+
+
+class MetricsRegistry:
+    '''
+    进程内的指标，每个样本为 (指标名, 标签) -> 值，标签为 ((名, 值), ...)；
+    直方图按 Prometheus 的约定拆成 _bucket（累计）、_sum、_count 三组样本
+    '''
+
+    def __init__(self):
+        self._samples = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._samples[(name, labels)] += value
+
+    def observe(self, name, labels, value, buckets):
+        with self._lock:
+            # 每个桶都要输出（计数为 0 时也输出），分位数计算才能对齐
+            for bound in buckets:
+                self._samples[(name + '_bucket', labels + (('le', format_bound(bound)),))] += 1 if value <= bound else 0
+            self._samples[(name + '_bucket', labels + (('le', '+Inf'),))] += 1
+            self._samples[(name + '_sum', labels)] += value
+            self._samples[(name + '_count', labels)] += 1
+
+    def samples(self):
+        with self._lock:
+            return dict(self._samples)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+registry = MetricsRegistry()
+_flush_lock = threading.Lock()
+_flusher = {'pid': None}
+
+
+def format_bound(bound):
+    return repr(float(bound))
+
+
+def family_of(name):
+    if name in FAMILIES:
+        return name
+    for suffix in SUFFIXES:
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def pool_samples(engine):
+    '''连接池的当前状态与累计值，只有 QueuePool 有这些数据'''
+    stats = pool_stats(engine)
+    samples = {}
+    if 'size' in stats:
+        samples[('db_pool_size', ())] = stats['size']
+        samples[('db_pool_checked_out', ())] = stats['checked_out']
+    if 'checkouts' in stats:
+        samples[('db_pool_checkouts_total', ())] = stats['checkouts']
+        samples[('db_pool_timeouts_total', ())] = stats['timeouts']
+        samples[('db_pool_wait_seconds_total', ())] = stats['wait_total_ms'] / 1000
+    return samples
+
+
+def merge_samples(target, samples, counters_only=False):
+    for key, value in samples.items():
+        if counters_only and FAMILIES.get(family_of(key[0]), ('gauge',))[0] == 'gauge':
+            continue
+        target[key] = target.get(key, 0) + value
+    return target
+
+
+# ----------- 多进程：每个 worker 的统计写入 METRICS_DIR -------------
+
+def write_snapshot(directory, samples):
+    '''先写临时文件再改名，读取方不会读到写了一半的文件'''
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump([[name, list(map(list, labels)), value] for (name, labels), value in samples.items()], f)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            rows = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {(name, tuple(map(tuple, labels))): value for name, labels, value in rows}
+
+
+def read_samples(directory):
+    '''汇总目录中所有 worker（包括已退出 worker 的归档）的统计'''
+    samples = {}
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        merge_samples(samples, read_snapshot(path))
+    return samples
+
+
+def mark_process_dead(directory, pid):
+    '''worker 退出时调用（gunicorn child_exit）：计数并入归档文件，状态值丢弃'''
+    path = os.path.join(directory, f'{pid}.json')
+    if not os.path.exists(path):
+        return
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    archive = merge_samples(read_snapshot(archive_path), read_snapshot(path), counters_only=True)
+    tmp_path = archive_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump([[name, list(map(list, labels)), value] for (name, labels), value in archive.items()], f)
+    os.replace(tmp_path, archive_path)
+    os.remove(path)
+
+
+def process_samples():
+    return merge_samples(registry.samples(), pool_samples(db.engine))
+
+
+def flush():
+    '''把本进程的统计写入 METRICS_DIR'''
+    with _flush_lock:
+        directory = current_app.config['METRICS_DIR']
+        os.makedirs(directory, exist_ok=True)
+        write_snapshot(directory, process_samples())
+
+
+def start_flusher(app):
+    '''
+    每个进程启动一个后台线程，每 METRICS_FLUSH_SECONDS 秒写一次统计；
+    在处理第一个请求时启动，flask 命令行等不处理请求的进程不会写入
+    '''
+    with _flush_lock:
+        if _flusher['pid'] == os.getpid():
+            return
+        _flusher['pid'] = os.getpid()
+    interval = app.config.get('METRICS_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                flush()
+
+    threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+
+def collect():
+    '''/metrics 输出的样本：多进程时为所有 worker 的汇总，否则为本进程'''
+    directory = current_app.config.get('METRICS_DIR')
+    if not directory:
+        return process_samples()
+    flush()
+    return read_samples(directory)
+
+
+# ----------- Prometheus 文本格式 -------------
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(samples):
+    families = defaultdict(list)
+    for (name, labels), value in samples.items():
+        families[family_of(name)].append((name, labels, value))
+    lines = []
+    for family in sorted(families):
+        kind, help_text = FAMILIES.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+
+        def order(sample):
+            name, labels, _ = sample
+            plain = [item for item in labels if item[0] != 'le']
+            le = dict(labels).get('le')
+            return plain, name, float(le) if le is not None else 0.0
+
+        for name, labels, value in sorted(families[family], key=order):
+            label_text = ','.join(f'{key}="{escape_label(val)}"' for key, val in labels)
+            lines.append(f'{name}{{{label_text}}} {format_value(value)}' if labels
+                         else f'{name} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ----------- 请求钩子与引擎事件 -------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_query_start'].pop()
+    if has_request_context() and '_metrics_start' in g:
+        g._metrics_queries += 1
+        g._metrics_db_seconds += time.perf_counter() - started
+
+
+def _handle_error(context):
+    # 执行失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+    if context.connection is not None and context.connection.info.get('metrics_query_start'):
+        context.connection.info['metrics_query_start'].pop()
+
+
+def _start_request():
+    g._metrics_start = time.perf_counter()
+    g._metrics_queries = 0
+    g._metrics_db_seconds = 0.0
+
+
+def _remember_status(response):
+    g._metrics_status = response.status_code
+    return response
+
+
+def _finish_request(exc):
+    started = g.pop('_metrics_start', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    queries = g.pop('_metrics_queries', 0)
+    db_seconds = g.pop('_metrics_db_seconds', 0.0)
+    status = g.pop('_metrics_status', 500)
+    endpoint = request.endpoint or 'unmatched'
+
+    by_endpoint = (('endpoint', endpoint),)
+    registry.inc('http_requests_total', by_endpoint + (('method', request.method), ('status', str(status))))
+    registry.observe('http_request_duration_seconds', by_endpoint + (('method', request.method),), elapsed,
+                     LATENCY_BUCKETS)
+    registry.observe('db_queries_per_request', by_endpoint, queries, QUERY_BUCKETS)
+    registry.inc('db_queries_total', by_endpoint, queries)
+    registry.inc('db_query_duration_seconds_total', by_endpoint, db_seconds)
+
+    threshold = current_app.config.get('N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+    if threshold and queries > threshold:
+        registry.inc('n_plus_one_requests_total', by_endpoint)
+        current_app.logger.warning('疑似 N+1 查询：%s %s 执行了 %d 条 SQL（阈值 %d），SQL 耗时 %.1f ms，请求耗时 %.1f ms',
+                                   request.method, request.full_path.rstrip('?'), queries, threshold,
+                                   db_seconds * 1000, elapsed * 1000)
+    if current_app.config.get('METRICS_DIR'):
+        start_flusher(current_app._get_current_object())
+
+
+def init_metrics(app):
+    '''注册请求钩子和引擎事件；METRICS_ENABLED 为 False 时不统计'''
+    if not app.config.get('METRICS_ENABLED', True):
+        return False
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_remember_status)
+    app.teardown_request(_finish_request)
+    return True
@@ -0,0 +1,179 @@
+'''
+自由文本字段的类型化
+
+友商合同到期时间、友商合同价格、单位实际人数是手工填写的文本（"2025年12月"、"199元/月"、"约50人"），
+无法按日期范围查询，也无法在数据库中求和、求平均。这里把它们解析为日期 / 数值，写入带索引的影子列：
+- 批量导入时由 ImportSpec.derived 按列向量化解析，与原字段一起写入；
+- ORM 新增、修改时在 flush 前按原字段重新解析；
+- flask --app app typed backfill 按 id 分块回填已有数据。
+解析不出来或超出影子列范围的值（如误填到人数里的手机号）写 NULL，原字段保持不变。
+'''
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from exts import db
+
+# 模型 -> {影子列: (原字段, 解析函数)}
+TYPED_MODELS = {}
+
+BACKFILL_CHUNK_SIZE = 1000
+
+typed_cli = AppGroup('typed', help='类型化影子列')
+
+_DATE_PATTERN = r'(\d{4})\s*[-/.年]\s*(\d{1,2})(?:\s*[-/.月]\s*(\d{1,2}))?'
+_COMPACT_DATE_PATTERN = r'^\s*(\d{4})(\d{2})(\d{2})\s*$'
+_NUMBER_PATTERN = r'(\d+(?:,\d{3})*(?:\.\d+)?)\s*(万)?'
+
+# 影子列能存下的上限：价格为 Numeric(12, 2)，人数为 Integer
+MAX_NUMBER = 10 ** 10 - 0.01
+MAX_COUNT = 2 ** 31 - 1
+
+
+def _as_text(series):
+    return series.astype(object).where(series.notna(), None).map(lambda v: None if v is None else str(v))
+
+
+def _none_for_missing(series):
+    return series.astype(object).where(series.notna(), None)
+
+
+def parse_dates(series):
+    '''
+    解析日期文本：yyyy-mm-dd、yyyy/mm/dd、yyyy.mm.dd、yyyy年mm月dd日、yyyymmdd；
+    只有年月时取当月最后一天
+    :return: 元素为 datetime.date 或 None 的 Series
+    '''
+    import pandas as pd
+    text = _as_text(series)
+    parts = text.str.extract(_DATE_PATTERN)
+    compact = text.str.extract(_COMPACT_DATE_PATTERN)
+    parts = parts.where(parts[0].notna(), compact)
+    year = pd.to_numeric(parts[0], errors='coerce')
+    month = pd.to_numeric(parts[1], errors='coerce')
+    day = pd.to_numeric(parts[2], errors='coerce')
+    first_day = pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': 1}), errors='coerce')
+    dates = pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': day.fillna(1)}), errors='coerce')
+    dates = dates.where(day.notna(), first_day + pd.offsets.MonthEnd(0))
+    return _none_for_missing(dates.dt.date.where(dates.notna()))
+
+
+def parse_numbers(series):
+    '''
+    取文本中的第一个数值，支持千分位和“万”：“199元/月” -> 199，“1.2万” -> 12000；超过 MAX_NUMBER 的取 None
+    :return: 元素为 float 或 None 的 Series
+    '''
+    import pandas as pd
+    text = _as_text(series)
+    parts = text.str.extract(_NUMBER_PATTERN)
+    numbers = pd.to_numeric(parts[0].str.replace(',', '', regex=False), errors='coerce')
+    numbers = numbers.where(parts[1].isna(), numbers * 10000).round(2)
+    return _none_for_missing(numbers.where(numbers <= MAX_NUMBER))
+
+
+def parse_counts(series):
+    '''
+    人数文本取整数：“约50人” -> 50，“1.5万” -> 15000，“50-100” 取第一个数 50；超过 MAX_COUNT 的取 None
+    :return: 元素为 int 或 None 的 Series
+    '''
+    import pandas as pd
+    numbers = pd.to_numeric(parse_numbers(series), errors='coerce').round()
+    return _none_for_missing(numbers.where(numbers <= MAX_COUNT).astype('Int64'))
+
+
+def parse_value(parser, value):
+    '''单个值的解析（ORM 写入时使用）'''
+    import pandas as pd
+    return parser(pd.Series([value], dtype=object)).iloc[0]
+
+
+# 企业、酒店、门店共用的影子列
+COMPETITOR_COLUMNS = {
+    'competitor_expiry_date': ('competitor_expiry', parse_dates),
+    'competitor_price_value': ('competitor_price', parse_numbers),
+}
+
+# 企业、酒店、门店的全部影子列
+TYPED_COLUMNS = {
+    **COMPETITOR_COLUMNS,
+    'actual_people_count_value': ('actual_people_count', parse_counts),
+}
+
+
+def register_typed(model, derived):
+    '''登记模型的影子列，ORM 写入时自动维护'''
+    TYPED_MODELS[model] = dict(derived)
+
+
+def backfill_chunk(conn, model, derived, last_id=0, chunk_size=BACKFILL_CHUNK_SIZE):
+    '''
+    重新解析 id 大于 last_id 的一块记录的影子列：一次查询、一次 executemany 更新
+    :return: (处理的行数, 本块最大 id)
+    '''
+    import pandas as pd
+    table = model.__table__
+    sources = sorted({source for source, _ in derived.values()})
+    rows = conn.execute(
+        select(table.c.id, *[table.c[name] for name in sources])
+        .where(table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+    ).all()
+    if not rows:
+        return 0, last_id
+    frame = pd.DataFrame(rows, columns=['id'] + sources, dtype=object)
+    values = {'_id': frame['id']}
+    for target, (source, parser) in derived.items():
+        values['_' + target] = parser(frame[source])
+    stmt = update(table).where(table.c.id == bindparam('_id')).values({
+        target: bindparam('_' + target) for target in derived
+    })
+    conn.execute(stmt, pd.DataFrame(values).astype(object).to_dict('records'))
+    return len(rows), rows[-1][0]
+
+
+def backfill(conn, model, derived, chunk_size=BACKFILL_CHUNK_SIZE):
+    '''
+    在同一事务中按 id 分块回填全部记录（迁移中使用）
+    :return: 处理的行数
+    '''
+    done = 0
+    last_id = 0
+    while True:
+        count, last_id = backfill_chunk(conn, model, derived, last_id, chunk_size)
+        if not count:
+            return done
+        done += count
+
+
+@event.listens_for(Session, 'before_flush')
+def _derive_before_flush(session, flush_context, instances):
+    '''新增或原字段有变化时重新解析'''
+    for obj in list(session.new) + list(session.dirty):
+        derived = TYPED_MODELS.get(type(obj))
+        if not derived:
+            continue
+        attrs = inspect(obj).attrs
+        for target, (source, parser) in derived.items():
+            if obj in session.new or attrs[source].history.has_changes():
+                setattr(obj, target, parse_value(parser, getattr(obj, source)))
+
+
+@typed_cli.command('backfill')
+@click.option('--table', 'tables', multiple=True, help='只回填指定的表，可多次指定')
+@click.option('--chunk-size', default=BACKFILL_CHUNK_SIZE, show_default=True, help='每块处理的行数')
+def backfill_command(tables, chunk_size):
+    '''按原字段重新解析全部影子列，每块单独提交，大表回填时不长时间持有锁'''
+    for model, derived in TYPED_MODELS.items():
+        table_name = model.__tablename__
+        if tables and table_name not in tables:
+            continue
+        done = 0
+        last_id = 0
+        while True:
+            with db.engine.begin() as conn:
+                count, last_id = backfill_chunk(conn, model, derived, last_id, chunk_size)
+            if not count:
+                break
+            done += count
+            click.echo(f'{table_name}: 已处理 {done} 行')
+        click.echo(f'{table_name}: 完成，共 {done} 行')
@@ -0,0 +1,90 @@
+'''
+游标（keyset）分页
+
+按 id 升序翻页：WHERE id > 上一页最后一条的 id ORDER BY id LIMIT n，
+不做 COUNT(*) 和 OFFSET，任意深度的翻页代价相同。
+游标对调用方不透明，是 base64 编码的 JSON。
+'''
+import base64
+import json
+import time
+
+from flask import current_app
+
+from exts import db
+from utils.cache import caching_enabled
+
+MAX_PER_PAGE = 1000
+
+_count_cache = {}
+
+
+def encode_cursor(last_id):
+    payload = json.dumps({'id': last_id}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def decode_cursor(token):
+    '''空字符串表示第一页；无法解析时抛出 ValueError'''
+    if not token:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return int(payload['id'])
+    except Exception:
+        raise ValueError('cursor 无效')
+
+
+def keyset_page(query, id_column, cursor, per_page):
+    '''
+    取一页数据
+    :param query: 基础查询，例如 CompanyModel.query
+    :param id_column: 排序与翻页使用的 id 列
+    :param cursor: 上一页返回的 next_cursor，首页传空字符串
+    :param per_page: 每页条数
+    :return: (本页记录, 下一页游标；没有下一页时为 None)
+    '''
+    last_id = decode_cursor(cursor)
+    if last_id is not None:
+        query = query.filter(id_column > last_id)
+    # 多取一条判断是否还有下一页
+    items = query.order_by(id_column).limit(per_page + 1).all()
+    if len(items) > per_page:
+        items = items[:per_page]
+        return items, encode_cursor(items[-1].id)
+    return items, None
+
+
+def cached_count(model):
+    '''
+    总数缓存 LIST_COUNT_CACHE_SECONDS 秒，是近似值，供界面显示“共 N 条”；CACHE_BACKEND 为 none 时每次都统计
+    '''
+    ttl = current_app.config.get('LIST_COUNT_CACHE_SECONDS', 60) if caching_enabled(current_app.config) else 0
+    key = model.__tablename__
+    cached = _count_cache.get(key)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        return cached[1]
+    total = db.session.query(db.func.count(model.id)).scalar()
+    _count_cache[key] = (now + ttl, total)
+    return total
+
+
+def keyset_list(query, model, args, per_page, filtered=False):
+    '''
+    游标分页取一页
+    :param args: request.args，读取 cursor 与 with_total
+    :param per_page: 每页条数，限制在 1 ~ MAX_PER_PAGE 之间
+    :param filtered: 有筛选条件时总数按条件精确统计，否则使用缓存的近似总数
+    :return: (本页记录, 分页信息)
+    '''
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    items, next_cursor = keyset_page(query, model.id, args.get('cursor', ''), per_page)
+    meta = {
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+        "has_next": next_cursor is not None
+    }
+    if args.get('with_total', 0, type=int):
+        meta["total"] = query.order_by(None).count() if filtered else cached_count(model)
+    return items, meta
@@ -0,0 +1,108 @@
+'''
+企业、酒店与楼园的外键关联
+
+原来企业/酒店与楼园只能通过 business_park 表的 company_name 做字符串匹配，
+现在在企业、酒店上保存 business_park_id 外键：取楼园表中 company_name 与记录名称相同的行（取 id 最小的一行）。
+不按楼园名称匹配记录的 business_park 文本：楼园名称不唯一，会把不在该楼园名下的企业挂到楼园上。
+解析用一条 UPDATE ... SET business_park_id = (子查询) 批量完成，
+在迁移回填、批量导入以及 ORM 写入（记录或楼园有变化）后执行。
+'''
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from blueprint.business_park import BusinessParkModel
+from utils.bulk_import import after_import
+
+# 模型 -> 名称列名
+PARK_LINKED = {}
+
+QUERY_CHUNK_SIZE = 1000
+
+
+def register_park_link(model, name_column):
+    PARK_LINKED[model] = name_column
+
+
+def link_parks(conn, model, *conditions):
+    '''
+    按规则重新解析满足条件的记录的 business_park_id，条件为空时处理全表
+    :return: 更新的行数
+    '''
+    table = model.__table__
+    park = BusinessParkModel.__table__
+    name = table.c[PARK_LINKED[model]]
+    by_company = select(func.min(park.c.id)).where(park.c.company_name == name).scalar_subquery()
+    stmt = update(table).values(business_park_id=by_company)
+    if conditions:
+        stmt = stmt.where(*conditions)
+    return conn.execute(stmt).rowcount
+
+
+def link_by_names(conn, model, names=(), park_ids=()):
+    '''名称或楼园 id 命中的记录重新解析，分块执行'''
+    table = model.__table__
+    name = table.c[PARK_LINKED[model]]
+    for column, values in ((name, list(names)), (table.c.business_park_id, list(park_ids))):
+        values = [v for v in dict.fromkeys(values) if v is not None]
+        for start in range(0, len(values), QUERY_CHUNK_SIZE):
+            link_parks(conn, model, column.in_(values[start:start + QUERY_CHUNK_SIZE]))
+
+
+@event.listens_for(Session, 'after_flush')
+def _link_after_flush(session, flush_context):
+    '''企业/酒店的名称变化、楼园行增删改后重新解析'''
+    records = {}
+    linked = []
+    park_changes = {'names': set(), 'park_ids': set()}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        state = inspect(obj)
+        if isinstance(obj, BusinessParkModel):
+            history = state.attrs.company_name.history
+            park_changes['names'].update(list(history.added) + list(history.deleted) + list(history.unchanged))
+            if obj in session.deleted or obj in session.dirty:
+                park_changes['park_ids'].add(obj.id)
+            continue
+        model = type(obj)
+        if model not in PARK_LINKED or obj in session.deleted:
+            continue
+        # 显式指定了 business_park_id 时不覆盖
+        if state.attrs.business_park_id.history.has_changes():
+            continue
+        if obj in session.dirty and not state.attrs[PARK_LINKED[model]].history.has_changes():
+            continue
+        records.setdefault(model, []).append(obj.id)
+        linked.append(obj)
+
+    if not records and not any(park_changes.values()):
+        return
+    conn = session.connection()
+    for model, ids in records.items():
+        for start in range(0, len(ids), QUERY_CHUNK_SIZE):
+            link_parks(conn, model, model.__table__.c.id.in_(ids[start:start + QUERY_CHUNK_SIZE]))
+    if any(park_changes.values()):
+        for model in PARK_LINKED:
+            link_by_names(conn, model, park_changes['names'], park_changes['park_ids'])
+        # 楼园变化可能影响会话中任何已加载的企业/酒店
+        linked = [obj for obj in session.identity_map.values() if type(obj) in PARK_LINKED]
+    session.info.setdefault('park_links_stale', []).extend(linked)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_after_flush(session, flush_context):
+    '''
+    外键由 Core UPDATE 写入，会话中的对象仍是旧值；flush 收尾后使其过期，下次访问时重新加载。
+    不能在 after_flush 中过期：收尾时会把刚写入的属性重新标记为已加载
+    '''
+    for obj in session.info.pop('park_links_stale', []):
+        if obj in session and not inspect(obj).deleted:
+            session.expire(obj, ['business_park_id', 'park'])
+
+
+@after_import
+def _link_after_import(spec, conn, frame):
+    '''企业/酒店导入后按名称解析；楼园导入后解析涉及的企业/酒店'''
+    if spec.model in PARK_LINKED and spec.key:
+        link_by_names(conn, spec.model, frame[spec.key].tolist())
+    elif spec.model is BusinessParkModel:
+        for model in PARK_LINKED:
+            link_by_names(conn, model, frame['company_name'].tolist())
@@ -0,0 +1,112 @@
+'''
+易查查备注解析
+
+备注列是 JSON 对象：c 为问卷 code，analysis 为按问题顺序的答案数组。
+解析优先使用 orjson，未安装时使用标准库；解析结果汇总为计数，
+解析失败、答案数与问卷问题数不一致的行只保留前 SAMPLE_LIMIT 条明细，避免大表报告过大。
+'''
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+SAMPLE_LIMIT = 100
+PREVIEW_LENGTH = 50
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def decode_remark(remark):
+    '''
+    解析一个备注单元格
+    :return: (备注对象, 错误)；空单元格返回 (None, None)，解析失败时备注对象为 None
+    '''
+    if remark is None or remark == '':
+        return None, None
+    if not isinstance(remark, str):
+        return None, '不是文本'
+    try:
+        data = _loads(remark)
+    except ValueError:
+        return None, '不是合法的 JSON'
+    if not isinstance(data, dict):
+        return None, '不是 JSON 对象'
+    return data, None
+
+
+def remark_answers(data):
+    '''取答案数组，不是数组时返回 None'''
+    answers = data.get('analysis', [])
+    return answers if isinstance(answers, list) else None
+
+
+class RemarkReport:
+    '''
+    备注解析汇总：行数、空备注、解析失败、各问卷行数、答案数不一致
+    '''
+
+    def __init__(self):
+        self.rows = 0
+        self.empty = 0
+        self.failed = 0
+        self.mismatched = 0
+        self.codes = {}
+        self.failures = []
+        self.mismatches = []
+
+    def row(self, remark, sheet=None, row_number=None, file=None):
+        '''
+        解析并登记一行的备注
+        :return: 备注对象，空或解析失败时为 None
+        '''
+        self.rows += 1
+        data, error = decode_remark(remark)
+        if error:
+            self.failed += 1
+            if len(self.failures) < SAMPLE_LIMIT:
+                self.failures.append({"file": file, "sheet": sheet, "row": row_number, "error": error,
+                                      "value": str(remark)[:PREVIEW_LENGTH]})
+        elif data is None:
+            self.empty += 1
+        else:
+            code = data.get('c')
+            if code:
+                code = str(code)
+                self.codes[code] = self.codes.get(code, 0) + 1
+        return data
+
+    def check_answers(self, code, answers, expected, sheet=None, row_number=None, file=None):
+        '''答案不是数组或个数与问卷问题数不一致时登记'''
+        actual = len(answers) if isinstance(answers, list) else None
+        if actual == expected:
+            return True
+        self.mismatched += 1
+        if len(self.mismatches) < SAMPLE_LIMIT:
+            self.mismatches.append({"file": file, "sheet": sheet, "row": row_number, "code": code,
+                                    "expected": expected, "actual": actual})
+        return False
+
+    def merge(self, other):
+        '''合并另一个报告（批量分析时各文件分别扫描）'''
+        self.rows += other.rows
+        self.empty += other.empty
+        self.failed += other.failed
+        self.mismatched += other.mismatched
+        for code, count in other.codes.items():
+            self.codes[code] = self.codes.get(code, 0) + count
+        self.failures.extend(other.failures[:SAMPLE_LIMIT - len(self.failures)])
+        self.mismatches.extend(other.mismatches[:SAMPLE_LIMIT - len(self.mismatches)])
+        return self
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "empty": self.empty,
+            "failed": self.failed,
+            "mismatched": self.mismatched,
+            "codes": self.codes,
+            "failures": self.failures,
+            "mismatches": self.mismatches,
+        }
@@ -0,0 +1,110 @@
+'''
+名称 n-gram 索引
+
+LIKE '%关键字%' 无法使用索引，中文企业名称也没有分词。这里把名称拆成单字和相邻两字，
+写入 name_ngram 表，子串查询先用 n-gram 在索引上取候选 id，再对候选做 LIKE 校验。
+
+索引随写入维护：ORM 的新增/修改/删除在 flush 时同步，批量导入在写入后按名称重建。
+'''
+from sqlalchemy import delete, func, insert, select
+
+from exts import db
+from utils.entity_sync import EntityRegistry
+
+# 实体名 -> (模型, 名称列)
+SEARCHABLE = EntityRegistry(lambda name_column: [name_column.key])
+
+
+class NameNgramModel(db.Model):
+    '''
+    名称 n-gram 索引表
+    '''
+    __tablename__ = 'name_ngram'
+    __table_args__ = (
+        db.Index('ix_name_ngram_lookup', 'entity', 'ngram', 'entity_id'),
+        db.Index('ix_name_ngram_entity_id', 'entity', 'entity_id'),
+        {'extend_existing': True}
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    ngram = db.Column(db.String(10), nullable=False)
+
+
+def register_searchable(entity, model, name_column):
+    SEARCHABLE.register(entity, model, name_column)
+
+
+def ngrams(text):
+    '''单字 + 相邻两字，去掉空白并转小写'''
+    text = ''.join(str(text).split()).lower()
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_ngrams(text):
+    '''查询词至少两个字时只用两字 gram，候选更少'''
+    text = ''.join(str(text).split()).lower()
+    if len(text) < 2:
+        return set(text)
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def reindex(conn, entity, rows):
+    '''
+    重建指定记录的 n-gram
+    :param conn: 当前事务的连接
+    :param entity: 实体名
+    :param rows: [(id, 名称)]，名称为空表示只删除
+    '''
+    table = NameNgramModel.__table__
+    ids = [row_id for row_id, _ in rows]
+    if not ids:
+        return
+    conn.execute(delete(table).where(table.c.entity == entity, table.c.entity_id.in_(ids)))
+    values = [
+        {'entity': entity, 'entity_id': row_id, 'ngram': gram}
+        for row_id, name in rows if name
+        for gram in ngrams(name)
+    ]
+    if values:
+        conn.execute(insert(table), values)
+
+
+def reindex_ids(conn, entity, ids, chunk_size=1000):
+    '''按 id 分块读取名称后重建，用于批量导入和回填'''
+    model, name_column = SEARCHABLE[entity]
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        rows = conn.execute(select(model.id, name_column).where(model.id.in_(chunk))).all()
+        found = {row_id for row_id, _ in rows}
+        reindex(conn, entity, list(rows) + [(row_id, None) for row_id in chunk if row_id not in found])
+
+
+def matching_ids(entity, text):
+    '''
+    返回名称包含 text 的候选 id 子查询（包含全部 n-gram，仍需 LIKE 校验顺序）
+    '''
+    table = NameNgramModel.__table__
+    grams = query_ngrams(text)
+    return (
+        select(table.c.entity_id)
+        .where(table.c.entity == entity, table.c.ngram.in_(grams))
+        .group_by(table.c.entity_id)
+        .having(func.count(func.distinct(table.c.ngram)) == len(grams))
+    )
+
+
+@SEARCHABLE.on_flush()
+def _sync_after_flush(conn, entity, changes):
+    '''ORM 写入时同步索引，修改时只有名称变化才重建'''
+    _, name_column = SEARCHABLE[entity]
+    reindex(conn, entity, [(obj.id, None if kind == 'deleted' else getattr(obj, name_column.key))
+                           for obj, kind in changes])
+
+
+@SEARCHABLE.after_import
+def _sync_after_import(conn, entity, spec, frame):
+    '''批量导入后按名称重建'''
+    reindex_ids(conn, entity, SEARCHABLE.imported_ids(conn, entity, spec, frame))
@@ -0,0 +1,77 @@
+'''
+运行环境配置
+
+配置按以下顺序加载，后加载的覆盖先加载的：
+1. config.py 中的默认值；
+2. config.PROFILES 中所选运行环境（dev / test / prod）的覆盖项，由环境变量 ECC_PROFILE 指定，默认 dev；
+3. 环境变量 ECC_CONFIG_FILE 指定的配置文件（.py 或 .json），可选；
+4. 以 ECC_ 开头的环境变量，例如 ECC_DB_POOL_SIZE=20、ECC_SQLALCHEMY_DATABASE_URI=mysql+pymysql://...，
+   值按 JSON 解析（数字、true/false），解析失败时作为字符串。
+加载后 SECRET_KEY 仍为空时拒绝启动（prod 不使用 config.py 中的默认密钥，须设置 ECC_SECRET_KEY）。
+启动时在日志中输出与性能相关的生效配置。
+'''
+import json
+import os
+
+from sqlalchemy.engine import make_url
+
+ENV_PREFIX = 'ECC'
+PROFILE_VARIABLE = 'ECC_PROFILE'
+FILE_VARIABLE = 'ECC_CONFIG_FILE'
+DEFAULT_PROFILE = 'dev'
+
+# 启动时输出的配置项
+REPORTED_SETTINGS = [
+    'SQLALCHEMY_ECHO', 'SQLALCHEMY_TRACK_MODIFICATIONS',
+    'DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_TIMEOUT', 'DB_POOL_RECYCLE', 'DB_POOL_PRE_PING',
+    'MAX_CONTENT_LENGTH', 'IMPORT_CHUNK_SIZE', 'JOB_WORKERS', 'JOB_STALE_SECONDS', 'JOB_RETENTION_SECONDS',
+    'CACHE_BACKEND', 'QUESTIONAIRE_CACHE_SIZE', 'QUESTIONAIRE_CACHE_SECONDS', 'LIST_COUNT_CACHE_SECONDS',
+    'SWAGGER_ENABLED', 'AUTO_UPGRADE_SCHEMA',
+    'METRICS_ENABLED', 'N_PLUS_ONE_THRESHOLD', 'METRICS_DIR',
+]
+
+
+def load_config(app, profile=None, config_object='config'):
+    '''
+    按运行环境加载配置
+    :param profile: 运行环境，为空时取环境变量 ECC_PROFILE
+    :return: 运行环境名
+    '''
+    profile = profile or os.environ.get(PROFILE_VARIABLE) or DEFAULT_PROFILE
+    app.config.from_object(config_object)
+    profiles = app.config.get('PROFILES', {})
+    if profile not in profiles:
+        raise ValueError(f'未知的运行环境：{profile}，可选 {", ".join(profiles)}')
+    app.config.update(profiles[profile])
+
+    path = os.environ.get(FILE_VARIABLE)
+    if path:
+        if path.endswith('.json'):
+            app.config.from_file(os.path.abspath(path), load=json.load)
+        else:
+            app.config.from_pyfile(os.path.abspath(path))
+    app.config.from_prefixed_env(ENV_PREFIX)
+    if not app.config.get('SECRET_KEY'):
+        raise ValueError(f'运行环境 {profile} 须设置 SECRET_KEY（环境变量 {ENV_PREFIX}_SECRET_KEY）')
+    app.config['PROFILE'] = profile
+    return profile
+
+
+def effective_settings(config):
+    '''与性能相关的生效配置；数据库地址隐藏密码'''
+    settings = {
+        'PROFILE': config.get('PROFILE'),
+        'DATABASE': make_url(config['SQLALCHEMY_DATABASE_URI']).render_as_string(hide_password=True),
+    }
+    settings.update({name: config.get(name) for name in REPORTED_SETTINGS})
+    settings['ENGINE_OPTIONS'] = {
+        name: value.__name__ if isinstance(value, type) else value
+        for name, value in config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).items()
+    }
+    return settings
+
+
+def report_settings(app):
+    app.logger.info('生效配置：\n%s', '\n'.join(
+        f'  {name} = {value}' for name, value in effective_settings(app.config).items()
+    ))
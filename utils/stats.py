@@ -0,0 +1,222 @@
+'''
+拜访统计汇总表
+
+按实体（企业、酒店、连锁门店）和维度（拜访人、异网运营商、楼园、品牌、更新月份）
+预先汇总记录数，写入 stats_rollup 表，统计接口只读汇总表，耗时与业务表大小无关。
+
+汇总随写入增量维护：
+- ORM 的新增/修改/删除在 flush 前按变化的字段加减计数；
+- 批量导入在写入前按已存在记录的旧值减去计数，写入后按新值加上计数；
+- flask --app app stats rebuild 从业务表全量重算，用于初始化或校正。
+'''
+import re
+from collections import Counter
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, delete, insert, inspect, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from exts import db
+from utils.entity_sync import QUERY_CHUNK_SIZE, EntityRegistry, select_in_chunks
+
+# 实体名 -> (模型, {维度: 列名})
+ROLLUPS = EntityRegistry(lambda dimensions: set(dimensions.values()))
+
+# 每个实体的记录总数记在 total 维度下，key 为空字符串
+TOTAL = 'total'
+
+stats_cli = AppGroup('stats', help='拜访统计汇总表')
+
+
+class StatsRollupModel(db.Model):
+    '''
+    统计汇总表：每个 (实体, 维度, 值) 一行；值为空的记录汇总在空字符串下
+    '''
+    __tablename__ = 'stats_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('entity', 'dimension', 'key', name='uq_stats_rollup'),
+        {'extend_existing': True}
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(20), nullable=False)
+    dimension = db.Column(db.String(20), nullable=False)
+    key = db.Column(db.String(500), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+def month_of(value):
+    '''更新时间取年月（yyyymm），兼容 yyyymmdd、yyyy-mm-dd 等写法'''
+    digits = re.sub(r'\D', '', str(value or ''))
+    return digits[:6] if len(digits) >= 6 else ''
+
+
+# 需要转换的维度，其余维度直接取列值
+TRANSFORMS = {'month': month_of}
+
+
+def register_rollup(entity, model, dimensions):
+    '''
+    登记需要汇总的实体
+    :param dimensions: {维度: 列名}，例如 {'visitor': 'visitor_name', 'month': 'update_time'}
+    '''
+    ROLLUPS.register(entity, model, dict(dimensions))
+
+
+def dimension_keys(dimensions, values):
+    '''
+    一条记录在各维度下的 key
+    :param values: {列名: 值}
+    '''
+    keys = {TOTAL: ''}
+    for dimension, column_name in dimensions.items():
+        value = values.get(column_name)
+        transform = TRANSFORMS.get(dimension)
+        keys[dimension] = transform(value) if transform else ('' if value is None else str(value).strip())
+    return keys
+
+
+def count_rows(dimensions, rows, sign=1, counter=None):
+    '''把记录按维度累加到 Counter[(维度, key)]'''
+    counter = Counter() if counter is None else counter
+    for values in rows:
+        for dimension, key in dimension_keys(dimensions, values).items():
+            counter[(dimension, key[:500])] += sign
+    return counter
+
+
+def apply_deltas(conn, entity, counter):
+    '''把计数变化写入汇总表'''
+    deltas = [{"entity": entity, "dimension": dimension, "key": key, "count": delta}
+              for (dimension, key), delta in counter.items() if delta]
+    if not deltas:
+        return
+    table = StatsRollupModel.__table__
+    if conn.dialect.name == 'mysql':
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update(count=table.c['count'] + stmt.inserted['count'])
+        conn.execute(stmt, deltas)
+        return
+
+    existing = set()
+    for dimension in {d["dimension"] for d in deltas}:
+        keys = [d["key"] for d in deltas if d["dimension"] == dimension]
+        for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+            stmt = select(table.c.key).where(table.c.entity == entity, table.c.dimension == dimension,
+                                             table.c.key.in_(keys[start:start + QUERY_CHUNK_SIZE]))
+            existing.update((dimension, key) for key in conn.execute(stmt).scalars())
+    updates = [{"_dimension": d["dimension"], "_key": d["key"], "_count": d["count"]}
+               for d in deltas if (d["dimension"], d["key"]) in existing]
+    inserts = [d for d in deltas if (d["dimension"], d["key"]) not in existing]
+    if updates:
+        stmt = update(table).where(
+            table.c.entity == entity,
+            table.c.dimension == bindparam('_dimension'),
+            table.c.key == bindparam('_key')
+        ).values(count=table.c['count'] + bindparam('_count'))
+        conn.execute(stmt, updates)
+    if inserts:
+        conn.execute(insert(table), inserts)
+
+
+def fetch_values(conn, model, dimensions, column, keys):
+    '''按 id 或自然键分块查询记录的维度列'''
+    column_names = sorted(set(dimensions.values()))
+    stmt = select(*[getattr(model, name) for name in column_names])
+    for row in select_in_chunks(conn, stmt, column, keys):
+        yield dict(zip(column_names, row))
+
+
+def rebuild(conn, entities=None):
+    '''
+    从业务表全量重算汇总
+    :return: {实体: 记录数}
+    '''
+    table = StatsRollupModel.__table__
+    totals = {}
+    for entity in entities or list(ROLLUPS):
+        model, dimensions = ROLLUPS[entity]
+        column_names = sorted(set(dimensions.values()))
+        stmt = select(*[getattr(model, name) for name in column_names]).execution_options(
+            yield_per=QUERY_CHUNK_SIZE)
+        rows = (dict(zip(column_names, row)) for row in conn.execute(stmt))
+        counter = count_rows(dimensions, rows)
+        conn.execute(delete(table).where(table.c.entity == entity))
+        apply_deltas(conn, entity, counter)
+        totals[entity] = counter[(TOTAL, '')]
+    return totals
+
+
+def rollup(dimension, entity=None, top=None):
+    '''
+    查询汇总表
+    :param entity: 为空时合计所有实体
+    :return: [{"key", "count"}]，月份按时间排序，其余按数量从多到少
+    '''
+    count = db.func.sum(StatsRollupModel.count).label('count')
+    stmt = (
+        select(StatsRollupModel.key, count)
+        .where(StatsRollupModel.dimension == dimension)
+        .group_by(StatsRollupModel.key)
+        .having(count > 0)
+    )
+    if entity:
+        stmt = stmt.where(StatsRollupModel.entity == entity)
+    if dimension == 'month':
+        stmt = stmt.order_by(StatsRollupModel.key)
+    else:
+        stmt = stmt.order_by(count.desc(), StatsRollupModel.key)
+    if top:
+        stmt = stmt.limit(top)
+    return [{"key": key, "count": int(value)} for key, value in db.session.execute(stmt)]
+
+
+@ROLLUPS.on_flush('before_flush')
+def _sync_before_flush(conn, entity, changes):
+    '''ORM 写入时按字段变化加减计数'''
+    _, dimensions = ROLLUPS[entity]
+    counter = Counter()
+    for obj, kind in changes:
+        new = {name: getattr(obj, name) for name in dimensions.values()}
+        if kind == 'new':
+            count_rows(dimensions, [new], 1, counter)
+        elif kind == 'deleted':
+            count_rows(dimensions, [new], -1, counter)
+        else:
+            attrs = inspect(obj).attrs
+            old = dict(new)
+            for name in old:
+                history = attrs[name].history
+                if history.has_changes():
+                    old[name] = history.deleted[0] if history.deleted else None
+            count_rows(dimensions, [old], -1, counter)
+            count_rows(dimensions, [new], 1, counter)
+    apply_deltas(conn, entity, counter)
+
+
+@ROLLUPS.before_import
+def _subtract_before_import(conn, entity, spec, frame):
+    '''已存在的记录先按旧值减去'''
+    model, dimensions = ROLLUPS[entity]
+    ids = [i for i in frame['id'].tolist() if i is not None]
+    if ids:
+        apply_deltas(conn, entity, count_rows(dimensions, fetch_values(conn, model, dimensions, model.id, ids), -1))
+
+
+@ROLLUPS.after_import
+def _add_after_import(conn, entity, spec, frame):
+    '''写入后按新值（按自然键查询）加上'''
+    model, dimensions = ROLLUPS[entity]
+    names = frame[spec.key].tolist()
+    apply_deltas(conn, entity, count_rows(dimensions, fetch_values(conn, model, dimensions,
+                                                                   getattr(model, spec.key), names)))
+
+
+@stats_cli.command('rebuild')
+@click.option('--entity', multiple=True, help='只重算指定实体，可多次指定')
+def rebuild_command(entity):
+    '''从业务表全量重算汇总'''
+    with db.engine.begin() as conn:
+        totals = rebuild(conn, list(entity) or None)
+    for name, total in totals.items():
+        click.echo(f'{name}: {total} 条')
@@ -0,0 +1,15 @@
+'''
+生产环境 WSGI 入口
+
+    export ECC_SECRET_KEY=...                          # prod 未设置密钥时拒绝启动
+    ECC_PROFILE=prod flask --app app schema upgrade    # 发布时执行一次数据库迁移
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+worker 数、线程数等见 gunicorn.conf.py，连接池参数见 config.py 中的 DB_POOL_*。
+未设置 ECC_PROFILE 时使用 prod 运行环境。
+'''
+import os
+
+from app import create_app
+
+app = create_app(os.environ.get('ECC_PROFILE', 'prod'))